@@ -141,6 +141,14 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_SIZE', STATIC_CONTENT_DISK_CACHE_MAX_SIZE
+)
+STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX', STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX
+)
+
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_COOKIE_HTTPONLY = ENV_TOKENS.get('SESSION_COOKIE_HTTPONLY', True)
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
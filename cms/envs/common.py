@@ -392,6 +392,18 @@ MODULESTORE = {
     }
 }
 
+# Directory in which to keep copies of course assets too large for memcache,
+# so that they are served from local disk rather than read from the
+# contentstore on every request.  None disables the disk cache.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+# Size, in bytes, beyond which the least recently used assets are removed from
+# the disk cache.  Assets larger than a tenth of this aren't cached.
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+# URL prefix of an internal nginx location serving STATIC_CONTENT_DISK_CACHE_DIR.
+# If set, assets in the disk cache are handed off to nginx with
+# X-Accel-Redirect instead of being streamed through Django.
+STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX = None
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -0,0 +1,282 @@
+"""
+A bounded cache of large course assets in files on the local disk.
+
+Assets small enough for memcache are cached there by the middleware.  Larger
+ones (lecture PDFs, videos) used to be read from GridFS on every request; with
+this cache their data is copied to a local file the first time they are
+served, in the background, and later requests only look up the asset's
+metadata in the contentstore.  Entries are keyed by the asset's location, content digest and
+upload date, so replacing an asset naturally moves it to a new file.  The
+least recently used files are removed once the cache grows beyond its size.
+"""
+import errno
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContent
+
+log = logging.getLogger(__name__)
+
+# Local files can be read in larger chunks than GridFS streams.
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Entries are copied into temporary files whose names start with this prefix,
+# and renamed into place once complete.  Trimming leaves them alone unless they
+# are old enough to have been orphaned by a process that died while copying.
+TEMP_PREFIX = '.tmp-'
+STALE_TEMP_AGE = 60 * 60
+
+# Trimming removes entries until the cache is down to this fraction of its
+# size, so that it isn't needed again after every addition.
+TRIM_TARGET = 0.9
+
+# The caches of this process, by settings, so that their size estimates last
+# from one request to the next.
+_DISK_CACHES = {}
+
+
+class AssetDiskCache(object):
+    """
+    A cache of asset data in files under the directory `root`, holding at most
+    about `max_size` bytes.
+
+    Assets larger than a tenth of the cache are not cached, so that a single
+    large video can't flush everything else.
+
+    The cache keeps an estimate of its size, from the last time it was
+    trimmed plus what it added since, and only trims when that goes over
+    `max_size`.  Other processes sharing the directory keep their own, so the
+    cache can briefly hold more than `max_size` until one of them trims.
+    """
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self._size = None
+        # The paths of the entries this process is copying in the background.
+        self._filling = set()
+        self._filling_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Returns the cache configured by the STATIC_CONTENT_DISK_CACHE_DIR and
+        STATIC_CONTENT_DISK_CACHE_MAX_SIZE settings, or None if it is disabled.
+        """
+        root = getattr(settings, 'STATIC_CONTENT_DISK_CACHE_DIR', None)
+        if not root:
+            return None
+        key = (root, settings.STATIC_CONTENT_DISK_CACHE_MAX_SIZE)
+        if key not in _DISK_CACHES:
+            _DISK_CACHES[key] = cls(*key)
+        return _DISK_CACHES[key]
+
+    def is_cacheable(self, content):
+        """
+        Returns whether `content` can be kept in this cache.
+        """
+        return (
+            getattr(content, 'content_digest', None) is not None and
+            content.last_modified_at is not None and
+            content.length is not None and
+            content.length <= self.max_size / 10
+        )
+
+    def _path(self, content):
+        """
+        Returns the name of the file holding the data of `content`.
+        """
+        key = u"{}|{}|{}".format(content.location, content.content_digest, content.last_modified_at.isoformat())
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, content):
+        """
+        Returns a `DiskCachedContent` serving the data of `content` from the
+        cache, or None if it isn't cached.
+        """
+        path = self._path(content)
+        try:
+            data_file = open(path, 'rb')
+        except IOError as err:
+            if err.errno != errno.ENOENT:
+                log.warning(u"Couldn't read asset disk cache entry %s: %s", path, err)
+            return None
+
+        try:
+            # The modification time records when the entry was last used.
+            os.utime(path, None)
+        except OSError:
+            pass
+        return DiskCachedContent(content, data_file, os.path.relpath(path, self.root))
+
+    def add(self, content):
+        """
+        Copies the data of the StaticContentStream `content` into the cache,
+        and returns a `DiskCachedContent` serving it, or None if it couldn't
+        be written.  The stream of `content` is consumed either way.
+        """
+        path = self._path(content)
+        directory = os.path.dirname(path)
+        try:
+            try:
+                os.makedirs(directory)
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+
+            # Write to a temporary file and rename it into place, so that
+            # other processes never serve a partial entry.
+            handle, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+            try:
+                size = 0
+                with os.fdopen(handle, 'wb') as temp_file:
+                    for chunk in content.stream_data():
+                        temp_file.write(chunk)
+                        size += len(chunk)
+                os.rename(temp_path, path)
+            except Exception:
+                os.unlink(temp_path)
+                raise
+        except (IOError, OSError) as err:
+            log.warning(u"Couldn't write asset disk cache entry %s: %s", path, err)
+            return None
+
+        if self._size is not None:
+            self._size += size
+        if self._size is None or self._size > self.max_size:
+            self.trim()
+        return self.get(content)
+
+    def fill(self, content, open_stream):
+        """
+        Copies the data of `content` into the cache in a background thread,
+        from the StaticContentStream returned by `open_stream`, unless this
+        process is already copying it.  Returns the thread, or None.
+
+        Requests for the asset are meanwhile served from the contentstore, so
+        that none of them waits for the whole asset to be copied.
+        """
+        path = self._path(content)
+        with self._filling_lock:
+            if path in self._filling:
+                return None
+            self._filling.add(path)
+
+        def copy():
+            """
+            Copies the asset, and lets it be copied again if that failed.
+            """
+            try:
+                cached_content = self.add(open_stream())
+                if cached_content is not None:
+                    cached_content.close()
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u"Couldn't copy asset %s to the disk cache", content.location)
+            finally:
+                with self._filling_lock:
+                    self._filling.discard(path)
+
+        thread = threading.Thread(target=copy)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _remove(self, path):
+        """
+        Removes the file `path` from the cache, and returns whether it is gone.
+        """
+        try:
+            os.unlink(path)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                log.warning(u"Couldn't remove asset disk cache entry %s: %s", path, err)
+                return False
+        return True
+
+    def trim(self):
+        """
+        Removes the least recently used entries if the cache holds more than
+        `max_size` bytes, until it is down to TRIM_TARGET of that, and
+        updates the size estimate.
+        """
+        now = time.time()
+        entries = []
+        total_size = 0
+        for directory, __, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if filename.startswith(TEMP_PREFIX):
+                    # Another process may still be copying into it.
+                    if now - stat.st_mtime > STALE_TEMP_AGE:
+                        self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        if total_size > self.max_size:
+            entries.sort()
+            for __, size, path in entries:
+                if total_size <= self.max_size * TRIM_TARGET:
+                    break
+                if self._remove(path):
+                    total_size -= size
+        self._size = total_size
+
+
+class DiskCachedContent(StaticContent):
+    """
+    A `StaticContent` whose data is read from an open file in the disk cache.
+
+    The file is opened when the entry is looked up, so it can still be read
+    if the entry is evicted while the response is being sent.  It is closed
+    with the object, or by `close`.  `cache_path` is the name of the file
+    relative to the root of the cache.
+    """
+    def __init__(self, content, data_file, cache_path):
+        super(DiskCachedContent, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=content.content_digest
+        )
+        self._file = data_file
+        self.cache_path = cache_path
+
+    @property
+    def data(self):
+        self._file.seek(0)
+        return self._file.read()
+
+    def stream_data(self):
+        self._file.seek(0)
+        while True:
+            chunk = self._file.read(FILE_CHUNK_SIZE)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included), from a
+        memory map of the file.
+        """
+        data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for position in xrange(first_byte, last_byte + 1, FILE_CHUNK_SIZE):
+                yield data[position:min(position + FILE_CHUNK_SIZE, last_byte + 1)]
+        finally:
+            data.close()
+
+    def close(self):
+        self._file.close()
@@ -3,7 +3,9 @@ Middleware to serve assets.
 """
 
 import logging
+from uuid import uuid4
 
+from django.conf import settings
 from django.http import (
     HttpResponse, HttpResponseNotModified, HttpResponseForbidden
 )
@@ -15,6 +17,7 @@ from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from contentserver.disk_cache import AssetDiskCache, DiskCachedContent
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +26,9 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this many bytes are cached in memcache
+MEMCACHE_MAX_LENGTH = 1048576
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -43,7 +49,8 @@ class StaticContentServer(object):
 
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
-            if content is None:
+            fetched_from_db = content is None
+            if fetched_from_db:
                 # nope, not in cache, let's fetch from DB
                 try:
                     content = AssetManager.find(loc, as_stream=True)
@@ -52,18 +59,7 @@ class StaticContentServer(object):
                     response.status_code = 404
                     return response
 
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
-                if content.length is not None:
-                    if content.length < 1048576:
-                        # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
-                        set_cached_content(content)
-            else:
-                # NOP here, but we may wish to add a "cache-hit" counter in the future
-                pass
-
-            # Check that user has access to content
+            # Check that user has access to content, before copying any of it to a cache
             if getattr(content, "locked", False):
                 if not hasattr(request, "user") or not request.user.is_authenticated():
                     return HttpResponseForbidden('Unauthorized')
@@ -77,29 +73,68 @@ class StaticContentServer(object):
                     ):
                         return HttpResponseForbidden('Unauthorized')
 
+            if fetched_from_db:
+                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
+                # this is because I haven't been able to find a means to stream data out of memcached
+                if content.length is not None:
+                    if content.length < MEMCACHE_MAX_LENGTH:
+                        # since we've queried as a stream, let's read in the stream into memory to set in cache
+                        content = content.copy_to_in_mem()
+                        set_cached_content(content)
+                    else:
+                        # larger assets are kept in a local disk cache, if one is configured; until
+                        # an asset has been copied there, it is streamed from the DB
+                        disk_cache = AssetDiskCache.from_settings()
+                        if disk_cache is not None and disk_cache.is_cacheable(content):
+                            cached_content = disk_cache.get(content)
+                            if cached_content is not None:
+                                content.close()
+                                content = cached_content
+                            else:
+                                disk_cache.fill(content, lambda: AssetManager.find(loc, as_stream=True))
+
             # convert over the DB persistent last modified timestamp to a HTTP compatible
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
 
+            # the content digest makes a strong validator, where the store provides one
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{}"'.format(content_digest) if content_digest else None
+
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # ETags or timestamps, if they are the same then just return a 304 (Not Modified)
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                # If-None-Match takes precedence over If-Modified-Since
+                if etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag):
+                    response = HttpResponseNotModified()
+                    response['ETag'] = etag
+                    return response
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
-            # *** File streaming within a byte range ***
+            # Assets in the disk cache can be handed off to the web server, which
+            # then handles byte ranges itself.
+            x_accel_prefix = getattr(settings, 'STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX', None)
+            if x_accel_prefix and isinstance(content, DiskCachedContent):
+                content.close()
+                response = HttpResponse()
+                response['X-Accel-Redirect'] = x_accel_prefix.rstrip('/') + '/' + content.cache_path
+                response['Content-Type'] = content.content_type
+                response['Last-Modified'] = last_modified_at_str
+                if etag is not None:
+                    response['ETag'] = etag
+                return response
+
+            # *** File streaming within byte ranges ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
-            # Request -> Range attribute structure: "Range: bytes=first-[last]"
+            # Request -> Range attribute structure: "Range: bytes=first-[last][, first-[last]...]"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -112,43 +147,101 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
+                        # Unsatisfiable ranges are ignored, as long as one of them can be satisfied
+                        ranges = [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
 
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
                             response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
+                            response['Content-Type'] = content.content_type
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # Content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            response = multipart_byteranges_response(content, ranges)
+                        response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
                 response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
+                response['Content-Type'] = content.content_type
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
             response['Last-Modified'] = last_modified_at_str
+            if etag is not None:
+                response['ETag'] = etag
 
             return response
 
 
+def multipart_byteranges_response(content, ranges):
+    """
+    Returns a multipart/byteranges response with the parts of `content` given
+    by `ranges`, a list of satisfiable (first, last) tuples.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    boundary = uuid4().hex
+    part_headers = [
+        (
+            '\r\n--{boundary}\r\n'
+            'Content-Type: {content_type}\r\n'
+            'Content-Range: bytes {first}-{last}/{length}\r\n\r\n'
+        ).format(
+            boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+        ).encode('utf-8')
+        for first, last in ranges
+    ]
+    closing = '\r\n--{boundary}--\r\n'.format(boundary=boundary)
+
+    def stream_parts():
+        """
+        Streams the body of the response, one range at a time.
+        """
+        for part_header, (first, last) in zip(part_headers, ranges):
+            yield part_header
+            for chunk in content.stream_data_in_range(first, last):
+                yield chunk
+        yield closing
+
+    response = HttpResponse(stream_parts())
+    response['Content-Type'] = 'multipart/byteranges; boundary={}'.format(boundary)
+    response['Content-Length'] = str(
+        sum(len(part_header) for part_header in part_headers) +
+        sum(last - first + 1 for first, last in ranges) +
+        len(closing)
+    )
+    return response
+
+
+def etag_matches(header_value, etag):
+    """
+    Returns whether the If-None-Match header value `header_value` matches the
+    entity tag `etag` (including its quotes).
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    for candidate in header_value.split(','):
+        candidate = candidate.strip()
+        # If-None-Match uses the weak comparison function
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate in ('*', etag):
+            return True
+    return False
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
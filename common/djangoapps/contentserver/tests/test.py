@@ -4,12 +4,18 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
+from mock import patch
 
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
@@ -17,7 +23,8 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.disk_cache import AssetDiskCache, STALE_TEMP_AGE, TEMP_PREFIX
+from contentserver.middleware import etag_matches, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -28,6 +35,15 @@ TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().
 TEST_DATA_DIR = settings.COMMON_TEST_DATA_ROOT
 
 
+class SynchronousThread(threading.Thread):
+    """
+    A thread which runs as soon as it is started, so that tests can check
+    the disk cache after copies that would happen in the background.
+    """
+    def start(self):
+        self.run()
+
+
 @ddt.ddt
 @override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
 class ContentStoreToyCourseTest(ModuleStoreTestCase):
@@ -146,7 +162,8 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart/byteranges
+        message with each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
@@ -154,9 +171,36 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
             first=first_byte, last=last_byte)
         )
 
-        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.status_code, 206)
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        boundary = resp['Content-Type'].split('boundary=')[1]
+        data = self.contentstore.find(self.unlocked_asset).data
+        parts = resp.content.split('\r\n--{}'.format(boundary))
+        self.assertEqual(parts[-1], '--\r\n')
+        self.assertEqual(
+            [part.split('\r\n\r\n', 1)[1] for part in parts[1:-1]],
+            [data[first_byte:last_byte + 1], data[-100:]]
+        )
+        self.assertIn(
+            'Content-Range: bytes {first}-{last}/{length}'.format(
+                first=first_byte, last=last_byte, length=self.length_unlocked
+            ),
+            parts[1]
+        )
+
+    def test_range_request_ignores_unsatisfiable_ranges(self):
+        """
+        Test that unsatisfiable ranges are ignored if another range can be satisfied.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-9, {first}-'.format(
+            first=self.length_unlocked)
+        )
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-9/{length}'.format(length=self.length_unlocked))
 
     @ddt.data(
         'bytes 0-',
@@ -192,6 +236,213 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         )
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag(self):
+        """
+        Test that assets are served with an ETag, and that a matching
+        If-None-Match gets a 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"not-the-etag"')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_disk_cache(self):
+        """
+        Test that assets copied to the disk cache are served from it, in full
+        and in ranges.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 100 * self.length_unlocked)
+        data = self.contentstore.find(self.unlocked_asset).data
+
+        content = self.contentstore.find(self.unlocked_asset, as_stream=True)
+        self.assertTrue(disk_cache.is_cacheable(content))
+        self.assertIsNone(disk_cache.get(content))
+        self.assertEqual(''.join(disk_cache.add(content).stream_data()), data)
+
+        cached = disk_cache.get(self.contentstore.find(self.unlocked_asset, as_stream=True))
+        self.assertEqual(cached.length, self.length_unlocked)
+        self.assertEqual(''.join(cached.stream_data_in_range(2, 5)), data[2:6])
+
+    def test_disk_cache_x_accel_redirect(self):
+        """
+        Test that assets in the disk cache are handed off to the web server
+        when STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX is set.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        with override_settings(
+            STATIC_CONTENT_DISK_CACHE_DIR=cache_dir,
+            STATIC_CONTENT_DISK_CACHE_MAX_SIZE=100 * self.length_unlocked,
+            STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX='/cached-assets/',
+        ):
+            with patch('contentserver.middleware.get_cached_content', return_value=None):
+                with patch('contentserver.middleware.MEMCACHE_MAX_LENGTH', 0):
+                    with patch('contentserver.disk_cache.threading.Thread', SynchronousThread):
+                        # the first request copies the asset to the cache
+                        self.client.get(self.url_unlocked)
+                        resp = self.client.get(self.url_unlocked)
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, '')
+        path = resp['X-Accel-Redirect']
+        self.assertTrue(path.startswith('/cached-assets/'))
+        with open(os.path.join(cache_dir, path[len('/cached-assets/'):])) as cached_file:
+            self.assertEqual(cached_file.read(), self.contentstore.find(self.unlocked_asset).data)
+
+    def test_disk_cache_miss_served_from_contentstore(self):
+        """
+        Test that an asset which isn't in the disk cache yet is served from
+        the contentstore, ranges included, while it is copied to the cache.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        data = self.contentstore.find(self.unlocked_asset).data
+        with override_settings(
+            STATIC_CONTENT_DISK_CACHE_DIR=cache_dir,
+            STATIC_CONTENT_DISK_CACHE_MAX_SIZE=100 * self.length_unlocked,
+            STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX='/cached-assets/',
+        ):
+            with patch('contentserver.middleware.get_cached_content', return_value=None):
+                with patch('contentserver.middleware.MEMCACHE_MAX_LENGTH', 0):
+                    with patch.object(AssetDiskCache, 'fill') as mock_fill:
+                        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(resp.status_code, 206)
+        self.assertNotIn('X-Accel-Redirect', resp)
+        self.assertEqual(resp.content, data[2:6])
+        self.assertEqual(mock_fill.call_count, 1)
+        self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_disk_cache_not_filled_for_unauthorized_user(self):
+        """
+        Test that a locked asset isn't copied to the disk cache for a user
+        who may not see it.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.client.logout()
+        with override_settings(
+            STATIC_CONTENT_DISK_CACHE_DIR=cache_dir,
+            STATIC_CONTENT_DISK_CACHE_MAX_SIZE=100 * self.length_unlocked,
+        ):
+            with patch('contentserver.middleware.get_cached_content', return_value=None):
+                with patch('contentserver.middleware.MEMCACHE_MAX_LENGTH', 0):
+                    with patch.object(AssetDiskCache, 'fill') as mock_fill:
+                        resp = self.client.get(self.url_locked)
+
+        self.assertEqual(resp.status_code, 403)
+        self.assertFalse(mock_fill.called)
+
+    def test_disk_cache_fill(self):
+        """
+        Test that an asset is copied to the disk cache in the background, and
+        only by one thread at a time.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 100 * self.length_unlocked)
+        content = self.contentstore.find(self.unlocked_asset, as_stream=True)
+        copying = threading.Event()
+        copied = threading.Event()
+
+        def open_stream():
+            """
+            Opens the asset once the test has tried to copy it again.
+            """
+            copying.set()
+            copied.wait()
+            return self.contentstore.find(self.unlocked_asset, as_stream=True)
+
+        thread = disk_cache.fill(content, open_stream)
+        copying.wait()
+        self.assertIsNone(disk_cache.fill(content, open_stream))
+        copied.set()
+        thread.join()
+
+        cached = disk_cache.get(content)
+        self.assertEqual(''.join(cached.stream_data()), self.contentstore.find(self.unlocked_asset).data)
+        cached.close()
+
+    def test_disk_cache_trim(self):
+        """
+        Test that the least recently used assets are removed from a full disk
+        cache.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 10 * self.length_unlocked)
+        disk_cache.add(self.contentstore.find(self.unlocked_asset, as_stream=True)).close()
+        disk_cache.max_size = self.length_unlocked - 1
+        disk_cache.trim()
+        self.assertIsNone(disk_cache.get(self.contentstore.find(self.unlocked_asset, as_stream=True)))
+
+    def test_disk_cache_trims_only_when_full(self):
+        """
+        Test that the disk cache is only trimmed when its estimated size goes
+        over its maximum.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 10 * self.length_unlocked)
+
+        with patch.object(disk_cache, 'trim', wraps=disk_cache.trim) as mock_trim:
+            # the first addition measures the cache
+            disk_cache.add(self.contentstore.find(self.unlocked_asset, as_stream=True)).close()
+            self.assertEqual(mock_trim.call_count, 1)
+            disk_cache.add(self.contentstore.find(self.unlocked_asset, as_stream=True)).close()
+            self.assertEqual(mock_trim.call_count, 1)
+
+            # the estimate is now over the maximum, and so is the cache itself
+            disk_cache.max_size = self.length_unlocked - 1
+            self.assertIsNone(disk_cache.add(self.contentstore.find(self.unlocked_asset, as_stream=True)))
+            self.assertEqual(mock_trim.call_count, 2)
+
+    def test_disk_cache_trim_skips_temp_files(self):
+        """
+        Test that trimming leaves the files other processes are copying assets
+        into, but removes orphaned ones.
+        """
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        disk_cache = AssetDiskCache(cache_dir, 0)
+        __, in_flight = tempfile.mkstemp(dir=cache_dir, prefix=TEMP_PREFIX)
+        __, orphaned = tempfile.mkstemp(dir=cache_dir, prefix=TEMP_PREFIX)
+        for path in (in_flight, orphaned):
+            with open(path, 'w') as temp_file:
+                temp_file.write('partial asset')
+        old = time.time() - 2 * STALE_TEMP_AGE
+        os.utime(orphaned, (old, old))
+
+        disk_cache.trim()
+        self.assertTrue(os.path.exists(in_flight))
+        self.assertFalse(os.path.exists(orphaned))
+
+
+@ddt.ddt
+class EtagMatchesTestCase(unittest.TestCase):
+    """
+    Tests for the etag_matches function.
+    """
+    @ddt.data(
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ('*', True),
+        ('"xyz"', False),
+        ('abc', False),
+    )
+    @ddt.unpack
+    def test_etag_matches(self, header_value, expected):
+        self.assertEqual(etag_matches(header_value, '"abc"'), expected)
+
 
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
@@ -1,5 +1,7 @@
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from staticfiles.storage import staticfiles_storage
 from staticfiles import finders
@@ -13,6 +15,17 @@ from opaque_keys.edx.locator import AssetLocator
 
 log = logging.getLogger(__name__)
 
+# Bounds on the number of compiled url patterns, and of resolved /static/ urls,
+# kept by each process.
+URL_REGEX_CACHE_SIZE = 256
+STATIC_URL_CACHE_SIZE = 10000
+
+_URL_REGEXES = OrderedDict()
+_URL_REGEXES_LOCK = threading.Lock()
+
+_STATIC_URLS = OrderedDict()
+_STATIC_URLS_LOCK = threading.Lock()
+
 
 def _url_replace_regex(prefix):
     """
@@ -30,6 +43,44 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _compiled_url_replace_regex(prefix):
+    """
+    Returns `_url_replace_regex(prefix)` compiled, compiling each prefix only
+    once per process.
+    """
+    with _URL_REGEXES_LOCK:
+        regex = _URL_REGEXES.pop(prefix, None)
+        if regex is not None:
+            _URL_REGEXES[prefix] = regex
+            return regex
+
+    regex = re.compile(_url_replace_regex(prefix))
+    with _URL_REGEXES_LOCK:
+        _URL_REGEXES[prefix] = regex
+        while len(_URL_REGEXES) > URL_REGEX_CACHE_SIZE:
+            _URL_REGEXES.popitem(last=False)
+    return regex
+
+
+def _static_url_prefix(data_dir):
+    """
+    Returns the url prefix matched by `process_static_urls`.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
+def clear_static_url_cache():
+    """
+    Forgets all resolved /static/ urls.  Only needed when the static files or
+    modulestores of a running process change, as they do in tests.
+    """
+    with _STATIC_URLS_LOCK:
+        _STATIC_URLS.clear()
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -71,7 +122,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _compiled_url_replace_regex('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -91,7 +142,7 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _compiled_url_replace_regex('/course/').sub(replace_course_url, text)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -110,14 +161,7 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    return _compiled_url_replace_regex(_static_url_prefix(data_dir)).sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -154,52 +198,120 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         """
         Replace a single matched url.
         """
-        # Don't mess with things that end in '?raw'
-        if rest.endswith('?raw'):
-            return original
-
-        # In debug mode, if we can find the url as is,
-        if settings.DEBUG and finders.find(rest, True):
-            return original
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+        return _replace_static_url(original, prefix, quote, rest, data_directory, course_id, static_asset_path)
+
+    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
 
-                if AssetLocator.CANONICAL_NAMESPACE in url:
-                    url = url.replace('block@', 'block/', 1)
 
-        # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+def replace_urls(text, data_directory=None, course_id=None, static_asset_path='', jump_to_id_base_url=None):
+    """
+    Does the work of replace_static_urls, and of replace_course_urls and
+    replace_jump_to_id_urls if `course_id` and `jump_to_id_base_url` are
+    given, in a single pass over `text`.
+
+    The arguments are those of the three functions.
+    """
+    prefixes = [_static_url_prefix(static_asset_path or data_directory)]
+    if course_id is not None:
+        prefixes.append('/course/')
+        course_url = '/courses/' + course_id.to_deprecated_string() + '/'
+    if jump_to_id_base_url is not None:
+        prefixes.append('/jump_to_id/')
+
+    def replace_url(match):
+        """
+        Replace a single matched url, according to its prefix.
+        """
+        prefix = match.group('prefix')
+        quote = match.group('quote')
+        rest = match.group('rest')
+        if prefix == '/course/' and course_id is not None:
+            return "".join([quote, course_url, rest, quote])
+        if prefix == '/jump_to_id/' and jump_to_id_base_url is not None:
+            return "".join([quote, jump_to_id_base_url + rest, quote])
+        return _replace_static_url(
+            match.group(0), prefix, quote, rest, data_directory, course_id, static_asset_path
+        )
+
+    return _compiled_url_replace_regex(u'|'.join(prefixes)).sub(replace_url, text)
+
+
+def _replace_static_url(original, prefix, quote, rest, data_directory, course_id, static_asset_path):
+    """
+    Replace a single /static/ url matched by `process_static_urls`, as
+    described in `replace_static_urls`.
+    """
+    # Don't mess with things that end in '?raw'
+    if rest.endswith('?raw'):
+        return original
+
+    # In debug mode, if we can find the url as is,
+    if settings.DEBUG and finders.find(rest, True):
+        return original
+
+    # Outside of debug mode the static files can't change, and nor can
+    # contentstore urls, which don't depend on the asset's content; so
+    # resolved urls can be kept for the life of the process.
+    key = (rest, prefix, data_directory, course_id, static_asset_path)
+    if not settings.DEBUG:
+        with _STATIC_URLS_LOCK:
+            url = _STATIC_URLS.pop(key, None)
+            if url is not None:
+                _STATIC_URLS[key] = url
+                return "".join([quote, url, quote])
+
+    url = _resolve_static_url(prefix, rest, data_directory, course_id, static_asset_path)
+
+    if not settings.DEBUG:
+        with _STATIC_URLS_LOCK:
+            _STATIC_URLS[key] = url
+            while len(_STATIC_URLS) > STATIC_URL_CACHE_SIZE:
+                _STATIC_URLS.popitem(last=False)
+
+    return "".join([quote, url, quote])
+
+
+def _resolve_static_url(prefix, rest, data_directory, course_id, static_asset_path):
+    """
+    Returns the url to use in place of the /static/ url `prefix` + `rest`.
+    """
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    if (not static_asset_path) \
+            and course_id \
+            and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
+        # first look in the static file pipeline and see if we are trying to reference
+        # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+
+        exists_in_staticfiles_storage = False
+        try:
+            exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+
+        if exists_in_staticfiles_storage:
+            url = staticfiles_storage.url(rest)
         else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
+            # if not, then assume it's courseware specific content and then look in the
+            # Mongo-backed database
+            url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
 
-            try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
-                    url = staticfiles_storage.url(course_path)
-            # And if that fails, assume that it's course content, and add manually data directory
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-                url = "".join([prefix, course_path])
+            if AssetLocator.CANONICAL_NAMESPACE in url:
+                url = url.replace('block@', 'block/', 1)
 
-        return "".join([quote, url, quote])
+    # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+    else:
+        course_path = "/".join((static_asset_path or data_directory, rest))
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+        try:
+            if staticfiles_storage.exists(rest):
+                url = staticfiles_storage.url(rest)
+            else:
+                url = staticfiles_storage.url(course_path)
+        # And if that fails, assume that it's course content, and add manually data directory
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+            url = "".join([prefix, course_path])
+
+    return url
@@ -1,9 +1,12 @@
 import re
 
-from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=no-name-in-module
+from nose.tools import assert_equals, assert_true, assert_false, with_setup  # pylint: disable=no-name-in-module
 from static_replace import (
+    clear_static_url_cache,
     replace_static_urls,
     replace_course_urls,
+    replace_jump_to_id_urls,
+    replace_urls,
     _url_replace_regex,
     process_static_urls,
     make_static_urls_absolute
@@ -19,6 +22,7 @@ COURSE_KEY = SlashSeparatedCourseKey('org', 'course', 'run')
 STATIC_SOURCE = '"/static/file.png"'
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 def test_multi_replace():
     course_source = '"/course/file.png"'
 
@@ -63,6 +67,7 @@ def test_static_urls(mock_request):
     assert_equals(result, '\"http:///static/file.png\"')
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_exists(mock_storage):
     mock_storage.exists.return_value = True
@@ -73,6 +78,7 @@ def test_storage_url_exists(mock_storage):
     mock_storage.url.called_once_with('data_dir/file.png')
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_not_exists(mock_storage):
     mock_storage.exists.return_value = False
@@ -83,6 +89,7 @@ def test_storage_url_not_exists(mock_storage):
     mock_storage.url.called_once_with('file.png')
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 @patch('static_replace.StaticContent')
 @patch('static_replace.modulestore')
 def test_mongo_filestore(mock_modulestore, mock_static_content):
@@ -102,6 +109,7 @@ def test_mongo_filestore(mock_modulestore, mock_static_content):
     mock_static_content.convert_legacy_static_url_with_course_id.assert_called_once_with('file.png', COURSE_KEY)
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 @patch('static_replace.settings')
 @patch('static_replace.modulestore')
 @patch('static_replace.staticfiles_storage')
@@ -116,6 +124,7 @@ def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
     assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 def test_raw_static_check():
     """
     Make sure replace_static_urls leaves alone things that end in '.raw'
@@ -127,6 +136,7 @@ def test_raw_static_check():
     assert_equals(path, replace_static_urls(path, text))
 
 
+@with_setup(clear_static_url_cache, clear_static_url_cache)
 @patch('static_replace.staticfiles_storage')
 @patch('static_replace.modulestore')
 def test_static_url_with_query(mock_modulestore, mock_storage):
@@ -161,3 +171,41 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@with_setup(clear_static_url_cache, clear_static_url_cache)
+@patch('static_replace.staticfiles_storage')
+@patch('static_replace.modulestore')
+def test_replace_urls(mock_modulestore, mock_storage):
+    """
+    Make sure replace_urls does the work of replace_static_urls,
+    replace_course_urls and replace_jump_to_id_urls together.
+    """
+    mock_storage.exists.return_value = False
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+
+    text = '<a href="/course/info"><img src="/static/file.png"/></a><a href=\'/jump_to_id/abc\'>link</a>'
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(replace_static_urls(text, DATA_DIRECTORY, COURSE_KEY), COURSE_KEY),
+        COURSE_KEY,
+        jump_to_id_base_url
+    )
+    assert_equals(expected, replace_urls(text, DATA_DIRECTORY, COURSE_KEY, jump_to_id_base_url=jump_to_id_base_url))
+
+    # /course/ and /jump_to_id/ urls are left alone unless asked for
+    assert_equals(replace_static_urls(text, DATA_DIRECTORY), replace_urls(text, DATA_DIRECTORY))
+
+
+@with_setup(clear_static_url_cache, clear_static_url_cache)
+@patch('static_replace.staticfiles_storage')
+def test_static_urls_resolved_once(mock_storage):
+    """
+    Make sure each /static/ url is only looked up once.
+    """
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.abc123.png'
+
+    for __ in range(3):
+        assert_equals('"/static/file.abc123.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+    mock_storage.exists.assert_called_once_with('file.png')
@@ -1,5 +1,8 @@
 import re
 from django.conf import settings
+from django.core.cache import cache
+
+from capa.safe_exec import DiskCache, LayeredCache
 
 # We'll make assets named this be importable by Python code in the sandbox.
 PYTHON_LIB_ZIP = "python_lib.zip"
@@ -38,3 +41,27 @@ def get_python_lib_zip(contentstore, course_id):
         return zip_lib.data
     else:
         return None
+
+
+_SAFE_EXEC_DISK_CACHE = {}
+
+
+def safe_exec_cache():
+    """
+    Return the cache for the results of capa's safe_exec.
+
+    This is the default Django cache, behind a cache on local disk if
+    SAFE_EXEC_DISK_CACHE_DIR is set, so that results are shared by all the
+    processes of a server and survive restarts.
+    """
+    root = getattr(settings, 'SAFE_EXEC_DISK_CACHE_DIR', None)
+    if not root:
+        return cache
+
+    if root not in _SAFE_EXEC_DISK_CACHE:
+        _SAFE_EXEC_DISK_CACHE[root] = DiskCache(
+            root,
+            max_age=getattr(settings, 'SAFE_EXEC_DISK_CACHE_MAX_AGE', None),
+            max_entries=getattr(settings, 'SAFE_EXEC_DISK_CACHE_MAX_ENTRIES', None),
+        )
+    return LayeredCache(_SAFE_EXEC_DISK_CACHE[root], cache)
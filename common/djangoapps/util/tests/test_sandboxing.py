@@ -2,9 +2,14 @@
 Tests for sandboxing.py in util app
 """
 
+import shutil
+import tempfile
+
+from django.core.cache import cache
 from django.test import TestCase
 from opaque_keys.edx.locator import LibraryLocator
-from util.sandboxing import can_execute_unsafe_code
+from capa.safe_exec import DiskCache, LayeredCache
+from util.sandboxing import can_execute_unsafe_code, safe_exec_cache
 from django.test.utils import override_settings
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
@@ -37,3 +42,23 @@ class SandboxingTest(TestCase):
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2012_Fall')))
         self.assertFalse(can_execute_unsafe_code(SlashSeparatedCourseKey('edX', 'full', '2013_Spring')))
         self.assertFalse(can_execute_unsafe_code(LibraryLocator('edX', 'test_bank')))
+
+    def test_safe_exec_cache_default(self):
+        """
+        Without a disk cache directory, safe_exec uses the default cache
+        """
+        self.assertIs(safe_exec_cache(), cache)
+
+    def test_safe_exec_disk_cache(self):
+        """
+        With a disk cache directory, it goes in front of the default cache
+        """
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(SAFE_EXEC_DISK_CACHE_DIR=root, SAFE_EXEC_DISK_CACHE_MAX_ENTRIES=10):
+            layered = safe_exec_cache()
+        self.assertIsInstance(layered, LayeredCache)
+        self.assertIsInstance(layered.caches[0], DiskCache)
+        self.assertEqual(layered.caches[0].root, root)
+        self.assertEqual(layered.caches[0].max_entries, 10)
+        self.assertIs(layered.caches[1], cache)
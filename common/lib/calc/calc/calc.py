@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -224,38 +227,290 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+# The number of parsed expressions kept by `compile_expression`.
+COMPILED_EXPRESSION_CACHE_SIZE = 512
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+_COMPILED_EXPRESSIONS = OrderedDict()
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
-
-    return math_interpreter.reduce_tree(evaluate_actions)
+
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return a `CompiledExpression` for `math_expr`.
+
+    Parsing is by far the most expensive part of evaluating an expression, and
+    the same expressions (a problem's answer, a tolerance) are evaluated over
+    and over, so parsed expressions are kept in a bounded LRU cache keyed by
+    the expression text and case sensitivity. Expressions that fail to parse
+    raise `ParseException` and are not cached.
+    """
+    key = (math_expr, bool(case_sensitive))
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            _COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS[key] = compiled
+        while len(_COMPILED_EXPRESSIONS) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
+
+
+# Functions which accept and return NumPy arrays elementwise, and so can be
+# used in vectorized evaluation. `arccot` branches on its argument and the
+# factorials only take python integers.
+VECTORIZED_FUNCTIONS = frozenset(
+    func for func in DEFAULT_FUNCTIONS.values()
+    if func not in (functions.arccot, math.factorial)
+)
+
+
+class NotVectorizable(Exception):
+    """
+    Indicate that an expression can't be evaluated over arrays of samples at
+    once, and has to be evaluated one sample at a time.
+    """
+    pass
+
+
+def _is_operator(token):
+    """
+    Return whether `token` is an operator or parenthesis left in the tree.
+
+    The evaluation actions below receive NumPy arrays, which can't be compared
+    with `==` or tested with `isinstance(k, numbers.Number)` like the scalar
+    actions do.
+    """
+    return isinstance(token, basestring)
+
+
+def vector_atom(parse_result):
+    """
+    Like `eval_atom`, for array values.
+    """
+    return next(k for k in parse_result if not _is_operator(k))
+
+
+def vector_power(parse_result):
+    """
+    Like `eval_power`, for array values.
+    """
+    parse_result = reversed([k for k in parse_result if not _is_operator(k)])
+    return reduce(lambda a, b: b ** a, parse_result)
+
+
+def vector_parallel(parse_result):
+    """
+    Like `eval_parallel`, for array values.
+
+    Samples with a zero input evaluate to NaN in `eval_parallel`; rather than
+    reproduce that here, such expressions are evaluated one sample at a time.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    values = [k for k in parse_result if not _is_operator(k)]
+    if any(numpy.any(numpy.asarray(value) == 0) for value in values):
+        raise NotVectorizable("zero input to the parallel operator")
+    return 1. / sum(1. / value for value in values)
+
+
+def vector_sum(parse_result):
+    """
+    Like `eval_sum`, for array values.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if not _is_operator(token):
+            total = current_op(total, token)
+        elif token == '+':
+            current_op = operator.add
+        elif token == '-':
+            current_op = operator.sub
+    return total
+
+
+def vector_product(parse_result):
+    """
+    Like `eval_product`, for array values.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if not _is_operator(token):
+            prod = current_op(prod, token)
+        elif token == '*':
+            current_op = operator.mul
+        elif token == '/':
+            current_op = operator.truediv
+    return prod
+
+
+class CompiledExpression(object):
+    """
+    A math expression parsed once, which can then be evaluated any number of
+    times with different variables.
+
+    Use `compile_expression` to get one, rather than creating it directly, so
+    that the parse is shared.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        if case_sensitive:
+            self.casify = lambda x: x
+        else:
+            self.casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        # An empty expression evaluates to NaN without being parsed.
+        self.parser = None
+        if math_expr.strip() != "":
+            self.parser = ParseAugmenter(math_expr, case_sensitive)
+            self.parser.parse_algebra()
+
+    @property
+    def variables_used(self):
+        """
+        The variable names appearing in the expression, as typed.
+        """
+        return self.parser.variables_used if self.parser else set()
+
+    @property
+    def functions_used(self):
+        """
+        The function names appearing in the expression, as typed.
+        """
+        return self.parser.functions_used if self.parser else set()
+
+    def _reduce(self, all_variables, all_functions, actions):
+        """
+        Check the variables and functions used, then evaluate the tree with
+        `actions` for everything but variables and functions.
+        """
+        self.parser.check_variables(all_variables, all_functions)
+        casify = self.casify
+        evaluate_actions = dict(actions)
+        evaluate_actions.update({
+            'variable': lambda x: all_variables[casify(x[0])],
+            'function': lambda x: all_functions[casify(x[0])](x[1]),
+        })
+        return self.parser.reduce_tree(evaluate_actions)
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression; see `evaluator`.
+        """
+        if self.parser is None:
+            return float('nan')
+
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        return self._reduce(all_variables, all_functions, {
+            'number': eval_number,
+            'atom': eval_atom,
+            'power': eval_power,
+            'parallel': eval_parallel,
+            'product': eval_product,
+            'sum': eval_sum
+        })
+
+    def evaluate_samples(self, variables, functions, samples):
+        """
+        Evaluate the expression at each of `samples` and return a NumPy array
+        of the results, in order.
+
+        `variables` and `functions` are as for `evaluate`, and are shared by
+        all samples. `samples` is either a list of dictionaries from variable
+        name to value, which all name the same variables, or a dictionary from
+        variable name to a sequence (e.g. a NumPy array) of values, one per
+        sample.
+
+        Whenever possible the whole array of samples goes through a single
+        evaluation of the tree with NumPy arrays standing in for the sampled
+        variables. If that isn't possible (a function that doesn't work on
+        arrays, a value outside a function's domain, a division by zero...),
+        the samples are evaluated one at a time with `evaluate` instead, so the
+        results and errors are always the same as from `evaluator`.
+        """
+        columns = None
+        if isinstance(samples, dict):
+            columns = dict((name, numpy.asarray(values)) for name, values in samples.iteritems())
+            # Python scalars, so that falling back gives exactly the results
+            # of `evaluator` on the same values.
+            names = list(columns)
+            samples = [dict(zip(names, row)) for row in zip(*[columns[name].tolist() for name in names])]
+
+        if self.parser is None:
+            return numpy.array([float('nan')] * len(samples))
+        if not samples:
+            return numpy.array([])
+
+        try:
+            return self._evaluate_vectorized(variables, functions, samples, columns)
+        except (NotVectorizable, ArithmeticError, ValueError, TypeError):
+            pass
+
+        results = []
+        for sample in samples:
+            sample_variables = dict(variables)
+            sample_variables.update(sample)
+            results.append(self.evaluate(sample_variables, functions))
+        return numpy.array(results)
+
+    def _evaluate_vectorized(self, variables, functions, samples, columns=None):
+        """
+        Evaluate the expression once, over arrays of all the samples.
+
+        `columns` optionally gives the samples as arrays of values by variable.
+
+        Raise `NotVectorizable` or an arithmetic error if the result might not
+        match evaluating the samples one at a time.
+        """
+        if columns is None:
+            names = set(samples[0])
+            if any(set(sample) != names for sample in samples):
+                raise NotVectorizable("samples have different variables")
+            columns = dict((name, numpy.array([sample[name] for sample in samples])) for name in names)
+
+        sampled = {}
+        for name, values in columns.iteritems():
+            if values.dtype.kind in 'biu':
+                values = values.astype(float)
+            elif values.dtype.kind not in 'fc':
+                raise NotVectorizable(u"variable '{}' doesn't have numeric samples".format(name))
+            sampled[name] = values
+
+        all_variables = dict(variables)
+        all_variables.update(sampled)
+        all_variables, all_functions = add_defaults(all_variables, functions, self.case_sensitive)
+
+        casify = self.casify
+        for name in self.functions_used:
+            func = all_functions.get(casify(name))
+            if func is not None and func not in VECTORIZED_FUNCTIONS and not isinstance(func, numpy.ufunc):
+                raise NotVectorizable(u"function '{}' may not work on arrays".format(name))
+
+        # Anything that makes NumPy return inf or NaN for some sample raises
+        # instead, so those samples get the exact scalar behavior.
+        with numpy.errstate(all='raise', under='ignore'):
+            result = self._reduce(all_variables, all_functions, {
+                'number': eval_number,
+                'atom': vector_atom,
+                'power': vector_power,
+                'parallel': vector_parallel,
+                'product': vector_product,
+                'sum': vector_sum
+            })
+
+        # Expressions not using any sampled variable come out as one value.
+        result = numpy.asarray(result)
+        return result + numpy.zeros(len(samples), dtype=result.dtype)
 
 
 class ParseAugmenter(object):
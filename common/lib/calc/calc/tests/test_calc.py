@@ -559,3 +559,82 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and evaluating compiled expressions
+    over many samples at once.
+    """
+
+    def test_parse_is_cached(self):
+        """
+        The same expression is parsed once per case sensitivity.
+        """
+        compiled = calc.compile_expression('x^2 + sin(y)')
+        self.assertIs(compiled, calc.compile_expression('x^2 + sin(y)'))
+        self.assertIsNot(compiled, calc.compile_expression('x^2 + sin(y)', case_sensitive=True))
+        self.assertEqual(compiled.variables_used, set(['x', 'y']))
+        self.assertEqual(compiled.functions_used, set(['sin']))
+
+    def test_cache_is_bounded(self):
+        """
+        The least recently used expressions are dropped from the cache.
+        """
+        old_size = calc.calc.COMPILED_EXPRESSION_CACHE_SIZE
+        calc.calc.COMPILED_EXPRESSION_CACHE_SIZE = 2
+        self.addCleanup(setattr, calc.calc, 'COMPILED_EXPRESSION_CACHE_SIZE', old_size)
+
+        first = calc.compile_expression('1+1')
+        second = calc.compile_expression('2+2')
+        self.assertIs(first, calc.compile_expression('1+1'))
+        calc.compile_expression('3+3')
+        self.assertIs(first, calc.compile_expression('1+1'))
+        self.assertIsNot(second, calc.compile_expression('2+2'))
+
+    def test_evaluate_samples(self):
+        """
+        Evaluating samples at once gives the same results as one at a time.
+        """
+        expressions = [
+            'x^2 + 3*y', 'sin(x)*cos(y) - tan(x/y)', 'sec(x) + sqrt(y)',
+            'x || y', '-x^y^0.5', 'x*i + e^(y*j)', '5k*x + 2', 'pi',
+        ]
+        samples = [{'x': 0.5 + k, 'y': 1.25 + 2 * k} for k in range(10)]
+        variables = {'z': 3.0}
+
+        for expression in expressions:
+            results = calc.compile_expression(expression).evaluate_samples(variables, {}, samples)
+            self.assertEqual(len(results), len(samples))
+            for result, sample in zip(results, samples):
+                sample_variables = dict(variables)
+                sample_variables.update(sample)
+                expected = calc.evaluator(sample_variables, {}, expression)
+                self.assertAlmostEqual(result, expected, msg=expression)
+
+    def test_evaluate_samples_falls_back(self):
+        """
+        Samples that can't be evaluated together are evaluated one at a time,
+        with the same results as `evaluator`.
+        """
+        samples = [{'x': -1.0}, {'x': 0.0}, {'x': 4.0}]
+
+        sqrt = calc.compile_expression('sqrt(x)').evaluate_samples({}, {}, samples)
+        self.assertTrue(numpy.isnan(sqrt[0]))
+        self.assertEqual(list(sqrt[1:]), [0.0, 2.0])
+
+        parallel = calc.compile_expression('x || 2').evaluate_samples({}, {}, samples)
+        self.assertTrue(numpy.isnan(parallel[1]))
+        self.assertAlmostEqual(parallel[2], 4.0 / 3)
+
+        factorial = calc.compile_expression('fact(3) * f(x)').evaluate_samples(
+            {}, {'f': lambda x: x if x > 0 else 1}, samples
+        )
+        self.assertEqual(list(factorial), [6.0, 6.0, 24.0])
+
+    def test_evaluate_samples_undefined_vars(self):
+        """
+        Undefined variables are reported as by `evaluator`.
+        """
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.compile_expression('x+y').evaluate_samples({}, {}, [{'x': 1.0}])
@@ -13,11 +13,14 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from pytz import UTC
@@ -58,6 +61,12 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# The number of parsed problem templates kept by each process.
+PROBLEM_TEMPLATE_CACHE_SIZE = 1000
+
+_PROBLEM_TEMPLATES = OrderedDict()
+_PROBLEM_TEMPLATES_LOCK = threading.Lock()
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -156,15 +165,10 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        self.make_xml_compatible(self.tree)
+        # parse problem XML file into an element tree, starting from a
+        # pristine copy of the seed-independent parse of the same text
+        self.problem_text, template = self._get_problem_template(problem_text)
+        self.tree = deepcopy(template)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -195,6 +199,42 @@ class LoncapaProblem(object):
 
         self.extracted_tree = self._extract_html(self.tree)
 
+    def _get_problem_template(self, problem_text):
+        """
+        Return the seed-independent parse of `problem_text`: the text with
+        startouttext/endouttext converted, and its XML tree made compatible
+        by `make_xml_compatible`, as a (text, tree) tuple.
+
+        The same problem is loaded over and over for different students and
+        seeds, so parses are kept in a bounded per-process LRU cache keyed by a
+        hash of the problem text. The cached tree is shared: callers must copy
+        it before changing it.
+        """
+        if isinstance(problem_text, unicode):
+            key = hashlib.sha1(problem_text.encode('utf-8')).hexdigest()
+        else:
+            key = hashlib.sha1(problem_text).hexdigest()
+
+        with _PROBLEM_TEMPLATES_LOCK:
+            template = _PROBLEM_TEMPLATES.pop(key, None)
+            if template is not None:
+                _PROBLEM_TEMPLATES[key] = template
+                return template
+
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        tree = etree.XML(problem_text)
+        self.make_xml_compatible(tree)
+        template = (problem_text, tree)
+
+        with _PROBLEM_TEMPLATES_LOCK:
+            _PROBLEM_TEMPLATES[key] = template
+            while len(_PROBLEM_TEMPLATES) > PROBLEM_TEMPLATE_CACHE_SIZE:
+                _PROBLEM_TEMPLATES.popitem(last=False)
+        return template
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
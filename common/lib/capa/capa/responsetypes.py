@@ -36,13 +36,13 @@ from shapely.geometry import Point, MultiPoint
 import dogstats_wrapper as dog_stats_api
 
 # specific library imports
-from calc import evaluator, UndefinedVariable
+from calc import compile_expression, evaluator, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
 from datetime import datetime
 from pytz import UTC
 from .util import (
-    compare_with_tolerance, contextualize_text, convert_files_to_filenames,
+    compare_with_tolerance, compare_with_tolerance_many, contextualize_text, convert_files_to_filenames,
     is_list_of_files, find_with_default, default_tolerance
 )
 from lxml import etree
@@ -3315,86 +3315,76 @@ class FormulaResponse(LoncapaResponse):
         )
         return CorrectMap(self.answer_id, correctness)
 
-    def tupleize_answers(self, answer, var_dict_list):
+    def tupleize_answers(self, answer, var_samples):
         """
-        Takes in an answer and a list of dictionaries mapping variables to values.
-        Each dictionary represents a test case for the answer.
-        Returns a tuple of formula evaluation results.
+        Takes in an answer and the samples of the variables, as returned by
+        randomize_variables. Each sample represents a test case for the answer.
+        Returns a NumPy array of formula evaluation results, one per sample.
         """
         _ = self.capa_system.i18n.ugettext
 
-        out = []
-        for var_dict in var_dict_list:
-            try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
-                    answer,
-                    case_sensitive=self.case_sensitive,
-                ))
-            except UndefinedVariable as err:
+        try:
+            return compile_expression(answer, self.case_sensitive).evaluate_samples(dict(), dict(), var_samples)
+        except UndefinedVariable as err:
+            log.debug(
+                'formularesponse: undefined variable in formula=%s',
+                cgi.escape(answer)
+            )
+            raise StudentInputError(
+                _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+            )
+        except ValueError as err:
+            if 'factorial' in err.message:
+                # This is thrown when fact() or factorial() is used in a formularesponse answer
+                #   that tests on negative and/or non-integer inputs
+                # err.message will be: `factorial() only accepts integral values` or
+                # `factorial() not defined for negative values`
                 log.debug(
-                    'formularesponse: undefined variable in formula=%s',
+                    ('formularesponse: factorial function used in response '
+                     'that tests negative and/or non-integer inputs. '
+                     'Provided answer was: %s'),
                     cgi.escape(answer)
                 )
                 raise StudentInputError(
-                    _("Invalid input: {bad_input} not permitted in answer.").format(bad_input=err.message)
+                    _("factorial function not permitted in answer "
+                      "for this problem. Provided answer was: "
+                      "{bad_input}").format(bad_input=cgi.escape(answer))
                 )
-            except ValueError as err:
-                if 'factorial' in err.message:
-                    # This is thrown when fact() or factorial() is used in a formularesponse answer
-                    #   that tests on negative and/or non-integer inputs
-                    # err.message will be: `factorial() only accepts integral values` or
-                    # `factorial() not defined for negative values`
-                    log.debug(
-                        ('formularesponse: factorial function used in response '
-                         'that tests negative and/or non-integer inputs. '
-                         'Provided answer was: %s'),
-                        cgi.escape(answer)
-                    )
-                    raise StudentInputError(
-                        _("factorial function not permitted in answer "
-                          "for this problem. Provided answer was: "
-                          "{bad_input}").format(bad_input=cgi.escape(answer))
-                    )
-                # If non-factorial related ValueError thrown, handle it the same as any other Exception
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            # If non-factorial related ValueError thrown, handle it the same as any other Exception
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula.").format(
+                    bad_input=cgi.escape(answer)
                 )
-            except Exception as err:
-                # traceback.print_exc()
-                log.debug('formularesponse: error %s in formula', err)
-                raise StudentInputError(
-                    _("Invalid input: Could not parse '{bad_input}' as a formula").format(
-                        bad_input=cgi.escape(answer)
-                    )
+            )
+        except Exception as err:
+            # traceback.print_exc()
+            log.debug('formularesponse: error %s in formula', err)
+            raise StudentInputError(
+                _("Invalid input: Could not parse '{bad_input}' as a formula").format(
+                    bad_input=cgi.escape(answer)
                 )
-        return out
+            )
 
     def randomize_variables(self, samples):
         """
-        Returns a list of dictionaries mapping variables to random values in range,
-        as expected by tupleize_answers.
+        Returns a dictionary mapping each variable to a NumPy array of random
+        values in its range, one per sample, as expected by tupleize_answers.
+
+        All the samples are drawn at once, as a matrix with a row per sample
+        and a column per variable.
         """
         variables = samples.split('@')[0].split(',')
         numsamples = int(samples.split('@')[1].split('#')[1])
         sranges = zip(*map(lambda x: map(float, x.split(",")),
                            samples.split('@')[1].split('#')[0].split(':')))
-        ranges = dict(zip(variables, sranges))
-
-        out = []
-        for _ in range(numsamples):
-            var_dict = {}
-            # ranges give numerical ranges for testing
-            for var in ranges:
-                # TODO: allow specified ranges (i.e. integers and complex numbers) for random variables
-                value = random.uniform(*ranges[var])
-                var_dict[str(var)] = value
-            out.append(var_dict)
-        return out
+        ranges = zip(variables, sranges)
+
+        # TODO: allow specified ranges (i.e. integers and complex numbers) for random variables
+        lows = [srange[0] for __, srange in ranges]
+        highs = [srange[1] for __, srange in ranges]
+        sample_matrix = numpy.random.uniform(lows, highs, size=(numsamples, len(ranges)))
+        return dict((str(var), sample_matrix[:, index]) for index, (var, __) in enumerate(ranges))
 
     def check_formula(self, expected, given, samples):
         """
@@ -3402,13 +3392,18 @@ class FormulaResponse(LoncapaResponse):
         string, and a samples string, return whether the given answer is
         "correct" or "incorrect".
         """
-        var_dict_list = self.randomize_variables(samples)
-        student_result = self.tupleize_answers(given, var_dict_list)
-        instructor_result = self.tupleize_answers(expected, var_dict_list)
+        var_samples = self.randomize_variables(samples)
+        student_result = self.tupleize_answers(given, var_samples)
+        instructor_result = self.tupleize_answers(expected, var_samples)
+        return self.compare_results(student_result, instructor_result)
 
-        correct = all(compare_with_tolerance(student, instructor, self.tolerance)
-                      for student, instructor in zip(student_result, instructor_result))
-        if correct:
+    def compare_results(self, student_result, instructor_result):
+        """
+        Given the results of the student's and the instructor's formulas over
+        the same samples, return "correct" if they all match within tolerance,
+        else "incorrect".
+        """
+        if compare_with_tolerance_many(student_result, instructor_result, self.tolerance).all():
             return "correct"
         else:
             return "incorrect"
@@ -3446,6 +3441,9 @@ class FormulaResponse(LoncapaResponse):
     def check_hint_condition(self, hxml_set, student_answers):
         given = student_answers[self.answer_id]
         hints_to_show = []
+        # Hints with the same samples are checked against the same draw of the
+        # variables, so the student's answer is only evaluated once for them.
+        student_results = {}
         for hxml in hxml_set:
             samples = hxml.get('samples')
             name = hxml.get('name')
@@ -3453,10 +3451,13 @@ class FormulaResponse(LoncapaResponse):
                 hxml.get('answer'), self.context)
             # pylint: disable=broad-except
             try:
-                correctness = self.check_formula(
-                    correct_answer,
-                    given,
-                    samples
+                if samples not in student_results:
+                    var_samples = self.randomize_variables(samples)
+                    student_results[samples] = (var_samples, self.tupleize_answers(given, var_samples))
+                var_samples, student_result = student_results[samples]
+                correctness = self.compare_results(
+                    student_result,
+                    self.tupleize_answers(correct_answer, var_samples)
                 )
             except Exception:
                 correctness = 'incorrect'
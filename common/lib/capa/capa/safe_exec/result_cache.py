@@ -0,0 +1,177 @@
+"""
+Caches for safe_exec results, to layer in front of the cache supplied by the
+caller (usually memcache).
+
+safe_exec results depend only on the code, the globals and the random seed, so
+they can be kept for a long time.  A `DiskCache` keeps them in files local to
+the server, shared by all its processes and surviving restarts, and a
+`LayeredCache` puts it in front of the shared cache.
+"""
+
+import errno
+import hashlib
+import json
+import logging
+import os
+import os.path
+import tempfile
+import time
+
+log = logging.getLogger(__name__)
+
+# Entries are written to temporary files whose names start with this prefix,
+# and renamed into place once complete.  Cleanup leaves them alone unless they
+# are old enough to have been orphaned by a process that died while writing.
+TEMP_PREFIX = '.tmp-'
+STALE_TEMP_AGE = 60 * 60
+
+
+class DiskCache(object):
+    """
+    A cache in files under the directory `root`, with .get(key) and
+    .set(key, value) methods as safe_exec expects.
+
+    Values must be JSON-serializable, which safe_exec results are, and come
+    back as they would from a JSON round trip.  Entries older than `max_age`
+    seconds are ignored and removed, if given, so that results from old
+    versions of the sandbox's libraries eventually go away.  If `max_entries`
+    is given, the oldest entries are removed once there are more than that.
+    Both are enforced by `cleanup`, which each process runs after every
+    `cleanup_every` entries it writes.  Failing to read or write the cache is
+    logged, and otherwise treated as a miss.
+    """
+    def __init__(self, root, max_age=None, max_entries=None, cleanup_every=1000):
+        self.root = root
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.cleanup_every = cleanup_every
+        self._sets_since_cleanup = 0
+
+    def _path(self, key):
+        """
+        Return the name of the file holding the entry for `key`.
+        """
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        digest = hashlib.sha1(key).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _remove(self, path):
+        """
+        Remove the file `path` from the cache, if it is still there.
+        """
+        try:
+            os.unlink(path)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                log.warning("Couldn't remove safe_exec disk cache entry %s: %s", path, err)
+
+    def get(self, key):
+        """
+        Return the value cached for `key`, or None.
+        """
+        path = self._path(key)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                self._remove(path)
+                return None
+            with open(path) as cache_file:
+                return json.load(cache_file)
+        except (IOError, OSError) as err:
+            if err.errno != errno.ENOENT:
+                log.warning("Couldn't read safe_exec disk cache entry %s: %s", path, err)
+        except ValueError as err:
+            log.warning("Corrupt safe_exec disk cache entry %s: %s", path, err)
+        return None
+
+    def set(self, key, value):
+        """
+        Cache `value` for `key`.
+        """
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            try:
+                os.makedirs(directory)
+            except OSError as err:
+                if err.errno != errno.EEXIST:
+                    raise
+
+            # Write to a temporary file and rename it into place, so readers in
+            # other processes never see a partial entry.
+            handle, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+            try:
+                with os.fdopen(handle, 'w') as temp_file:
+                    json.dump(value, temp_file)
+                os.rename(temp_path, path)
+            except Exception:
+                os.unlink(temp_path)
+                raise
+        except (IOError, OSError, TypeError, ValueError) as err:
+            log.warning("Couldn't write safe_exec disk cache entry %s: %s", path, err)
+            return
+
+        self._sets_since_cleanup += 1
+        if self._sets_since_cleanup >= self.cleanup_every:
+            self.cleanup()
+
+    def cleanup(self):
+        """
+        Remove the entries older than `max_age`, then the oldest entries beyond
+        `max_entries`, and any orphaned temporary files.
+        """
+        self._sets_since_cleanup = 0
+        if self.max_age is None and self.max_entries is None:
+            return
+
+        now = time.time()
+        entries = []
+        for directory, __, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if filename.startswith(TEMP_PREFIX):
+                    if now - mtime > STALE_TEMP_AGE:
+                        self._remove(path)
+                elif self.max_age is not None and now - mtime > self.max_age:
+                    self._remove(path)
+                else:
+                    entries.append((mtime, path))
+
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            entries.sort()
+            for __, path in entries[:len(entries) - self.max_entries]:
+                self._remove(path)
+
+
+class LayeredCache(object):
+    """
+    A cache over several caches, tried in order.
+
+    Values found in a later cache are copied into the earlier ones, and values
+    are set in all of them.
+    """
+    def __init__(self, *caches):
+        self.caches = caches
+
+    def get(self, key):
+        """
+        Return the value cached for `key` in the first cache that has it, or None.
+        """
+        for index, cache in enumerate(self.caches):
+            value = cache.get(key)
+            if value is not None:
+                for earlier_cache in self.caches[:index]:
+                    earlier_cache.set(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        """
+        Cache `value` for `key` in every cache.
+        """
+        for cache in self.caches:
+            cache.set(key, value)
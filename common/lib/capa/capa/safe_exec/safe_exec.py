@@ -7,6 +7,9 @@ from . import lazymod
 from dogapi import dog_stats_api
 
 import hashlib
+import logging
+
+log = logging.getLogger(__name__)
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -70,6 +73,17 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def cache_key(code, globals_dict, random_seed):
+    """
+    Return the key under which `safe_exec` caches the result of running `code`
+    with `globals_dict` and `random_seed`.
+    """
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, json_safe(globals_dict))
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -109,11 +123,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = cache_key(code, globals_dict, random_seed)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -153,3 +163,230 @@ def safe_exec(
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+# The code run in the sandbox by `safe_exec_many`.  It runs `batch_code` once
+# for each of `batch_jobs`, as `safe_exec` would in a sandbox of its own, and
+# leaves the results in `results`.  Each run is made in a child process forked
+# from the driver, so that nothing it changes (the seeded random, numpy's
+# state, globals of imported modules) is seen by the next one.  Where the
+# sandbox doesn't allow forking, the run is made in the driver itself, which
+# then restores the random module and forgets modules imported from outside
+# the Python installation (i.e. the course's own code); such results are
+# marked as not isolated.
+BATCH_DRIVER = """\
+import json as _json
+import os as _os
+import os.path as _os_path
+import sys as _sys
+import traceback as _traceback
+
+_OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+_PREFIXES = [_os_path.abspath(_prefix) for _prefix in (_sys.prefix, _sys.exec_prefix)]
+
+
+def _jsonable(value):
+    if not isinstance(value, _OK_TYPES):
+        return False
+    try:
+        _json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def _is_installed(module):
+    filename = getattr(module, '__file__', None)
+    if filename is None:
+        return True
+    filename = _os_path.abspath(filename)
+    return any(filename.startswith(prefix) for prefix in _PREFIXES)
+
+
+def _run_job(job, prolog, lazy_imports, code):
+    job_globals = job['globals']
+    try:
+        job_code = compile(prolog % job['seed'] + lazy_imports + code, '<string>', 'exec', 0, True)
+        exec job_code in job_globals
+    except Exception:
+        exc_type, exc_value, exc_traceback = _sys.exc_info()
+        return {
+            'traceback': ''.join(_traceback.format_exception(exc_type, exc_value, exc_traceback.tb_next)),
+            'exception': '{0.__class__.__name__}: {0!s}'.format(exc_value),
+            'globals': None,
+        }
+    return {
+        'traceback': None,
+        'exception': None,
+        'globals': dict(
+            (name, value) for name, value in job_globals.iteritems()
+            if name != '__builtins__' and _jsonable(value)
+        ),
+    }
+
+
+def _run_job_in_child(job, prolog, lazy_imports, code):
+    read_fd, write_fd = _os.pipe()
+    try:
+        pid = _os.fork()
+    except OSError:
+        _os.close(read_fd)
+        _os.close(write_fd)
+        return None
+
+    if pid == 0:
+        status = 1
+        try:
+            _os.close(read_fd)
+            output = _json.dumps(_run_job(job, prolog, lazy_imports, code))
+            while output:
+                output = output[_os.write(write_fd, output):]
+            status = 0
+        finally:
+            _os._exit(status)
+
+    _os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = _os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    _os.close(read_fd)
+    __, status = _os.waitpid(pid, 0)
+    if status != 0:
+        message = 'Run exited with status {}'.format(status)
+        return {'traceback': message + '\\n', 'exception': message, 'globals': None}
+    return _json.loads(''.join(chunks))
+
+
+def _run_jobs(jobs, prolog, lazy_imports, code):
+    job_results = []
+    for job in jobs:
+        result = _run_job_in_child(job, prolog, lazy_imports, code)
+        if result is not None:
+            result['isolated'] = True
+            job_results.append(result)
+            continue
+
+        modules_before = set(_sys.modules)
+        random_before = _sys.modules.get('random')
+        result = _run_job(job, prolog, lazy_imports, code)
+        result['isolated'] = False
+        job_results.append(result)
+
+        if random_before is not None:
+            _sys.modules['random'] = random_before
+        for name in set(_sys.modules) - modules_before:
+            if not _is_installed(_sys.modules[name]):
+                del _sys.modules[name]
+    return job_results
+
+
+results = _run_jobs(batch_jobs, batch_prolog, batch_lazy_imports, batch_code)
+batch_jobs = batch_code = batch_prolog = batch_lazy_imports = None
+"""
+
+# How many runs `safe_exec_many` puts in one sandbox.  The sandbox's resource
+# limits apply to the whole batch.
+BATCH_SIZE = 20
+
+
+@dog_stats_api.timed('capa.safe_exec_many.time')
+def safe_exec_many(
+    code,
+    seeds_and_globals,
+    python_path=None,
+    extra_files=None,
+    cache=None,
+    slug=None,
+    unsafely=False,
+    batch_size=BATCH_SIZE,
+):
+    """
+    Execute the same python code safely for many random seeds.
+
+    This is `safe_exec` for each (random_seed, globals_dict) pair in
+    `seeds_and_globals`, but the runs that aren't already cached are made in
+    batches of `batch_size`, each batch in a single sandbox, rather than
+    launching a sandbox per run.  Each globals_dict is updated as `safe_exec`
+    would update it.  Each run is made in a process of its own within the
+    sandbox where the sandbox allows it, and then its result is cached under
+    the key `safe_exec` uses, so later `safe_exec` calls for the same seed and
+    globals hit the cache.
+
+    The other arguments are as for `safe_exec`.
+
+    Returns a list with, for each pair in order, None if the code ran, else the
+    SafeExecException that `safe_exec` would have raised.
+
+    If a whole batch fails, e.g. because it went over the sandbox's resource
+    limits, its runs are made one at a time with `safe_exec` instead.
+    """
+    exceptions = [None] * len(seeds_and_globals)
+
+    pending = []
+    for index, (random_seed, globals_dict) in enumerate(seeds_and_globals):
+        key = None
+        if cache:
+            key = cache_key(code, globals_dict, random_seed)
+            cached = cache.get(key)
+            if cached is not None:
+                emsg, cleaned_results = cached
+                globals_dict.update(cleaned_results)
+                if emsg:
+                    exceptions[index] = SafeExecException(emsg)
+                continue
+        pending.append((index, random_seed, globals_dict, key))
+
+    if unsafely:
+        exec_fn = codejail_not_safe_exec
+    else:
+        exec_fn = codejail_safe_exec
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        batch_globals = {
+            'batch_jobs': [
+                {'seed': random_seed, 'globals': json_safe(globals_dict)}
+                for __, random_seed, globals_dict, __ in batch
+            ],
+            'batch_code': code,
+            'batch_prolog': CODE_PROLOG,
+            'batch_lazy_imports': LAZY_IMPORTS,
+        }
+        try:
+            exec_fn(
+                BATCH_DRIVER, batch_globals,
+                python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+        except SafeExecException:
+            log.warning("Batch of %d runs of %s failed, running them one at a time", len(batch), slug)
+            for index, random_seed, globals_dict, __ in batch:
+                try:
+                    safe_exec(
+                        code, globals_dict, random_seed=random_seed, python_path=python_path,
+                        extra_files=extra_files, cache=cache, slug=slug, unsafely=unsafely,
+                    )
+                except SafeExecException as exc:
+                    exceptions[index] = exc
+            continue
+
+        for (index, __, globals_dict, key), result in zip(batch, batch_globals['results']):
+            if result['traceback'] is None:
+                emsg = None
+                globals_dict.update(result['globals'])
+            elif unsafely:
+                # The message codejail's not_safe_exec would have raised.
+                emsg = result['exception']
+            else:
+                # The message codejail's safe_exec would have raised.
+                emsg = "Couldn't execute jailed code: " + result['traceback']
+            if emsg:
+                exceptions[index] = SafeExecException(emsg)
+            # A run that shared its process with others may have seen their
+            # state, so it isn't cached for `safe_exec` to find.
+            if cache and result['isolated']:
+                cache.set(key, (emsg, json_safe(globals_dict)))
+
+    return exceptions
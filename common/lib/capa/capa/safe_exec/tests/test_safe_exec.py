@@ -4,12 +4,17 @@ import hashlib
 import os
 import os.path
 import random
+import shutil
+import tempfile
 import textwrap
+import time
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, safe_exec_many, update_hash, DiskCache, LayeredCache
+from capa.safe_exec.result_cache import STALE_TEMP_AGE, TEMP_PREFIX
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +182,168 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestSafeExecResultCaches(unittest.TestCase):
+    """Test the caches that can be layered in front of safe_exec's cache."""
+
+    def setUp(self):
+        super(TestSafeExecResultCaches, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_disk_cache(self):
+        disk_cache = DiskCache(self.root)
+        self.assertIsNone(disk_cache.get("safe_exec.17.abc"))
+        disk_cache.set("safe_exec.17.abc", (None, {'a': 17}))
+
+        # Results come back as they would from JSON, in any process.
+        self.assertEqual(DiskCache(self.root).get("safe_exec.17.abc"), [None, {'a': 17}])
+        self.assertIsNone(disk_cache.get("safe_exec.18.abc"))
+
+    def test_disk_cache_max_age(self):
+        DiskCache(self.root).set("key", (None, {}))
+        self.assertIsNotNone(DiskCache(self.root, max_age=60).get("key"))
+
+        path = DiskCache(self.root)._path("key")  # pylint: disable=protected-access
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        self.assertIsNone(DiskCache(self.root, max_age=60).get("key"))
+        # and the expired entry is removed
+        self.assertFalse(os.path.exists(path))
+
+    def test_disk_cache_cleanup(self):
+        disk_cache = DiskCache(self.root, max_age=60, max_entries=2, cleanup_every=4)
+        paths = []
+        for key, age in [("expired", 120), ("old", 50), ("newer", 10)]:
+            disk_cache.set(key, (None, {}))
+            path = disk_cache._path(key)  # pylint: disable=protected-access
+            mtime = time.time() - age
+            os.utime(path, (mtime, mtime))
+            paths.append(path)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        # The fourth entry written cleans up: the expired entry is removed, and
+        # then the oldest one to get back to two entries.
+        disk_cache.set("newest", (None, {}))
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False, True])
+        self.assertEqual(disk_cache.get("newest"), [None, {}])
+
+    def test_disk_cache_cleanup_skips_temp_files(self):
+        disk_cache = DiskCache(self.root, max_entries=0)
+        directory = os.path.join(self.root, "ab")
+        os.makedirs(directory)
+        __, in_flight = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        __, orphaned = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+        old = time.time() - 2 * STALE_TEMP_AGE
+        os.utime(orphaned, (old, old))
+
+        disk_cache.cleanup()
+        self.assertTrue(os.path.exists(in_flight))
+        self.assertFalse(os.path.exists(orphaned))
+
+    def test_safe_exec_with_layered_cache(self):
+        memory = {}
+        cache = LayeredCache(DiskCache(self.root), DictCache(memory))
+
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(len(memory), 1)
+
+        # A result only in the later cache is copied into the disk cache.
+        key = memory.keys()[0]
+        memory[key] = (None, {'a': 17})
+        other_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, other_root)
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=LayeredCache(DiskCache(other_root), DictCache(memory)))
+        self.assertEqual(g['a'], 17)
+        self.assertEqual(DiskCache(other_root).get(key), [None, {'a': 17}])
+
+        # The disk cache answers without asking the later cache.
+        memory.clear()
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=cache)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(memory, {})
+
+
+class TestSafeExecMany(unittest.TestCase):
+    """Test running the same code for many seeds at once."""
+
+    CODE = textwrap.dedent("""
+        import random as imported_random
+        a = random.randint(0, 999)
+        b = imported_random.randint(0, 999)
+        if a % 3 == 0:
+            raise ValueError("multiple of three")
+        """)
+
+    def test_same_results_as_safe_exec(self):
+        seeds = range(12)
+        batched = [(seed, {'x': seed}) for seed in seeds]
+        exceptions = safe_exec_many(self.CODE, batched, batch_size=5)
+
+        for seed, (__, g), exception in zip(seeds, batched, exceptions):
+            expected = {'x': seed}
+            try:
+                safe_exec(self.CODE, expected, random_seed=seed)
+            except SafeExecException as exc:
+                self.assertIsNotNone(exception)
+                self.assertIn("multiple of three", exc.message)
+                self.assertIn("multiple of three", exception.message)
+            else:
+                self.assertIsNone(exception)
+            self.assertEqual(g, expected)
+
+    def test_same_errors_as_unsafe_exec(self):
+        seeds = range(6)
+        batched = [(seed, {}) for seed in seeds]
+        exceptions = safe_exec_many(self.CODE, batched, unsafely=True)
+
+        for seed, exception in zip(seeds, exceptions):
+            try:
+                safe_exec(self.CODE, {}, random_seed=seed, unsafely=True)
+            except SafeExecException as exc:
+                self.assertEqual(exception.message, exc.message)
+            else:
+                self.assertIsNone(exception)
+
+    def test_runs_do_not_share_module_state(self):
+        code = textwrap.dedent("""
+            import math
+            math.runs = getattr(math, 'runs', 0) + 1
+            runs = math.runs
+            """)
+        batched = [(seed, {}) for seed in range(4)]
+        safe_exec_many(code, batched, unsafely=True)
+        self.assertEqual([g['runs'] for __, g in batched], [1, 1, 1, 1])
+
+    def test_shared_runs_not_cached(self):
+        cache = {}
+        batched = [(seed, {}) for seed in range(4)]
+        with patch('os.fork', side_effect=OSError):
+            exceptions = safe_exec_many(self.CODE, batched, cache=DictCache(cache), unsafely=True)
+        self.assertEqual(len(exceptions), 4)
+        self.assertEqual(cache, {})
+
+    def test_populates_safe_exec_cache(self):
+        cache = {}
+        batched = [(seed, {}) for seed in range(6)]
+        exceptions = safe_exec_many(self.CODE, batched, cache=DictCache(cache))
+        self.assertEqual(len(cache), 6)
+
+        # safe_exec now finds each result in the cache.
+        for (seed, g), exception in zip(batched, exceptions):
+            cached_g = {}
+            if exception:
+                with self.assertRaises(SafeExecException):
+                    safe_exec(self.CODE, cached_g, random_seed=seed, cache=DictCache(cache))
+            else:
+                safe_exec(self.CODE, cached_g, random_seed=seed, cache=DictCache(cache))
+                self.assertEqual(cached_g, g)
+        self.assertEqual(len(cache), 6)
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
@@ -29,6 +29,22 @@ class CapaHtmlRenderTest(unittest.TestCase):
         etree.XML(problem.get_html())
         # TODO: This test should inspect the rendered html and assert one or more things about it
 
+    def test_problem_template_is_reused(self):
+        """
+        Problems with the same text share a single parse, but each gets its
+        own tree.
+        """
+        xml_str = StringResponseXMLFactory().build_xml(answer="Reused", case_sensitive=False)
+
+        with mock.patch('capa.capa_problem.etree.XML', wraps=etree.XML) as mock_xml:
+            first = new_loncapa_problem(xml_str, seed=1)
+            second = new_loncapa_problem(xml_str, seed=2)
+        self.assertEqual(mock_xml.call_count, 1)
+
+        self.assertIsNot(first.tree, second.tree)
+        self.assertEqual(etree.tostring(first.tree), etree.tostring(second.tree))
+        self.assertEqual(first.problem_text, second.problem_text)
+
     def test_include_html(self):
         # Create a test file to include
         self._create_test_file(
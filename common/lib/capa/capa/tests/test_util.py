@@ -4,7 +4,7 @@ Tests capa util
 import unittest
 
 from . import test_capa_system
-from capa.util import compare_with_tolerance, sanitize_html
+from capa.util import compare_with_tolerance, compare_with_tolerance_many, sanitize_html
 
 
 class UtilTest(unittest.TestCase):
@@ -105,6 +105,19 @@ class UtilTest(unittest.TestCase):
         result = compare_with_tolerance(111.0, complex(100.0, 0), '10%', True)
         self.assertTrue(result)
 
+    def test_compare_with_tolerance_many(self):
+        infinity = float('Inf')
+        student = [100.0, 100.001, 101.0, 100.01, 100.001, infinity, infinity, float('nan'), 3 + 4j, 3 + 4.1j]
+        instructor = [100.0, 100.0, 100.0, 100.0, 100.0, 100.0, infinity, 1.0, 3 + 4j, 3 + 4j]
+        for tolerance, relative in [('0.001%', False), ('10%', False), ('10%', True), ('0.01', False),
+                                    (0.01, False), (0.001, False), ('0.01%', False), (0.1, True)]:
+            expected = [
+                compare_with_tolerance(student_value, instructor_value, tolerance, relative)
+                for student_value, instructor_value in zip(student, instructor)
+            ]
+            result = compare_with_tolerance_many(student, instructor, tolerance, relative)
+            self.assertEqual(list(result), expected, (tolerance, relative))
+
     def test_sanitize_html(self):
         """
         Test for html sanitization with bleach.
@@ -4,6 +4,8 @@ Utility functions for capa.
 import bleach
 from decimal import Decimal
 
+import numpy
+
 from calc import evaluator
 from cmath import isinf, isnan
 #-----------------------------------------------------------------------------
@@ -88,6 +90,51 @@ def compare_with_tolerance(student_complex, instructor_complex, tolerance=defaul
         return abs(student_complex - instructor_complex) <= tolerance
 
 
+def compare_with_tolerance_many(student_values, instructor_values, tolerance=default_tolerance,
+                                relative_tolerance=False):
+    """
+    Compare arrays of student and instructor results elementwise, as
+    `compare_with_tolerance` does for one pair; return an array of booleans.
+
+    The comparison is done with NumPy arrays. `compare_with_tolerance` compares
+    real numbers as Decimals of their `str()`, which rounds them to 12
+    significant digits, so the elements whose difference is too close to the
+    tolerance for that rounding to be ignored, as well as infinite and NaN
+    results, are compared with `compare_with_tolerance` itself.
+    """
+    student = numpy.asarray(student_values)
+    instructor = numpy.asarray(instructor_values)
+
+    if isinstance(tolerance, str):
+        if tolerance == default_tolerance:
+            relative_tolerance = True
+        if tolerance.endswith('%'):
+            tolerance = evaluator(dict(), dict(), tolerance[:-1]) * 0.01
+            if not relative_tolerance:
+                tolerance = tolerance * numpy.abs(instructor)
+        else:
+            tolerance = evaluator(dict(), dict(), tolerance)
+
+    if relative_tolerance:
+        tolerance = tolerance * numpy.maximum(numpy.abs(student), numpy.abs(instructor))
+    tolerance = numpy.broadcast_arrays(tolerance, student)[0]
+
+    with numpy.errstate(all='ignore'):
+        difference = numpy.abs(student - instructor)
+        is_real = (numpy.imag(student) == 0) & (numpy.imag(instructor) == 0)
+        margin = 1e-11 * (numpy.abs(student) + numpy.abs(instructor) + numpy.abs(tolerance))
+        exact = numpy.isfinite(student) & numpy.isfinite(instructor) & numpy.isfinite(tolerance)
+
+        result = difference <= tolerance
+        undecided = ~exact | (is_real & (numpy.abs(difference - tolerance) <= margin))
+
+    for index in numpy.flatnonzero(undecided):
+        result.flat[index] = compare_with_tolerance(
+            student.flat[index].item(), instructor.flat[index].item(), tolerance.flat[index].item()
+        )
+    return result
+
+
 def contextualize_text(text, context):  # private
     """
     Takes a string with variables. E.g. $a+$b.
@@ -327,10 +327,34 @@ class BulkOperationsMixin(object):
             bulk_ops_record.has_library_updated_item = False
 
 
+def _slotted_getstate(obj):
+    """
+    Return the pickle/copy state of a slotted object as a dict, the same shape
+    as the ``__dict__`` that was pickled before the class grew ``__slots__``.
+    """
+    return {name: getattr(obj, name) for name in obj.__slots__ if hasattr(obj, name)}
+
+
+def _slotted_setstate(obj, state):
+    """
+    Restore a slotted object from a state dict (including ones pickled from the
+    old ``__dict__``-based objects, e.g. still sitting in the structure cache).
+    """
+    for name, value in state.iteritems():
+        setattr(obj, name, value)
+
+
 class EditInfo(object):
     """
     Encapsulates the editing info of a block.
     """
+    # There is one of these per block in every loaded structure, so don't pay
+    # for a per-instance __dict__.
+    __slots__ = (
+        'previous_version', 'update_version', 'source_version', 'edited_on', 'edited_by',
+        'original_usage', 'original_usage_version', '_subtree_edited_on', '_subtree_edited_by',
+    )
+
     def __init__(self, **kwargs):
         self.from_storable(kwargs)
 
@@ -406,6 +430,9 @@ class EditInfo(object):
         """
         return not self == edit_info
 
+    __getstate__ = _slotted_getstate
+    __setstate__ = _slotted_setstate
+
 
 class BlockData(object):
     """
@@ -413,6 +440,8 @@ class BlockData(object):
     Allows the storing of meta-information about a structure that doesn't persist along with
     the structure itself.
     """
+    __slots__ = ('definition_loaded', 'fields', 'block_type', 'definition', 'defaults', 'edit_info')
+
     def __init__(self, **kwargs):
         # Has the definition been loaded?
         self.definition_loaded = False
@@ -476,6 +505,9 @@ class BlockData(object):
         """
         return not self == block_data
 
+    __getstate__ = _slotted_getstate
+    __setstate__ = _slotted_setstate
+
 
 new_contract('BlockData', BlockData)
 
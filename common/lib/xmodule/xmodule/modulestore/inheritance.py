@@ -3,6 +3,7 @@ Support for inheritance of fields down an XBlock hierarchy.
 """
 from __future__ import absolute_import
 
+import copy
 from datetime import datetime
 from pytz import UTC
 from xmodule.partitions.partitions import UserPartition
@@ -277,6 +278,24 @@ class InheritingFieldData(KvsFieldData):
         return super(InheritingFieldData, self).default(block, name)
 
 
+class PrecomputedInheritingFieldData(InheritingFieldData):
+    """
+    An `InheritingFieldData` whose inherited values were computed ahead of time
+    and put in the kvs's `inherited_settings`, so reading an inherited value doesn't
+    have to walk up (and load) the block's ancestors.
+    """
+
+    def default(self, block, name):
+        """
+        The default for an inheritable name is the precomputed inherited value.
+        """
+        if name in self.inheritable_names and name in self._kvs.inherited_settings:
+            # the inherited settings are shared with other blocks, so don't hand out
+            # values which the caller could mutate
+            return copy.deepcopy(self._kvs.inherited_settings[name])
+        return super(InheritingFieldData, self).default(block, name)
+
+
 def inheriting_field_data(kvs):
     """Create an InheritanceFieldData that inherits the names in InheritanceMixin."""
     return InheritingFieldData(
@@ -77,6 +77,12 @@ _OSFS_INSTANCE = {}
 
 _DETACHED_CATEGORIES = [name for name, __ in XBlock.load_tagged_classes("detached")]
 
+# how long (in seconds) one process may hold the right to rebuild a course's metadata inheritance tree
+METADATA_INHERITANCE_REBUILD_TIMEOUT = 60
+# how long (in seconds) the last computed metadata inheritance tree is kept, to be used while
+# another process rebuilds the tree
+METADATA_INHERITANCE_STALE_TIMEOUT = 7 * 24 * 60 * 60
+
 
 class MongoRevisionKey(object):
     """
@@ -775,6 +781,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
                 tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                if not tree:
+                    tree = self._rebuild_cached_metadata_inheritance_tree(course_id)
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
@@ -784,14 +792,30 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         if not tree:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self._compute_metadata_inheritance_tree(course_id)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            self._set_cached_metadata_inheritance_tree(course_id, tree)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+
+        return tree
+
+    def _set_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Write out the computed tree to the caching subsystem (e.g. memcached), if available,
+        along with a longer lived copy to use while the tree is being rebuilt.
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            self.metadata_inheritance_cache_subsystem.set(
+                u'{}.stale'.format(course_id), tree, METADATA_INHERITANCE_STALE_TIMEOUT
+            )
+
+    def _set_request_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Put the tree in the request_cache, if available.
+        """
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -799,7 +823,25 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
 
-        return tree
+    def _rebuild_cached_metadata_inheritance_tree(self, course_id):
+        """
+        Recompute the course's tree after it has fallen out of the caching subsystem.
+
+        Only one process at a time rebuilds a course's tree. The others use the last tree
+        computed for the course, if there is one, rather than all querying for the course's
+        containers at once.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        rebuilding_key = u'{}.rebuilding'.format(course_id)
+        if cache.add(rebuilding_key, True, METADATA_INHERITANCE_REBUILD_TIMEOUT):
+            try:
+                tree = self._compute_metadata_inheritance_tree(course_id)
+                self._set_cached_metadata_inheritance_tree(course_id, tree)
+            finally:
+                cache.delete(rebuilding_key)
+            return tree
+
+        return cache.get(u'{}.stale'.format(course_id), {})
 
     def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
         """
@@ -816,6 +858,93 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
+    def _get_inheritance_record(self, location):
+        """
+        Return the inheritable metadata and children persisted for location (or None), for
+        comparing with an update to it in _patch_cached_metadata_inheritance_tree.
+
+        Nothing is fetched where the tree can't be patched anyway: for leaves (whose updates
+        don't need the record), without a caching subsystem, or within a bulk operation.
+        """
+        if location.category not in BLOCK_TYPES_WITH_CHILDREN or self.metadata_inheritance_cache_subsystem is None:
+            return None
+        if self._is_in_bulk_operation(self.fill_in_run(location.course_key.for_branch(None))):
+            return None
+        record_filter = {'definition.children': 1}
+        for field_name in InheritanceMixin.fields:
+            record_filter['metadata.{0}'.format(field_name)] = 1
+        return self.collection.find_one({'_id': location.to_deprecated_son()}, record_filter)
+
+    def _patch_cached_metadata_inheritance_tree(self, xblock, metadata, children, previous_record):
+        """
+        Bring the cached metadata inheritance tree up to date with an update to xblock,
+        without recomputing the course's whole tree, where that's possible:
+
+        * the tree doesn't hold leaves' own settings, so updating a leaf changes nothing;
+        * nor does updating a container without changing its inheritable settings or children;
+        * a container which only gained leaf children gets tree entries for them.
+
+        Children which were removed keep their entries, as the full computation (which
+        merges draft and published children) would often keep them anyway.
+
+        Arguments:
+            xblock: the updated xblock
+            metadata (dict): xblock's serialized settings, as persisted
+            children (list): xblock's serialized children, as persisted (or None if it has none)
+            previous_record (dict): what _get_inheritance_record returned before the update
+
+        Returns False if the tree has to be recomputed.
+        """
+        location = xblock.scope_ids.usage_id
+        course_id = self.fill_in_run(location.course_key.for_branch(None))
+        if self._is_in_bulk_operation(course_id):
+            # the tree gets refreshed at the end of the bulk operation
+            return False
+        if location.category not in BLOCK_TYPES_WITH_CHILDREN:
+            return True
+        if previous_record is None or self.metadata_inheritance_cache_subsystem is None:
+            return False
+
+        def inheritable(settings):
+            """
+            The inheritable fields of settings
+            """
+            return {
+                field_name: value for field_name, value in settings.iteritems()
+                if field_name in InheritanceMixin.fields
+            }
+
+        inherited = inheritable(metadata)
+        if inheritable(previous_record.get('metadata', {})) != inherited:
+            return False
+        previous_children = set(previous_record.get('definition', {}).get('children', []))
+        added_children = [child for child in children or [] if child not in previous_children]
+        if not added_children:
+            return True
+        if any(
+            course_id.make_usage_key_from_deprecated_string(child).category in BLOCK_TYPES_WITH_CHILDREN
+            for child in added_children
+        ):
+            return False
+
+        tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id))
+        if not tree:
+            return False
+        location_url = unicode(as_published(location))
+        if location.category != 'course':
+            if location_url not in tree:
+                return False
+            inherited = {
+                field_name: value for field_name, value in tree[location_url].iteritems() if field_name != 'parent'
+            }
+        for child in added_children:
+            tree[child] = dict(inherited, parent={self.get_branch_setting(): location_url})
+
+        self._set_cached_metadata_inheritance_tree(course_id, tree)
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+        xblock.runtime.cached_metadata = tree
+        return True
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -836,13 +965,35 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         }
         return list(self.collection.find(query))
 
-    def _cache_children(self, course_key, items, depth=0):
+    @autoretry_read()
+    def _query_course_for_cache_children(self, course_key, categories=None, revision=None):
+        """
+        Return the payloads of all of the course's items with the given revision, or only of
+        those in categories if given.
+        """
+        query = SON([
+            ('_id.tag', 'i4x'),
+            ('_id.org', course_key.org),
+            ('_id.course', course_key.course),
+        ])
+        if categories is not None:
+            query['_id.category'] = {'$in': list(categories)}
+        query['_id.revision'] = revision
+        return list(self.collection.find(query))
+
+    def _cache_children(self, course_key, items, depth=0, categories=None):
         """
         Returns a dictionary mapping Location -> item data, populated with json data
         for all descendents of items up to the specified depth.
         (0 = no descendents, 1 = children, 2 = grandchildren, etc)
         If depth is None, will load all the children.
-        This will make a number of queries that is linear in the depth.
+        If categories is given, only descendents in those categories are loaded (and only
+        their children are followed), e.g. ['chapter', 'sequential'] for a table of contents.
+
+        When items include the course and either all of its descendents or only some
+        categories are wanted, everything is fetched in one query for the whole course
+        (plus one for drafts). Otherwise this makes a number of queries that is linear in
+        the depth.
         """
 
         data = {}
@@ -850,6 +1001,15 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         course_key = self.fill_in_run(course_key)
         parent_cache = self._get_parent_cache(self.get_branch_setting())
 
+        course_items = None
+        if (depth is None or categories is not None) and any(
+                item['_id']['category'] == 'course' for item in items
+        ):
+            course_items = {
+                as_published(Location._from_deprecated_son(item['_id'], course_key.run)): item
+                for item in self._query_course_for_cache_children(course_key, categories)
+            }
+
         while to_process and depth is None or depth >= 0:
             children = []
             for item in to_process:
@@ -864,11 +1024,23 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if depth == 0:
                 break
 
-            # Load all children by id. See
-            # http://www.mongodb.org/display/DOCS/Advanced+Queries#AdvancedQueries-%24or
-            # for or-query syntax
+            if categories is not None:
+                children = [
+                    child for child in children
+                    if course_key.make_usage_key_from_deprecated_string(child).category in categories
+                ]
+
             to_process = []
-            if children:
+            if course_items is not None:
+                # each payload is only processed once, even if it appears under several parents
+                to_process = filter(None, [
+                    course_items.pop(course_key.make_usage_key_from_deprecated_string(child), None)
+                    for child in children
+                ])
+            elif children:
+                # Load all children by id. See
+                # http://www.mongodb.org/display/DOCS/Advanced+Queries#AdvancedQueries-%24or
+                # for or-query syntax
                 to_process = self._query_children_for_cache_children(course_key, children)
 
             # If depth is None, then we just recurse until we hit all the descendents
@@ -947,13 +1119,14 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return system.load_item(location, for_parent=for_parent)
 
-    def _load_items(self, course_key, items, depth=0, using_descriptor_system=None, for_parent=None):
+    def _load_items(self, course_key, items, depth=0, using_descriptor_system=None, for_parent=None,
+                    categories=None):
         """
-        Load a list of xmodules from the data in items, with children cached up
-        to specified depth
+        Load a list of xmodules from the data in items, with children (in categories, if
+        given) cached up to specified depth
         """
         course_key = self.fill_in_run(course_key)
-        data_cache = self._cache_children(course_key, items, depth)
+        data_cache = self._cache_children(course_key, items, depth, categories)
 
         # if we are loading a course object, if we're not prefetching children (depth != 0) then don't
         # bother with the metadata inheritance
@@ -1041,7 +1214,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         course_key = self.fill_in_run(course_key)
         location = course_key.make_usage_key('course', course_key.run)
         try:
-            return self.get_item(location, depth=depth)
+            return self.get_item(location, depth=depth, categories=kwargs.get('categories'))
         except ItemNotFoundError:
             return None
 
@@ -1099,6 +1272,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 calls to get_children() to cache. None indicates to cache all descendents.
             using_descriptor_system (CachingDescriptorSystem): The existing CachingDescriptorSystem
                 to add data to, and to load the XBlocks from.
+            categories (list): If given, only prefetch descendents in these categories (e.g.,
+                ['chapter', 'sequential'] when only building a table of contents).
         """
         item = self._find_one(usage_key)
         module = self._load_items(
@@ -1107,6 +1282,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             depth,
             using_descriptor_system=using_descriptor_system,
             for_parent=for_parent,
+            categories=kwargs.get('categories'),
         )[0]
         return module
 
@@ -1449,9 +1625,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 payload['edit_info']['published_date'] = xblock._edit_info['published_date']
                 payload['edit_info']['published_by'] = xblock._edit_info['published_by']
 
+            children = None
             if xblock.has_children:
-                children = self._serialize_scope(xblock, Scope.children)
-                payload.update({'definition.children': children['children']})
+                children = self._serialize_scope(xblock, Scope.children)['children']
+                payload.update({'definition.children': children})
 
                 # Remove all old pointers to me, then add my current children back
                 parent_cache = self._get_parent_cache(self.get_branch_setting())
@@ -1459,6 +1636,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 for child in xblock.children:
                     parent_cache.set(unicode(child), xblock.location)
 
+            previous_inheritance_record = self._get_inheritance_record(xblock.scope_ids.usage_id)
+
             self._update_single_item(xblock.scope_ids.usage_id, payload, allow_not_found=allow_not_found)
 
             # update subtree edited info for ancestors
@@ -1473,8 +1652,11 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # update the edit info of the instantiated xblock
             xblock._edit_info = payload['edit_info']
 
-            # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            # update (or if need be, recompute) the metadata inheritance tree which is cached
+            if not self._patch_cached_metadata_inheritance_tree(
+                    xblock, payload['metadata'], children, previous_inheritance_record
+            ):
+                self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
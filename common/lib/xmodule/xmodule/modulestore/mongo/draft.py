@@ -83,13 +83,13 @@ class DraftModuleStore(MongoModuleStore):
         def get_published():
             return wrap_draft(super(DraftModuleStore, self).get_item(
                 usage_key, depth=depth, using_descriptor_system=using_descriptor_system,
-                for_parent=kwargs.get('for_parent'),
+                for_parent=kwargs.get('for_parent'), categories=kwargs.get('categories'),
             ))
 
         def get_draft():
             return wrap_draft(super(DraftModuleStore, self).get_item(
                 as_draft(usage_key), depth=depth, using_descriptor_system=using_descriptor_system,
-                for_parent=kwargs.get('for_parent')
+                for_parent=kwargs.get('for_parent'), categories=kwargs.get('categories'),
             ))
 
         # return the published version if ModuleStoreEnum.RevisionOption.published_only is requested
@@ -805,6 +805,21 @@ class DraftModuleStore(MongoModuleStore):
 
         delete_draft_only(location)
 
+    def _query_course_for_cache_children(self, course_key, categories=None):
+        items = super(DraftModuleStore, self)._query_course_for_cache_children(course_key, categories)
+        if self.get_branch_setting() == ModuleStoreEnum.Branch.draft_preferred:
+            # as in _query_children_for_cache_children, drafts replace their published versions
+            drafts = {
+                as_published(Location._from_deprecated_son(draft['_id'], course_key.run)): draft
+                for draft in super(DraftModuleStore, self)._query_course_for_cache_children(
+                    course_key, categories, MongoRevisionKey.draft
+                )
+            }
+            items = [
+                drafts.get(Location._from_deprecated_son(item['_id'], course_key.run), item) for item in items
+            ]
+        return items
+
     def _query_children_for_cache_children(self, course_key, items):
         # first get non-draft in a round-trip
         to_process_non_drafts = super(DraftModuleStore, self)._query_children_for_cache_children(course_key, items)
@@ -14,10 +14,12 @@ from xmodule.errortracker import exc_info_to_str
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.edit_info import EditInfoRuntimeMixin
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from xmodule.modulestore.inheritance import inheriting_field_data, InheritanceMixin
+from xmodule.modulestore.inheritance import (
+    inheriting_field_data, InheritanceMixin, PrecomputedInheritingFieldData
+)
 from xmodule.modulestore.split_mongo import BlockKey, CourseEnvelope
 from xmodule.modulestore.split_mongo.id_manager import SplitMongoIdManager
-from xmodule.modulestore.split_mongo.definition_lazy_loader import DefinitionLazyLoader
+from xmodule.modulestore.split_mongo.definition_lazy_loader import DefinitionLazyLoader, DefinitionPrefetch
 from xmodule.modulestore.split_mongo.split_mongo_kvs import SplitMongoKVS
 
 log = logging.getLogger(__name__)
@@ -79,6 +81,10 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # definitions fetched in bulk by the modulestore's cache_items, awaiting use
+        self.definition_prefetch = DefinitionPrefetch()
+        # how deep below each block the modulestore's cache_items has cached (None for all the way)
+        self.cached_depths = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
 
     @lazy
@@ -90,6 +96,16 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 parent_map[child] = block_key
         return parent_map
 
+    @lazy
+    def _inheritance_table(self):
+        """
+        The inherited settings of each block in the structure, or None if they have
+        to be found by walking up each block's ancestors.
+        """
+        if InheritanceMixin not in self.modulestore.xblock_mixins:
+            return None
+        return self.modulestore.get_inheritance_table(self.course_entry)
+
     @contract(usage_key="BlockUsageLocator | BlockKey", course_entry_override="CourseEnvelope | None")
     def _load_item(self, usage_key, course_entry_override=None, **kwargs):
         """
@@ -188,6 +204,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 block_key.type,
                 definition_id,
                 convert_fields,
+                prefetched=self.definition_prefetch,
             )
         else:
             definition_loader = None
@@ -209,15 +226,25 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
             parent = course_key.make_usage_key(parent_key.type, parent_key.id)
         else:
             parent = None
+        if self._inheritance_table is not None:
+            inherited_settings = self._inheritance_table.get(block_key)
+        else:
+            inherited_settings = None
         kvs = SplitMongoKVS(
             definition_loader,
             converted_fields,
             converted_defaults,
             parent=parent,
-            field_decorator=kwargs.get('field_decorator')
+            field_decorator=kwargs.get('field_decorator'),
+            inherited_settings=inherited_settings,
         )
 
-        if InheritanceMixin in self.modulestore.xblock_mixins:
+        if inherited_settings is not None:
+            field_data = PrecomputedInheritingFieldData(
+                inheritable_names=InheritanceMixin.fields.keys(),
+                kvs=kvs,
+            )
+        elif InheritanceMixin in self.modulestore.xblock_mixins:
             field_data = inheriting_field_data(kvs)
         else:
             field_data = KvsFieldData(kvs)
@@ -9,16 +9,18 @@ class DefinitionLazyLoader(object):
     object doesn't force access during init but waits until client wants the
     definition. Only works if the modulestore is a split mongo store.
     """
-    def __init__(self, modulestore, course_key, block_type, definition_id, field_converter):
+    def __init__(self, modulestore, course_key, block_type, definition_id, field_converter, prefetched=None):
         """
         Simple placeholder for yet-to-be-fetched data
         :param modulestore: the pymongo db connection with the definitions
         :param definition_locator: the id of the record in the above to fetch
+        :param prefetched: the runtime's DefinitionPrefetch, consulted before going to the modulestore
         """
         self.modulestore = modulestore
         self.course_key = course_key
         self.definition_locator = DefinitionLocator(block_type, definition_id)
         self.field_converter = field_converter
+        self.prefetched = prefetched
 
     def fetch(self):
         """
@@ -28,5 +30,46 @@ class DefinitionLazyLoader(object):
         # get_definition may return a cached value perhaps from another course or code path
         # so, we copy the result here so that updates don't cross-pollinate nor change the cached
         # value in such a way that we can't tell that the definition's been updated.
-        definition = self.modulestore.get_definition(self.course_key, self.definition_locator.definition_id)
+        definition = None
+        if self.prefetched is not None:
+            definition = self.prefetched.use(self.definition_locator.definition_id)
+        if definition is None:
+            definition = self.modulestore.get_definition(self.course_key, self.definition_locator.definition_id)
         return copy.deepcopy(definition)
+
+
+class DefinitionPrefetch(object):
+    """
+    The raw definition documents which a runtime fetched ahead of need, in bulk, for
+    the blocks it has cached. Definitions stay as undecoded documents until a
+    DefinitionLazyLoader asks for one, and the prefetch keeps count of how many of
+    the fetched definitions were actually used.
+    """
+    def __init__(self):
+        self.definitions = {}
+        self.used = set()
+
+    def __contains__(self, definition_id):
+        return definition_id in self.definitions
+
+    def add(self, definitions):
+        """
+        Remember the given definition documents.
+        """
+        for definition in definitions:
+            self.definitions[definition['_id']] = definition
+
+    def use(self, definition_id):
+        """
+        Return the prefetched definition document for definition_id, or None.
+        """
+        definition = self.definitions.get(definition_id)
+        if definition is not None:
+            self.used.add(definition_id)
+        return definition
+
+    def stats(self):
+        """
+        Return how many definitions were prefetched and how many of those were used.
+        """
+        return {'fetched': len(self.definitions), 'used': len(self.used)}
@@ -8,11 +8,14 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
 # Import this just to export it
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
+from django.conf import settings
 from django.core.cache import get_cache, InvalidCacheBackendError
 import dogstats_wrapper as dog_stats_api
 
@@ -20,6 +23,7 @@ from contracts import check, new_contract
 from mongodb_proxy import autoretry_read, MongoProxy
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
+from xmodule.modulestore.inheritance import InheritanceMixin
 from xmodule.modulestore.split_mongo import BlockKey
 
 
@@ -167,17 +171,81 @@ def structure_from_mongo(structure, course_context=None):
             if 'children' in block['fields']:
                 check('list(list[2])', block['fields']['children'])
 
-        structure['root'] = BlockKey(*structure['root'])
+        # Every block is referenced once as a key and once from its parent's children,
+        # and a handful of block types are repeated thousands of times; share one
+        # BlockKey per block and one string per block type within the structure.
+        block_types = {}
+        block_keys = {}
+
+        def block_key(block_type, block_id):
+            """
+            Return the shared BlockKey for (block_type, block_id).
+            """
+            key = block_keys.get((block_type, block_id))
+            if key is None:
+                block_type = block_types.setdefault(block_type, block_type)
+                key = block_keys[(block_type, block_id)] = BlockKey(block_type, block_id)
+            return key
+
+        structure['root'] = block_key(*structure['root'])
         new_blocks = {}
         for block in structure['blocks']:
             if 'children' in block['fields']:
-                block['fields']['children'] = [BlockKey(*child) for child in block['fields']['children']]
-            new_blocks[BlockKey(block['block_type'], block.pop('block_id'))] = BlockData(**block)
+                block['fields']['children'] = [block_key(*child) for child in block['fields']['children']]
+            key = block_key(block['block_type'], block.pop('block_id'))
+            block['block_type'] = key.type
+            new_blocks[key] = BlockData(**block)
         structure['blocks'] = new_blocks
 
         return structure
 
 
+def inheritance_table_from_structure(structure, course_context=None):
+    """
+    Compute the inheritable settings each block in the structure gets from its
+    ancestors, as a map {BlockKey: {field_name: json value}}. Each value is what the
+    field would read if the block didn't set it itself: the value set by the nearest
+    ancestor which sets it. Blocks which don't set any inheritable fields pass their
+    own map on to their children, so most of the maps are shared.
+
+    Blocks that aren't reachable from a parent (e.g., the root) inherit nothing.
+    """
+    with TIMER.timer('inheritance_table_from_structure', course_context) as tagger:
+        blocks = structure['blocks']
+        tagger.measure('blocks', len(blocks))
+        inheritable_names = InheritanceMixin.fields
+
+        parents = {}
+        for block_key, block in blocks.iteritems():
+            for child in block.fields.get('children', []):
+                parents[child] = block_key
+
+        no_settings = {}
+        inherited = {}
+        passed_down = {}
+        for block_key in blocks:
+            # climb to the nearest ancestor whose settings are already known (or to the
+            # top of the tree), then resolve the settings back down that chain.
+            chain = []
+            ancestor = block_key
+            while ancestor in blocks and ancestor not in inherited and ancestor not in chain:
+                chain.append(ancestor)
+                ancestor = parents.get(ancestor)
+
+            settings = passed_down.get(ancestor, no_settings)
+            for key in reversed(chain):
+                inherited[key] = settings
+                own_settings = {
+                    name: value for name, value in blocks[key].fields.iteritems() if name in inheritable_names
+                }
+                if own_settings:
+                    settings = dict(settings)
+                    settings.update(own_settings)
+                passed_down[key] = settings
+
+        return inherited
+
+
 def structure_to_mongo(structure, course_context=None):
     """
     Converts the 'blocks' key from a map {BlockKey: block_data} to
@@ -260,6 +328,106 @@ class CourseStructureCache(object):
             self.cache.set(key, compressed_pickled_data, None)
 
 
+class StructureLRUCache(object):
+    """
+    A bounded, per-process, least recently used cache of decoded structures,
+    keyed by structure id.
+
+    A structure is never modified once it has been written, so the same decoded
+    object can be handed out to every request in the process, which saves
+    fetching, decompressing and unpickling it from :class:`CourseStructureCache`
+    each time. Callers must treat the structures they get as read-only.
+
+    The size of a structure is estimated by the length of its pickle, and the
+    cache evicts the least recently used structures to stay under `max_bytes`.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the structure cached for `key`, or None.
+        """
+        with self._lock:
+            entry = self._structures.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Re-insert the entry to mark it as the most recently used
+            self._structures[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, structure):
+        """
+        Cache `structure` for `key`, evicting other structures as needed.
+        """
+        size = len(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old_entry = self._structures.pop(key, None)
+            if old_entry is not None:
+                self.size_bytes -= old_entry[1]
+
+            self._structures[key] = (structure, size)
+            self.size_bytes += size
+
+            while self.size_bytes > self.max_bytes:
+                __, (__, evicted_size) = self._structures.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Empty the cache, and reset its statistics.
+        """
+        with self._lock:
+            self._structures.clear()
+            self.size_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Return a dict describing the memory use and effectiveness of the cache.
+        """
+        with self._lock:
+            return {
+                'structures': len(self._structures),
+                'size_bytes': self.size_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+_STRUCTURE_LRU_CACHE = None
+
+
+def structure_lru_cache():
+    """
+    Return this process's :class:`StructureLRUCache`, or None if it is disabled
+    because the SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES setting isn't set.
+    """
+    global _STRUCTURE_LRU_CACHE  # pylint: disable=global-statement
+    max_bytes = getattr(settings, 'SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        return None
+
+    if _STRUCTURE_LRU_CACHE is None or _STRUCTURE_LRU_CACHE.max_bytes != max_bytes:
+        _STRUCTURE_LRU_CACHE = StructureLRUCache(max_bytes)
+    return _STRUCTURE_LRU_CACHE
+
+
 class MongoConnection(object):
     """
     Segregation of pymongo functions from the data modeling mechanisms for split modulestore.
@@ -318,6 +486,13 @@ class MongoConnection(object):
         This method will use a cached version of the structure if it is availble.
         """
         with TIMER.timer("get_structure", course_context) as tagger_get_structure:
+            lru_cache = structure_lru_cache()
+            if lru_cache is not None:
+                structure = lru_cache.get(key)
+                tagger_get_structure.tag(from_lru_cache=str(bool(structure)).lower())
+                if structure:
+                    return structure
+
             cache = CourseStructureCache()
 
             structure = cache.get(key, course_context)
@@ -334,8 +509,42 @@ class MongoConnection(object):
 
                 cache.set(key, structure, course_context)
 
+            if lru_cache is not None:
+                lru_cache.set(key, structure)
+                tagger_get_structure.measure('lru_cache_size', lru_cache.size_bytes)
+
             return structure
 
+    def get_inheritance_table(self, structure, course_context=None):
+        """
+        Get the inheritance table (see :func:`inheritance_table_from_structure`) for the
+        given structure. The table is computed once per structure and cached alongside
+        the structures, so only the first worker to need it pays for computing it.
+
+        The structure must already be persisted: unlike structures being edited in a
+        bulk operation, those never change once written.
+        """
+        key = 'inheritance_table.{}'.format(structure['_id'])
+        with TIMER.timer("get_inheritance_table", course_context) as tagger:
+            lru_cache = structure_lru_cache()
+            if lru_cache is not None:
+                table = lru_cache.get(key)
+                tagger.tag(from_lru_cache=str(table is not None).lower())
+                if table is not None:
+                    return table
+
+            cache = CourseStructureCache()
+            table = cache.get(key, course_context)
+            tagger.tag(from_cache=str(table is not None).lower())
+            if table is None:
+                table = inheritance_table_from_structure(structure, course_context)
+                cache.set(key, table, course_context)
+
+            if lru_cache is not None:
+                lru_cache.set(key, table)
+
+            return table
+
     @autoretry_read()
     def find_structures_by_id(self, ids, course_context=None):
         """
@@ -420,17 +420,20 @@ class SplitBulkWriteMixin(BulkOperationsMixin):
         bulk_write_record = self._get_bulk_ops_record(course_key)
         if bulk_write_record.active:
             # Only query for the definitions that aren't already cached.
-            for definition in bulk_write_record.definitions.values():
-                definition_id = definition.get('_id')
-                if definition_id in ids:
+            for definition_id in list(ids):
+                definition = bulk_write_record.definitions.get(definition_id)
+                if definition is not None:
                     ids.remove(definition_id)
                     definitions.append(definition)
 
         if len(ids):
             # Query the db for the definitions.
-            defs_from_db = self.db_connection.get_definitions(list(ids), course_key)
-            # Add the retrieved definitions to the cache.
-            bulk_write_record.definitions.update({d.get('_id'): d for d in defs_from_db})
+            defs_from_db = list(self.db_connection.get_definitions(list(ids), course_key))
+            if bulk_write_record.active:
+                # Add the retrieved definitions to the cache.
+                for definition in defs_from_db:
+                    bulk_write_record.definitions[definition['_id']] = definition
+                    bulk_write_record.definitions_in_db.add(definition['_id'])
             definitions.extend(defs_from_db)
         return definitions
 
@@ -635,6 +638,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
     # It won't recompute the value on operations such as update_course_index (e.g., to revert to a prev
     # version) but those functions will have an optional arg for setting these.
     SEARCH_TARGET_DICT = ['wiki_slug']
+    # the most definitions cache_items will prefetch in one query when loading lazily
+    DEFINITION_PREFETCH_LIMIT = 250
 
     def __init__(self, contentstore, doc_store_config, fs_root, render_template,
                  default_class=None,
@@ -723,28 +728,79 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             # This method supports lazy loading, where the descendent definitions aren't loaded
             # until they're actually needed.
             if not lazy:
-                # Non-lazy loading: Load all descendants by id.
-                descendent_definitions = self.get_definitions(
-                    course_key,
-                    [
-                        block.definition
-                        for block in new_module_data.itervalues()
-                    ]
+                # Non-lazy loading: Load all descendants by id, except those the runtime
+                # already has with their definitions.
+                definition_ids = set(
+                    block.definition
+                    for block_key, block in new_module_data.iteritems()
+                    if not getattr(system.module_data.get(block_key), 'definition_loaded', False)
                 )
+                descendent_definitions = self.get_definitions(course_key, definition_ids) if definition_ids else []
                 # Turn definitions into a map.
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
+                        # The block belongs to the structure, which may be shared with other
+                        # requests, so merge the definition into a copy of it.
+                        block = copy.copy(block)
                         # convert_fields gets done later in the runtime's xblock_from_json
+                        block.fields = dict(block.fields)
                         block.fields.update(definition.get('fields'))
                         block.definition_loaded = True
+                        new_module_data[block_key] = block
+            else:
+                self._prefetch_definitions(system, new_module_data, course_key)
 
-            system.module_data.update(new_module_data)
+            for block_key, block in new_module_data.iteritems():
+                # Don't replace a copy of the block that already has its definition loaded
+                cached_block = system.module_data.get(block_key)
+                if cached_block is None or not cached_block.definition_loaded:
+                    system.module_data[block_key] = block
+            for block_id in base_block_ids:
+                if not self._is_cached(system, block_id, depth):
+                    system.cached_depths[block_id] = depth
             return system.module_data
 
+    @staticmethod
+    def _is_cached(system, block_key, depth):
+        """
+        Returns whether cache_items has already cached block_key and its descendants
+        out to depth in the runtime system, either from the block itself or from the
+        root of the whole course.
+        """
+        cached_depths = system.cached_depths
+        root_key = system.course_entry.structure['root']
+        if root_key in cached_depths and cached_depths[root_key] is None:
+            return True
+        if block_key not in cached_depths:
+            return False
+        cached_depth = cached_depths[block_key]
+        return cached_depth is None or (depth is not None and cached_depth >= depth)
+
+    def _prefetch_definitions(self, system, module_data, course_key):
+        """
+        Fetch, in one query, the definitions of the blocks in module_data which the
+        runtime hasn't loaded yet, so that their DefinitionLazyLoaders don't each go
+        to the db. Subtrees bigger than DEFINITION_PREFETCH_LIMIT (e.g., whole-course
+        loads for the outline or grading, which rarely need content fields) are left
+        to load definitions one at a time as before.
+        """
+        prefetch = system.definition_prefetch
+        definition_ids = set()
+        for block_key, block in module_data.iteritems():
+            if block.definition is None or block.definition in prefetch:
+                continue
+            cached_block = system.module_data.get(block_key)
+            if cached_block is not None and cached_block.definition_loaded:
+                continue
+            definition_ids.add(block.definition)
+
+        if 1 < len(definition_ids) <= self.DEFINITION_PREFETCH_LIMIT:
+            prefetch.add(self.get_definitions(course_key, definition_ids))
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
@@ -759,6 +815,15 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             runtime = self.create_runtime(course_entry, lazy)
             self._add_cache(course_entry.structure['_id'], runtime)
             self.cache_items(runtime, block_keys, course_entry.course_key, depth, lazy)
+        elif depth != 0:
+            # The runtime was created by a shallower load (e.g., the course outline); cache
+            # this subtree now so its blocks and definitions aren't fetched one at a time,
+            # unless an earlier load already has.
+            uncached_keys = [
+                block_key for block_key in block_keys if not self._is_cached(runtime, block_key, depth)
+            ]
+            if uncached_keys:
+                self.cache_items(runtime, uncached_keys, course_entry.course_key, depth, runtime.lazy)
 
         return [runtime.load_item(block_key, course_entry, **kwargs) for block_key in block_keys]
 
@@ -2443,51 +2508,18 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
         self._emit_course_deleted_signal(course_key)
 
-    @contract(block_map="dict(BlockKey: dict)", block_key=BlockKey)
-    def inherit_settings(
-        self, block_map, block_key, inherited_settings_map, inheriting_settings=None, inherited_from=None
-    ):
+    @contract(course_entry=CourseEnvelope)
+    def get_inheritance_table(self, course_entry):
         """
-        Updates block_data with any inheritable setting set by an ancestor and recurses to children.
+        Return the map {BlockKey: inherited settings} for the course_entry's structure, or
+        None if the structure is being modified by the active bulk operation (and so
+        inherited values must be looked up on the blocks' ancestors).
         """
-        if block_key not in block_map:
-            return
-        block_data = block_map[block_key]
-
-        if inheriting_settings is None:
-            inheriting_settings = {}
-
-        if inherited_from is None:
-            inherited_from = []
-
-        # the currently passed down values take precedence over any previously cached ones
-        # NOTE: this should show the values which all fields would have if inherited: i.e.,
-        # not set to the locally defined value but to value set by nearest ancestor who sets it
-        inherited_settings_map.setdefault(block_key, {}).update(inheriting_settings)
-
-        # update the inheriting w/ what should pass to children
-        inheriting_settings = inherited_settings_map[block_key].copy()
-        block_fields = block_data.fields
-        for field_name in inheritance.InheritanceMixin.fields:
-            if field_name in block_fields:
-                inheriting_settings[field_name] = block_fields[field_name]
-
-        for child in block_fields.get('children', []):
-            try:
-                if child in inherited_from:
-                    raise Exception(u'Infinite loop detected when inheriting to {}, having already inherited from {}'.format(child, inherited_from))
-                self.inherit_settings(
-                    block_map,
-                    BlockKey(*child),
-                    inherited_settings_map,
-                    inheriting_settings,
-                    inherited_from + [child]
-                )
-            except KeyError:
-                # here's where we need logic for looking up in other structures when we allow cross pointers
-                # but it's also getting this during course creation if creating top down w/ children set or
-                # migration where the old mongo published had pointers to privates
-                pass
+        structure = course_entry.structure
+        bulk_write_record = self._get_bulk_ops_record(course_entry.course_key)
+        if bulk_write_record.active and structure['_id'] not in bulk_write_record.structures_in_db:
+            return None
+        return self.db_connection.get_inheritance_table(structure, course_entry.course_key)
 
     def descendants(self, block_map, block_id, depth, descendent_map):
         """
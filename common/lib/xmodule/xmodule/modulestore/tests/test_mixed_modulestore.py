@@ -436,11 +436,12 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                 revision=ModuleStoreEnum.RevisionOption.draft_preferred
             )
 
-    # draft: get draft, get ancestors up to course (2-6), compute inheritance
+    # draft: get draft, get ancestors up to course (2-6); updating a leaf leaves the cached
+    #    inheritance tree as is, so it isn't recomputed
     #    sends: update problem and then each ancestor up to course (edit info)
     # split: active_versions, definitions (calculator field), structures
     #  2 sends to update index & structure (note, it would also be definition if a content field changed)
-    @ddt.data(('draft', 7, 5), ('split', 3, 2))
+    @ddt.data(('draft', 6, 5), ('split', 3, 2))
     @ddt.unpack
     def test_update_item(self, default_ms, max_find, max_send):
         """
@@ -836,8 +837,9 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
     # Draft
     #   Find: find parents (definition.children query), get parent, get course (fill in run?),
-    #         find parents of the parent (course), get inheritance items,
-    #         get item (to delete subtree), get inheritance again.
+    #         find parents of the parent (course), get the parent's inheritable settings and
+    #         children (only a child was removed, so the inheritance tree is kept),
+    #         get item (to delete subtree), get inheritance.
     #   Sends: delete item, update parent
     # Split
     #   Find: active_versions, 2 structures (published & draft), definition (unnecessary)
@@ -869,7 +871,8 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
     # Draft:
     #    queries: find parent (definition.children), count versions of item, get parent, count grandparents,
-    #             inheritance items, draft item, draft child, inheritance
+    #             parent's inheritable settings and children (instead of recomputing the inheritance
+    #             tree, as only a child was removed), draft item, draft child, inheritance
     #    sends: delete draft vertical and update parent
     # Split:
     #    queries: active_versions, draft and published structures, definition (unnecessary)
@@ -4,6 +4,7 @@ Unit tests for the Mongo modulestore
 # pylint: disable=protected-access
 # pylint: disable=no-name-in-module
 # pylint: disable=bad-continuation
+import copy
 from nose.tools import assert_equals, assert_raises, \
     assert_not_equals, assert_false, assert_true, assert_greater, assert_is_instance, assert_is_none
 # pylint: enable=E0611
@@ -17,6 +18,7 @@ from datetime import datetime
 from pytz import UTC
 import unittest
 from mock import patch
+from django.core.cache import get_cache
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -39,7 +41,7 @@ from nose.tools import assert_in
 from xmodule.exceptions import NotFoundError
 from git.test.lib.asserts import assert_not_none
 from xmodule.x_module import XModuleMixin
-from xmodule.modulestore.mongo.base import as_draft
+from xmodule.modulestore.mongo.base import as_draft, as_published
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import LocationMixin, mock_tab_from_json
 from xmodule.modulestore.edit_info import EditInfoMixin
@@ -758,6 +760,68 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_cache_children_plans(self):
+        """
+        Caching a whole course takes one query for the course rather than one per level,
+        and categories limit what's cached.
+        """
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        course_item = self.draft_store._find_one(course_key.make_usage_key('course', '2012_Fall'))
+
+        with patch.object(
+            self.draft_store, '_query_children_for_cache_children',
+            wraps=self.draft_store._query_children_for_cache_children
+        ) as query_children:
+            whole_course = self.draft_store._cache_children(course_key, [copy.deepcopy(course_item)], depth=None)
+            self.assertFalse(query_children.called)
+        by_level = self.draft_store._cache_children(course_key, [copy.deepcopy(course_item)], depth=10)
+        self.assertEqual(set(whole_course), set(by_level))
+
+        toc = self.draft_store._cache_children(
+            course_key, [copy.deepcopy(course_item)], depth=None, categories=['chapter', 'sequential']
+        )
+        self.assertIn('chapter', set(location.category for location in toc))
+        self.assertLessEqual(set(location.category for location in toc), {'course', 'chapter', 'sequential'})
+
+    def test_metadata_inheritance_tree_patching(self):
+        """
+        Updating leaves, or adding leaves to a container, patches the cached metadata
+        inheritance tree rather than recomputing it.
+        """
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        with patch.object(self.draft_store, 'metadata_inheritance_cache_subsystem', cache):
+            course = self.draft_store.create_course("TestX", "InheritanceTree", "2015", self.dummy_user)
+            chapter = self.draft_store.create_child(
+                self.dummy_user, course.location, 'chapter', fields={'showanswer': 'never'}
+            )
+            vertical = self.draft_store.create_child(self.dummy_user, chapter.location, 'vertical')
+
+            with patch.object(
+                self.draft_store, '_compute_metadata_inheritance_tree',
+                wraps=self.draft_store._compute_metadata_inheritance_tree
+            ) as compute:
+                problem = self.draft_store.create_child(self.dummy_user, vertical.location, 'problem')
+                problem.display_name = 'Patched'
+                self.draft_store.update_item(problem, self.dummy_user)
+                self.assertFalse(compute.called)
+
+            tree = cache.get(unicode(course.id))
+            problem_entry = tree[unicode(as_published(problem.location))]
+            self.assertEqual(problem_entry['showanswer'], 'never')
+            self.assertEqual(
+                problem_entry['parent'][ModuleStoreEnum.Branch.draft_preferred],
+                unicode(as_published(vertical.location))
+            )
+
+            # when the tree expires, one process rebuilds it while the others use the last one
+            cache.delete(unicode(course.id))
+            cache.add(u'{}.rebuilding'.format(course.id), True)
+            with patch.object(self.draft_store, '_compute_metadata_inheritance_tree') as compute:
+                self.assertEqual(self.draft_store._get_cached_metadata_inheritance_tree(course.id), tree)
+                self.assertFalse(compute.called)
+
+        self.draft_store.delete_course(course.id, self.dummy_user)
+
 
 class TestMongoModuleStoreWithNoAssetCollection(TestMongoModuleStore):
     '''
@@ -109,21 +109,22 @@ class TestPublish(SplitWMongoCourseBootstrapper):
         # Finds:
         #   1 get draft vert,
         #   2 compute parent
-        #   3-14 for each child: (3 children x 4 queries each)
+        #   3-11 for each child: (3 children x 3 queries each)
         #      get draft, compute parent, and then published child
-        #      compute inheritance
-        #   15 get published vert
-        #   16-18 get ancestor chain
-        #   19 compute inheritance
-        #   20-22 get draft and published vert, compute parent
+        #      (publishing a leaf doesn't recompute inheritance)
+        #   12 get published vert
+        #   13-15 get ancestor chain
+        #   16 get published vert's inheritable settings and children (it was never published)
+        #   17 compute inheritance
+        #   18-20 get draft and published vert, compute parent
         # Sends:
         #   delete the subtree of drafts (1 call),
         #   update the published version of each node in subtree (4 calls),
         #   update the ancestors up to course (2 calls)
         if mongo_uses_error_check(self.draft_mongo):
-            max_find = 23
+            max_find = 21
         else:
-            max_find = 22
+            max_find = 20
         with check_mongo_calls(max_find, 7):
             self.draft_mongo.publish(item.location, self.user_id)
 
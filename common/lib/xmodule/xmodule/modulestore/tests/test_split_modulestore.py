@@ -2,6 +2,8 @@
     Test split modulestore w/o using any django stuff.
 """
 from mock import patch
+import copy
+import cPickle as pickle
 import datetime
 from importlib import import_module
 from path import path
@@ -13,21 +15,25 @@ import uuid
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import get_cache, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
 from xmodule.course_module import CourseDescriptor
-from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore import BlockData, ModuleStoreEnum
 from xmodule.modulestore.exceptions import (
     ItemNotFoundError, VersionConflictError,
     DuplicateItemError, DuplicateCourseError,
     InsufficientSpecificationError
 )
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator, VersionTree, LocalId
-from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.inheritance import InheritanceMixin, PrecomputedInheritingFieldData
 from xmodule.x_module import XModuleMixin
 from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    StructureLRUCache, structure_from_mongo, structure_lru_cache
+)
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.modulestore.tests.factories import check_mongo_calls
@@ -740,6 +746,49 @@ class SplitModuleCourseTests(SplitModuleTest):
         self.assertIn(BlockKey('chapter', 'chapter1'), block_map)
         self.assertIn(BlockKey('problem', 'problem3_2'), block_map)
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_cache_items_prefetches_definitions(self, _from_json):
+        """
+        Test that lazily cached subtrees get their definitions in one query, and that
+        the prefetched definitions are used once a block's content is read.
+        """
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course = modulestore().get_course(locator)
+        modulestore().cache_items(
+            course.system, [BlockKey.from_usage_key(child) for child in course.children], course.id, depth=3
+        )
+        stats = course.system.definition_prefetch.stats()
+        self.assertGreater(stats['fetched'], 1)
+        self.assertEqual(stats['used'], 0)
+
+        problem = course.system.load_item(BlockKey('problem', 'problem3_2'))
+        with check_mongo_calls(0):
+            problem.data  # pylint: disable=pointless-statement
+        self.assertEqual(course.system.definition_prefetch.stats()['used'], 1)
+
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_cache_items_skips_loaded_definitions(self, _from_json):
+        """
+        Test that caching a subtree again doesn't fetch the definitions the runtime
+        already has, and remembers how deep it has cached.
+        """
+        store = modulestore()
+        is_cached = store._is_cached  # pylint: disable=protected-access
+        locator = CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        course = store.get_course(locator)
+        chapter_keys = [BlockKey.from_usage_key(child) for child in course.children]
+        store.cache_items(course.system, chapter_keys, course.id, depth=None, lazy=False)
+        self.assertTrue(is_cached(course.system, chapter_keys[0], 3))
+
+        with patch.object(store, 'get_definitions') as mock_get_definitions:
+            store.cache_items(course.system, chapter_keys, course.id, depth=None, lazy=False)
+        self.assertFalse(mock_get_definitions.called)
+
+        root_key = course.system.course_entry.structure['root']
+        self.assertFalse(is_cached(course.system, root_key, 1))
+        store.cache_items(course.system, [root_key], course.id, depth=None)
+        self.assertTrue(is_cached(course.system, BlockKey('problem', 'problem3_2'), None))
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_course_successors(self, _from_json):
         """
@@ -837,6 +886,72 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @override_settings(SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES=10 * 1024 * 1024)
+    def test_structure_lru_cache(self):
+        lru_cache = structure_lru_cache()
+        lru_cache.clear()
+        self.addCleanup(lru_cache.clear)
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # once the structure is in the process's cache, we get the very same object
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+        self.assertIs(cached_structure, not_cached_structure)
+
+        stats = lru_cache.stats()
+        self.assertEqual(stats['structures'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertGreater(stats['size_bytes'], 0)
+
+    def test_structure_lru_cache_eviction(self):
+        lru_cache = StructureLRUCache(max_bytes=1000)
+        lru_cache.set('first', {'blocks': 'a' * 400})
+        lru_cache.set('second', {'blocks': 'b' * 400})
+        # 'first' is now the most recently used, so 'second' gets evicted
+        self.assertIsNotNone(lru_cache.get('first'))
+        lru_cache.set('third', {'blocks': 'c' * 400})
+
+        self.assertIsNone(lru_cache.get('second'))
+        self.assertIsNotNone(lru_cache.get('first'))
+        self.assertIsNotNone(lru_cache.get('third'))
+        self.assertEqual(lru_cache.stats()['evictions'], 1)
+        self.assertLessEqual(lru_cache.size_bytes, 1000)
+
+        # structures that could never fit aren't cached at all
+        lru_cache.set('huge', {'blocks': 'd' * 2048})
+        self.assertIsNone(lru_cache.get('huge'))
+
+    def test_structure_from_mongo_shares_keys(self):
+        structure = structure_from_mongo({
+            'root': ['course', 'course'],
+            'blocks': [
+                {'block_type': 'course', 'block_id': 'course', 'fields': {'children': [['chapter', 'ch']]}},
+                {'block_type': 'chapter', 'block_id': 'ch', 'fields': {}, 'edit_info': {'edited_by': 1}},
+            ],
+        })
+        chapter_key = BlockKey('chapter', 'ch')
+        child_key = structure['blocks'][BlockKey('course', 'course')].fields['children'][0]
+        block_key = next(key for key in structure['blocks'] if key == chapter_key)
+        self.assertIs(child_key, block_key)
+        self.assertIs(structure['root'], next(key for key in structure['blocks'] if key.type == 'course'))
+        self.assertIs(structure['blocks'][chapter_key].block_type, block_key.type)
+
+    def test_block_data_pickle(self):
+        block = BlockData(block_type='html', definition='abc', fields={'display_name': 'x'}, edit_info={'edited_by': 1})
+        self.assertFalse(hasattr(block, '__dict__'))
+        self.assertEqual(pickle.loads(pickle.dumps(block, pickle.HIGHEST_PROTOCOL)), block)
+        copied = copy.deepcopy(block)
+        self.assertEqual(copied, block)
+        self.assertEqual(copied.edit_info.edited_by, 1)
+
+        # state pickled before BlockData/EditInfo were slotted is still readable
+        restored = BlockData.__new__(BlockData)
+        restored.__setstate__(dict(block.__getstate__()))
+        self.assertEqual(restored, block)
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
@@ -1817,6 +1932,25 @@ class TestInheritance(SplitModuleTest):
         # overridden
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_inheritance_table(self, _from_json):
+        """
+        Inherited values come from the structure's precomputed inheritance table
+        """
+        course = modulestore().get_course(
+            CourseLocator(org='testx', course='GreekHero', run="run", branch=BRANCH_NAME_DRAFT)
+        )
+        table = course.runtime.modulestore.get_inheritance_table(course.runtime.course_entry)
+        self.assertEqual(table[BlockKey('course', 'head12345')], {})
+        self.assertIn('graceperiod', table[BlockKey('problem', 'problem3_2')])
+        # blocks which don't set inheritable fields share their settings with their children
+        self.assertIs(table[BlockKey('chapter', 'chapter3')], table[BlockKey('problem', 'problem3_2')])
+
+        node = course.runtime.load_item(BlockKey('problem', 'problem3_2'))
+        self.assertIsInstance(node._field_data, PrecomputedInheritingFieldData)  # pylint: disable=protected-access
+        with patch.object(node, 'get_parent', side_effect=AssertionError("walked up to the parent")):
+            self.assertEqual(node.graceperiod, datetime.timedelta(hours=2))
+
     def test_inheritance_not_saved(self):
         """
         Was saving inherited settings with updated blocks causing inheritance to be sticky
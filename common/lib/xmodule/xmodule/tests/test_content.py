@@ -164,6 +164,22 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_reads_whole_chunks(self):
+        """
+        Test that StaticContentStream reads a GridFS item one chunk at a time,
+        including when streaming a range that starts and ends within chunks.
+        """
+        data = SAMPLE_STRING
+        item = FakeGridFsItem(data)
+        item.chunk_size = 256
+        reads = []
+        read = item.read
+        item.read = lambda size: reads.append(size) or read(size)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        self.assertEqual(''.join(static_content_stream.stream_data_in_range(100, 700)), data[100:701])
+        self.assertEqual(reads, [156, 256, 189])
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
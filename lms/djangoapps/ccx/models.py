@@ -6,6 +6,8 @@ import logging
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.timezone import UTC
 
 from lazy import lazy
@@ -107,3 +109,17 @@ class CcxFieldOverride(models.Model):
         unique_together = (('ccx', 'location', 'field'),)
 
     value = models.TextField(default='null')
+
+
+@receiver(post_save, sender=CustomCourseForEdX)
+@receiver(post_delete, sender=CustomCourseForEdX)
+def invalidate_ccx_overrides(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Move the cached overrides of a CCX on to a new version when the CCX is
+    saved or deleted, so that a new CCX reusing the id of a deleted one
+    doesn't pick up its overrides.  Changes to the overrides themselves are
+    handled in `ccx.overrides`, once they are committed.
+    """
+    # avoid circular import problems
+    from .overrides import invalidate_overrides_cache
+    invalidate_overrides_cache(instance.id)
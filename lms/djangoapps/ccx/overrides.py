@@ -4,7 +4,9 @@ by the individual custom courses feature.
 """
 import json
 import logging
+import uuid
 
+from django.core.cache import cache
 from django.db import transaction, IntegrityError
 
 import request_cache
@@ -18,6 +20,11 @@ from .models import CcxFieldOverride, CustomCourseForEdX
 
 log = logging.getLogger(__name__)
 
+# The cache key of a CCX's overrides includes a version that changes whenever
+# they do (see `_write_overrides_cache`), so entries never go stale; the
+# timeout only bounds how long superseded versions linger.
+OVERRIDES_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
     """
@@ -57,6 +64,16 @@ class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
         """
         return getattr(course, 'enable_ccx', False)
 
+    def overridden_fields(self, course):
+        """
+        Return the names of the fields overridden anywhere in the ccx that is
+        active for `course`, if any.
+        """
+        ccx = get_current_ccx(course.id)
+        if ccx:
+            return _get_overridden_fields_for_ccx(ccx)
+        return frozenset()
+
 
 def get_current_ccx(course_key):
     """
@@ -100,27 +117,121 @@ def get_override_for_ccx(ccx, block, name, default=None):
 
 def _get_overrides_for_ccx(ccx):
     """
-    Returns a dictionary mapping field name to overriden value for any
-    overrides set on this block for this CCX.
+    Returns a dictionary mapping block locations to dictionaries of field name
+    to overriden value for any overrides set on blocks of this CCX.
+
+    The overrides are loaded with a single query and kept both for the rest
+    of the request and, under the current version of the CCX's overrides,
+    in the Django cache for later requests.
     """
     overrides_cache = request_cache.get_cache('ccx-overrides')
 
     if ccx not in overrides_cache:
-        overrides = {}
-        query = CcxFieldOverride.objects.filter(
-            ccx=ccx,
-        )
-
-        for override in query:
-            block_overrides = overrides.setdefault(override.location, {})
-            block_overrides[override.field] = json.loads(override.value)
+        cache_key = _overrides_cache_key(ccx)
+        overrides = cache.get(cache_key)
+        if overrides is None:
+            overrides = _load_overrides(ccx.id)
+            cache.set(cache_key, overrides, OVERRIDES_CACHE_TIMEOUT)
 
         overrides_cache[ccx] = overrides
 
     return overrides_cache[ccx]
 
 
-@transaction.commit_on_success
+def _load_overrides(ccx_id):
+    """
+    Reads the overrides of the CCX with id `ccx_id` from the database, as
+    returned by `_get_overrides_for_ccx`.
+    """
+    overrides = {}
+    query = CcxFieldOverride.objects.filter(
+        ccx_id=ccx_id,
+    )
+
+    for override in query:
+        block_overrides = overrides.setdefault(override.location, {})
+        block_overrides[override.field] = json.loads(override.value)
+
+    return overrides
+
+
+def _get_overridden_fields_for_ccx(ccx):
+    """
+    Returns the set of names of the fields overridden on any block of this
+    CCX.
+    """
+    fields_cache = request_cache.get_cache('ccx-overridden-fields')
+
+    if ccx not in fields_cache:
+        fields_cache[ccx] = frozenset(
+            name
+            for block_overrides in _get_overrides_for_ccx(ccx).itervalues()
+            for name in block_overrides
+        )
+
+    return fields_cache[ccx]
+
+
+def _overrides_version_key(ccx_id):
+    """
+    Returns the cache key holding the current version of the overrides of the
+    CCX with id `ccx_id`.
+    """
+    return u"ccx.overrides.version.{}".format(ccx_id)
+
+
+def _overrides_cache_key(ccx):
+    """
+    Returns the cache key of the current version of the overrides of `ccx`.
+    """
+    version_key = _overrides_version_key(ccx.id)
+    version = cache.get(version_key)
+    if version is None:
+        # Versions are random rather than counted, so that a version key
+        # which is evicted from the cache can't come back with the value of
+        # an earlier version.
+        new_version = uuid.uuid4().hex
+        cache.add(version_key, new_version, OVERRIDES_CACHE_TIMEOUT)
+        # The version may be gone again already (evicted, or invalidated by
+        # another process); this request then keeps to its own.
+        version = cache.get(version_key) or new_version
+    return _overrides_version_cache_key(ccx.id, version)
+
+
+def _overrides_version_cache_key(ccx_id, version):
+    """
+    Returns the cache key of the overrides of the CCX with id `ccx_id` at
+    `version`.
+    """
+    return u"ccx.overrides.{}.{}".format(ccx_id, version)
+
+
+def invalidate_overrides_cache(ccx_id):
+    """
+    Makes later requests reload the overrides of the CCX with id `ccx_id`
+    from the database.
+    """
+    cache.delete(_overrides_version_key(ccx_id))
+
+
+def _write_overrides_cache(ccx_id):
+    """
+    Caches the overrides of the CCX with id `ccx_id` under a new version, and
+    returns them.  Called whenever an override is saved or deleted, after the
+    change is committed.
+
+    The writer fills the cache itself rather than leaving it to the next
+    request: a request that began before the change was committed still reads
+    the old overrides from the database, and would cache them under the new
+    version.
+    """
+    overrides = _load_overrides(ccx_id)
+    version = uuid.uuid4().hex
+    cache.set(_overrides_version_cache_key(ccx_id, version), overrides, OVERRIDES_CACHE_TIMEOUT)
+    cache.set(_overrides_version_key(ccx_id), version, OVERRIDES_CACHE_TIMEOUT)
+    return overrides
+
+
 def override_field_for_ccx(ccx, block, name, value):
     """
     Overrides a field for the `ccx`.  `block` and `name` specify the block
@@ -129,11 +240,22 @@ def override_field_for_ccx(ccx, block, name, value):
     """
     field = block.fields[name]
     value_json = field.to_json(value)
-    serialized_value = json.dumps(value_json)
+    _save_override_for_ccx(ccx, block.location, name, json.dumps(value_json))
+
+    request_cache.get_cache('ccx-overrides')[ccx] = _write_overrides_cache(ccx.id)
+    request_cache.get_cache('ccx-overridden-fields').pop(ccx, None)
+
+
+@transaction.commit_on_success
+def _save_override_for_ccx(ccx, location, name, serialized_value):
+    """
+    Saves the override of the field `name` of the block at `location` for
+    the `ccx`, and commits it.
+    """
     try:
         override = CcxFieldOverride.objects.create(
             ccx=ccx,
-            location=block.location,
+            location=location,
             field=name,
             value=serialized_value
         )
@@ -141,12 +263,11 @@ def override_field_for_ccx(ccx, block, name, value):
         transaction.commit()
         override = CcxFieldOverride.objects.get(
             ccx=ccx,
-            location=block.location,
+            location=location,
             field=name
         )
         override.value = serialized_value
     override.save()
-    _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name] = value_json
 
 
 def clear_override_for_ccx(ccx, block, name):
@@ -156,13 +277,24 @@ def clear_override_for_ccx(ccx, block, name):
     This function is idempotent--if no override is set, nothing action is
     performed.
     """
+    if not _delete_override_for_ccx(ccx, block.location, name):
+        return
+
+    request_cache.get_cache('ccx-overrides')[ccx] = _write_overrides_cache(ccx.id)
+    request_cache.get_cache('ccx-overridden-fields').pop(ccx, None)
+
+
+@transaction.commit_on_success
+def _delete_override_for_ccx(ccx, location, name):
+    """
+    Deletes the override of the field `name` of the block at `location` for
+    the `ccx`, and commits it.  Returns whether there was one.
+    """
     try:
         CcxFieldOverride.objects.get(
             ccx=ccx,
-            location=block.location,
+            location=location,
             field=name).delete()
-
-        _get_overrides_for_ccx(ccx).setdefault(block.location, {}).pop(name)
-
     except CcxFieldOverride.DoesNotExist:
-        pass
+        return False
+    return True
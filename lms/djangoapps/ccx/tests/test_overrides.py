@@ -16,8 +16,14 @@ from xmodule.modulestore.tests.django_utils import (
     TEST_DATA_SPLIT_MODULESTORE)
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
-from ..models import CustomCourseForEdX
-from ..overrides import override_field_for_ccx
+from ..models import CcxFieldOverride, CustomCourseForEdX
+from ..overrides import (
+    _overrides_cache_key,
+    _write_overrides_cache as write_overrides_cache,
+    get_override_for_ccx,
+    override_field_for_ccx,
+    clear_override_for_ccx,
+)
 
 from .test_views import flatten, iter_blocks
 
@@ -138,3 +144,98 @@ class TestFieldOverrides(ModuleStoreTestCase):
         override_field_for_ccx(self.ccx, chapter, 'due', ccx_due)
         vertical = chapter.get_children()[0].get_children()[0]
         self.assertEqual(vertical.due, ccx_due)
+
+    def test_overrides_cached_across_requests(self):
+        """
+        Test that overrides loaded in one request are reused by the next.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(0):
+            self.assertEquals(
+                get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+
+    def test_cached_overrides_invalidated_on_change(self):
+        """
+        Test that changing or clearing an override is seen by later requests.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        new_start = datetime.datetime(2015, 1, 1, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        RequestCache.clear_request_cache()
+        self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+
+        override_field_for_ccx(self.ccx, chapter, 'start', new_start)
+        RequestCache.clear_request_cache()
+        self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), new_start)
+
+        clear_override_for_ccx(self.ccx, chapter, 'start')
+        RequestCache.clear_request_cache()
+        self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start', 'default'), 'default')
+
+    def test_cache_written_once_committed(self):
+        """
+        Test that the cached overrides are only replaced once the change is
+        committed, and with the overrides as they are after it.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+
+        def assert_saved(ccx_id):
+            """The override is in the database by the time the cache is written."""
+            self.assertTrue(CcxFieldOverride.objects.filter(ccx_id=ccx_id, field='start').exists())
+            return write_overrides_cache(ccx_id)
+
+        with mock.patch('ccx.overrides._write_overrides_cache', side_effect=assert_saved) as write:
+            override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        write.assert_called_once_with(self.ccx.id)
+
+        def assert_deleted(ccx_id):
+            """The override is gone from the database by the time the cache is written."""
+            self.assertFalse(CcxFieldOverride.objects.filter(ccx_id=ccx_id, field='start').exists())
+            return write_overrides_cache(ccx_id)
+
+        with mock.patch('ccx.overrides._write_overrides_cache', side_effect=assert_deleted) as write:
+            clear_override_for_ccx(self.ccx, chapter, 'start')
+        write.assert_called_once_with(self.ccx.id)
+
+    def test_cache_written_through_on_change(self):
+        """
+        Test that a change leaves the new overrides in the cache, so that a
+        request which still reads the old ones from the database can't cache
+        those under the new version.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        RequestCache.clear_request_cache()
+
+        with mock.patch('ccx.overrides._load_overrides', return_value={}) as load:
+            self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+        self.assertFalse(load.called)
+
+    def test_cache_version_lost_after_add(self):
+        """
+        Test that a version which is gone again right after it was added
+        doesn't give every request the same cache key.
+        """
+        with mock.patch('ccx.overrides.cache') as mock_cache:
+            mock_cache.get.return_value = None
+            self.assertNotIn('None', _overrides_cache_key(self.ccx))
+            self.assertNotEqual(_overrides_cache_key(self.ccx), _overrides_cache_key(self.ccx))
+
+    def test_fields_not_overridden_skip_provider(self):
+        """
+        Test that the provider isn't consulted for fields which aren't
+        overridden anywhere in the ccx.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+        vertical = chapter.get_children()[0].get_children()[0]
+        with mock.patch('ccx.overrides.get_override_for_ccx') as get_override:
+            self.assertEqual(vertical.due, self.mooc_due)
+            self.assertFalse(get_override.called)
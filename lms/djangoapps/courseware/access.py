@@ -17,6 +17,7 @@ import pytz
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.utils.timezone import UTC
+from lazy import lazy
 
 from opaque_keys.edx.keys import CourseKey, UsageKey
 
@@ -35,6 +36,7 @@ from xmodule.util.django import get_current_request_hostname
 
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
+from courseware.navigation import NavigationBlock
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 from student import auth
 from student.models import CourseEnrollmentAllowed
@@ -124,6 +126,9 @@ def has_access(user, action, obj, course_key=None):
     if isinstance(obj, ErrorDescriptor):
         return _has_access_error_desc(user, action, obj, course_key)
 
+    if isinstance(obj, NavigationBlock):
+        return _has_access_descriptor(user, action, obj, course_key)
+
     if isinstance(obj, XModule):
         return _has_access_xmodule(user, action, obj, course_key)
 
@@ -149,8 +154,96 @@ def has_access(user, action, obj, course_key=None):
                     .format(type(obj)))
 
 
+def has_access_bulk(user, action, descriptors, course_key):
+    """
+    Check whether a user has the access to do action on each of `descriptors`,
+    all of which belong to the course run `course_key`.
+
+    This gives the same answers as calling has_access on each descriptor in
+    turn, but the parts of the checks that only depend on the user and the
+    course (course staff and beta tester roles, masquerading, the user's group
+    in each user partition) are looked up once for all of them.
+
+    Returns a dict mapping the location of each descriptor to its
+    AccessResponse.
+    """
+    if not user:
+        user = AnonymousUser()
+
+    if isinstance(course_key, CCXLocator):
+        course_key = course_key.to_course_locator()
+
+    access_cache = _CourseAccessCache(user, course_key)
+    responses = {}
+    for descriptor in descriptors:
+        if isinstance(descriptor, XModule):
+            descriptor = descriptor.descriptor
+        if isinstance(descriptor, NavigationBlock) or (
+                isinstance(descriptor, XBlock) and
+                not isinstance(descriptor, (CourseDescriptor, ErrorDescriptor))
+        ):
+            response = _has_access_descriptor(user, action, descriptor, course_key, access_cache)
+        else:
+            response = has_access(user, action, descriptor, course_key)
+        responses[descriptor.location] = response
+    return responses
+
+
+class _CourseAccessCache(object):
+    """
+    Remembers the parts of descriptor access checks that only depend on the
+    user and the course run, so that checking many descriptors in the same
+    course doesn't look them up again for each one.
+    """
+    def __init__(self, user, course_key):
+        self.user = user
+        self.course_key = course_key
+        self._course_access = {}
+        self._groups = {}
+
+    def has_access_to_course(self, access_level, location):
+        """
+        Memoized `_has_access_to_course` for the course of `location`, unless
+        a course_key was given.
+        """
+        course_key = self.course_key if self.course_key is not None else location.course_key
+        key = (access_level, course_key)
+        if key not in self._course_access:
+            self._course_access[key] = _has_access_to_course(self.user, access_level, course_key)
+        return self._course_access[key]
+
+    @lazy
+    def start_dates_disabled(self):
+        """
+        Whether start dates are ignored for this user.
+        """
+        return (
+            settings.FEATURES['DISABLE_START_DATES'] and
+            not is_masquerading_as_student(self.user, self.course_key)
+        )
+
+    @lazy
+    def is_beta_tester(self):
+        """
+        Whether the user is a beta tester of the course.
+        """
+        return CourseBetaTesterRole(self.course_key).has_user(self.user)
+
+    def get_group_for_user(self, partition):
+        """
+        Returns the group the user is in for `partition`.
+        """
+        if partition.id not in self._groups:
+            self._groups[partition.id] = partition.scheme.get_group_for_user(
+                self.course_key,
+                self.user,
+                partition,
+            )
+        return self._groups[partition.id]
+
+
 # ================ Implementation helpers ================================
-def _can_access_descriptor_with_start_date(user, descriptor, course_key):  # pylint: disable=invalid-name
+def _can_access_descriptor_with_start_date(user, descriptor, course_key, access_cache=None):  # pylint: disable=invalid-name
     """
     Checks if a user has access to a descriptor based on its start date.
 
@@ -167,20 +260,25 @@ def _can_access_descriptor_with_start_date(user, descriptor, course_key):  # pyl
             where AType is CourseDescriptor, CourseOverview, or any other class
             that represents a descriptor and has the attributes .location, .id,
             .start, and .days_early_for_beta.
+        access_cache (_CourseAccessCache): optional lookups shared with other
+            descriptors in the course.
 
     Returns:
         AccessResponse: The result of this access check. Possible results are
             ACCESS_GRANTED or a StartDateError.
     """
-    start_dates_disabled = settings.FEATURES['DISABLE_START_DATES']
-    if start_dates_disabled and not is_masquerading_as_student(user, course_key):
+    if access_cache is None:
+        access_cache = _CourseAccessCache(user, course_key)
+
+    if access_cache.start_dates_disabled:
         return ACCESS_GRANTED
     else:
         now = datetime.now(UTC())
         effective_start = _adjust_start_date_for_beta_testers(
             user,
             descriptor,
-            course_key=course_key
+            course_key=course_key,
+            access_cache=access_cache,
         )
         if (
             descriptor.start is None
@@ -465,11 +563,14 @@ def _has_access_error_desc(user, action, descriptor, course_key):
     return _dispatch(checkers, action, user, descriptor)
 
 
-def _has_group_access(descriptor, user, course_key):
+def _has_group_access(descriptor, user, course_key, access_cache=None):
     """
     This function returns a boolean indicating whether or not `user` has
     sufficient group memberships to "load" a block (the `descriptor`)
     """
+    if access_cache is None:
+        access_cache = _CourseAccessCache(user, course_key)
+
     if len(descriptor.user_partitions) == len(get_split_user_partitions(descriptor.user_partitions)):
         # Short-circuit the process, since there are no defined user partitions that are not
         # user_partitions used by the split_test module. The split_test module handles its own access
@@ -523,11 +624,7 @@ def _has_group_access(descriptor, user, course_key):
     # look up the user's group for each partition
     user_groups = {}
     for partition, groups in partition_groups:
-        user_groups[partition.id] = partition.scheme.get_group_for_user(
-            course_key,
-            user,
-            partition,
-        )
+        user_groups[partition.id] = access_cache.get_group_for_user(partition)
 
     # finally: check that the user has a satisfactory group assignment
     # for each partition.
@@ -538,7 +635,7 @@ def _has_group_access(descriptor, user, course_key):
     return ACCESS_GRANTED
 
 
-def _has_access_descriptor(user, action, descriptor, course_key=None):
+def _has_access_descriptor(user, action, descriptor, course_key=None, access_cache=None):
     """
     Check if user has access to this descriptor.
 
@@ -550,6 +647,9 @@ def _has_access_descriptor(user, action, descriptor, course_key=None):
     (e.g. courses).  If you call this method directly instead of going through
     has_access(), it will not do the right thing.
     """
+    if access_cache is None:
+        access_cache = _CourseAccessCache(user, course_key)
+
     def can_load():
         """
         NOTE: This does not check that the student is enrolled in the course
@@ -559,23 +659,23 @@ def _has_access_descriptor(user, action, descriptor, course_key=None):
         """
         response = (
             _visible_to_nonstaff_users(descriptor)
-            and _has_group_access(descriptor, user, course_key)
+            and _has_group_access(descriptor, user, course_key, access_cache)
             and
             (
                 _has_detached_class_tag(descriptor)
-                or _can_access_descriptor_with_start_date(user, descriptor, course_key)
+                or _can_access_descriptor_with_start_date(user, descriptor, course_key, access_cache)
             )
         )
 
         return (
-            ACCESS_GRANTED if (response or _has_staff_access_to_descriptor(user, descriptor, course_key))
+            ACCESS_GRANTED if (response or access_cache.has_access_to_course('staff', descriptor.location))
             else response
         )
 
     checkers = {
         'load': can_load,
-        'staff': lambda: _has_staff_access_to_descriptor(user, descriptor, course_key),
-        'instructor': lambda: _has_instructor_access_to_descriptor(user, descriptor, course_key)
+        'staff': lambda: access_cache.has_access_to_course('staff', descriptor.location),
+        'instructor': lambda: access_cache.has_access_to_course('instructor', descriptor.location),
     }
 
     return _dispatch(checkers, action, user, descriptor)
@@ -697,7 +797,7 @@ def _dispatch(table, action, user, obj):
         type(obj), action))
 
 
-def _adjust_start_date_for_beta_testers(user, descriptor, course_key=None):  # pylint: disable=invalid-name
+def _adjust_start_date_for_beta_testers(user, descriptor, course_key=None, access_cache=None):  # pylint: disable=invalid-name
     """
     If user is in a beta test group, adjust the start date by the appropriate number of
     days.
@@ -706,6 +806,8 @@ def _adjust_start_date_for_beta_testers(user, descriptor, course_key=None):  # p
        user: A django user.  May be anonymous.
        descriptor: the XModuleDescriptor the user is trying to get access to, with a
        non-None start date.
+       access_cache: optional _CourseAccessCache shared with other descriptors
+       in the course.
 
     Returns:
         A datetime.  Either the same as start, or earlier for beta testers.
@@ -724,7 +826,10 @@ def _adjust_start_date_for_beta_testers(user, descriptor, course_key=None):  # p
         # bail early if no beta testing is set up
         return descriptor.start
 
-    if CourseBetaTesterRole(course_key).has_user(user):
+    if access_cache is None:
+        access_cache = _CourseAccessCache(user, course_key)
+
+    if access_cache.is_beta_tester:
         debug("Adjust start time: user in beta role for %s", descriptor)
         delta = timedelta(descriptor.days_early_for_beta)
         effective = descriptor.start - delta
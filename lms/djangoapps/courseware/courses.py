@@ -62,16 +62,18 @@ def get_course(course_id, depth=0):
 
 
 # TODO please rename this function to get_course_by_key at next opportunity!
-def get_course_by_id(course_key, depth=0):
+def get_course_by_id(course_key, depth=0, **kwargs):
     """
     Given a course id, return the corresponding course descriptor.
 
     If such a course does not exist, raises a 404.
 
     depth: The number of levels of children for the modulestore to cache. None means infinite depth
+
+    Any other kwargs (e.g. categories) are passed on to the modulestore's get_course.
     """
     with modulestore().bulk_operations(course_key):
-        course = modulestore().get_course(course_key, depth=depth)
+        course = modulestore().get_course(course_key, depth=depth, **kwargs)
     if course:
         return course
     else:
@@ -84,7 +86,7 @@ class UserNotEnrolled(Http404):
         self.course_key = course_key
 
 
-def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=False):
+def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=False, **kwargs):
     """
     Given a course_key, look up the corresponding course descriptor,
     check that the user has the access to perform the specified action
@@ -96,9 +98,11 @@ def get_course_with_access(user, action, course_key, depth=0, check_if_enrolled=
 
     check_if_enrolled: If true, additionally verifies that the user is either enrolled in the course
       or has staff access.
+
+    Any other kwargs (e.g. categories) are passed on to the modulestore's get_course.
     """
     assert isinstance(course_key, CourseKey)
-    course = get_course_by_id(course_key, depth=depth)
+    course = get_course_by_id(course_key, depth=depth, **kwargs)
     access_response = has_access(user, action, course, course_key)
 
     if not access_response:
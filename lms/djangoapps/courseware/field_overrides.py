@@ -83,7 +83,7 @@ class OverrideFieldData(FieldData):
             # to check for instance.providers after the instance is built. This
             # would allow for the case where we have registered providers but
             # none are enabled for the provided course
-            return cls(user, wrapped, enabled_providers)
+            return cls(user, wrapped, enabled_providers, course)
 
         return wrapped
 
@@ -109,16 +109,31 @@ class OverrideFieldData(FieldData):
 
         return enabled_providers
 
-    def __init__(self, user, fallback, providers):
+    def __init__(self, user, fallback, providers, course=None):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
+        self.course = course
+
+    def may_override(self, name):
+        """
+        Returns False if no provider can override the field identified by
+        `name` for any block of the course, so that lookups of that field can
+        go straight to the wrapped `FieldData`.
+        """
+        if self.course is None:
+            return True
+        for provider in self.providers:
+            fields = provider.overridden_fields(self.course)
+            if fields is None or name in fields:
+                return True
+        return False
 
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
         Returns the overridden value or `NOTSET` if no override is found.
         """
-        if not overrides_disabled():
+        if not overrides_disabled() and self.may_override(name):
             for provider in self.providers:
                 value = provider.get(block, name, NOTSET)
                 if value is not NOTSET:
@@ -138,7 +153,7 @@ class OverrideFieldData(FieldData):
         self.fallback.delete(block, name)
 
     def has(self, block, name):
-        if not self.providers:
+        if not self.providers or not self.may_override(name):
             return self.fallback.has(block, name)
 
         has = self.get_override(block, name)
@@ -160,7 +175,7 @@ class OverrideFieldData(FieldData):
     def default(self, block, name):
         # The `default` method is overloaded by the field storage system to
         # also handle inheritance.
-        if self.providers and not overrides_disabled():
+        if self.providers and not overrides_disabled() and self.may_override(name):
             inheritable = InheritanceMixin.fields.keys()
             if name in inheritable:
                 for ancestor in _lineage(block):
@@ -235,6 +250,19 @@ class FieldOverrideProvider(object):
         """
         return False
 
+    def overridden_fields(self, course):
+        """
+        Return the names of the fields this provider may override in `course`,
+        as a set, or None if any field may be overridden.
+
+        `OverrideFieldData` doesn't consult the provider at all for fields that
+        aren't in the set, which saves walking the ancestors of every block
+        for every inheritable field that isn't overridden anywhere.  The set
+        may change as overrides are made, so it is asked for on every lookup
+        and should be cheap to return.  The default is None.
+        """
+        return None
+
 
 def _lineage(block):
     """
@@ -15,18 +15,20 @@ from django.core.cache import cache
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
-from courseware.model_data import FieldDataCache, ScoresClient
+from courseware.model_data import (
+    FieldDataCache, MultiUserFieldDataCache, ScoresClient, get_descendant_descriptors
+)
 from student.models import anonymous_id_for_user
 from util.module_utils import yield_dynamic_descriptor_descendants
 from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import BlockMaxScore, PersistentSubsectionGrade, StudentModule
 from .module_render import get_module_for_descriptor
 from submissions import api as sub_api  # installed from the edx-submissions repository
 from opaque_keys import InvalidKeyError
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.djangoapps.signals.signals import GRADES_UPDATED
 
 
@@ -43,11 +45,20 @@ class MaxScoresCache(object):
     issued a score -- say a problem two students have only seen mentioned in
     their progress pages and never interacted with -- should be worth the same
     number of points for everyone.
+
+    Max scores are kept in django's cache, and backed by the BlockMaxScore
+    rows of the course, so that they survive the cache being flushed. Like
+    the use of cached max scores, these rows are only read and written when
+    the ENABLE_MAX_SCORE_CACHE feature is on.
     """
-    def __init__(self, cache_prefix):
+    def __init__(self, cache_prefix, course_key=None, course_version=None):
         self.cache_prefix = cache_prefix
+        self.course_key = course_key
+        self.course_version = course_version
         self._max_scores_cache = {}
         self._max_scores_updates = {}
+        # Max scores that were found in the index but not in django's cache
+        self._max_scores_backfill = {}
 
     @classmethod
     def create_for_course(cls, course):
@@ -60,16 +71,17 @@ class MaxScoresCache(object):
         max scores -- any time a content change occurs, we change our cache
         keys.
         """
-        if course.subtree_edited_on is None:
-            # check for subtree_edited_on because old XML courses doesn't have this attribute
+        course_version = _course_version(course)
+        if not course_version:
             cache_key = u"{}".format(course.id)
         else:
-            cache_key = u"{}.{}".format(course.id, course.subtree_edited_on.isoformat())
-        return cls(cache_key)
+            cache_key = u"{}.{}".format(course.id, course_version)
+        return cls(cache_key, course.id, course_version)
 
     def fetch_from_remote(self, locations):
         """
-        Populate the local cache with values from django's cache
+        Populate the local cache with values from django's cache, falling back
+        to the course's BlockMaxScore rows for anything that isn't there.
         """
         remote_dict = cache.get_many([self._remote_cache_key(loc) for loc in locations])
         self._max_scores_cache = {
@@ -78,18 +90,38 @@ class MaxScoresCache(object):
             if value is not None
         }
 
+        missing = [unicode(loc) for loc in locations if unicode(loc) not in self._max_scores_cache]
+        if missing and self._use_index():
+            indexed_max_scores = BlockMaxScore.get_max_scores(self.course_key, self.course_version)
+            self._max_scores_backfill = {
+                loc_str: indexed_max_scores[loc_str]
+                for loc_str in missing
+                if indexed_max_scores.get(loc_str) is not None
+            }
+            self._max_scores_cache.update(self._max_scores_backfill)
+
     def push_to_remote(self):
         """
-        Update the remote cache
+        Update the remote cache and the course's BlockMaxScore rows
         """
-        if self._max_scores_updates:
+        remote_updates = dict(self._max_scores_backfill)
+        remote_updates.update(self._max_scores_updates)
+        if remote_updates:
             cache.set_many(
                 {
                     self._remote_cache_key(key): value
-                    for key, value in self._max_scores_updates.items()
+                    for key, value in remote_updates.items()
                 },
                 60 * 60 * 24  # 1 day
             )
+            self._max_scores_backfill = {}
+
+        if self._max_scores_updates and self._use_index():
+            BlockMaxScore.add_max_scores(self.course_key, self.course_version, self._max_scores_updates)
+
+    def _use_index(self):
+        """Whether max scores are read from and written to BlockMaxScore."""
+        return self.course_key is not None and settings.FEATURES.get("ENABLE_MAX_SCORE_CACHE")
 
     def _remote_cache_key(self, location):
         """Convert a location to a remote cache key (add our prefixing)."""
@@ -127,6 +159,210 @@ class MaxScoresCache(object):
         return max_score
 
 
+# Blocks that show each student only some of their children, chosen by the
+# student's partition groups, at random or by the student's other answers.
+STUDENT_DEPENDENT_BLOCK_TYPES = frozenset(['split_test', 'library_content', 'randomize', 'conditional'])
+
+# The cached grading structure of a course is replaced as soon as the course is
+# published again, so the timeout only bounds how long unused ones linger.
+GRADING_STRUCTURE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+class SubsectionGradeStore(object):
+    """
+    Reads and writes the stored subsection scores (`PersistentSubsectionGrade`)
+    of one student in one course.
+
+    All of the student's stored scores for the course are loaded with a single
+    query the first time one is asked for, and the scores to store are written
+    together by `save`. Stored scores computed against an older version of the
+    course are ignored.
+
+    Subsections whose content can differ between students, through group
+    access rules or blocks such as split_test and library_content, are never
+    stored: their scores would go stale when the student's groups change, which
+    doesn't change the course version.
+    """
+    def __init__(self, student, course):
+        self.student = student
+        self.course = course
+        self.course_id = course.id
+        self.course_version = _course_version(course)
+        self.enabled = (
+            settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False) and
+            not settings.GENERATE_PROFILE_SCORES and
+            student.is_authenticated()
+        )
+        self._scores = None
+        self._unstorable = None
+        self._pending = {}
+
+    def _fetch(self):
+        """Load all of the student's stored scores for the course."""
+        grades = PersistentSubsectionGrade.objects.filter(
+            student_id=self.student.id,
+            course_id=self.course_id,
+            course_version=self.course_version,
+        )
+        self._scores = {
+            grade.usage_key.map_into_course(self.course_id): [
+                Score(earned, possible, graded, section, UsageKey.from_string(module_id))
+                for earned, possible, graded, section, module_id in json.loads(grade.scores)
+            ]
+            for grade in grades
+        }
+
+    def _is_storable(self, usage_key):
+        """
+        Return whether the scores of the subsection `usage_key` are the same
+        for every student with the same answers.
+        """
+        if self._unstorable is None:
+            self._unstorable = _grading_structure(self.course)['unstorable']
+        return usage_key not in self._unstorable
+
+    def get(self, usage_key):
+        """
+        Return the list of stored Scores for the subsection `usage_key`, or None
+        if there aren't any.
+        """
+        if not self.enabled or not self._is_storable(usage_key):
+            return None
+        if self._scores is None:
+            self._fetch()
+        return self._scores.get(usage_key)
+
+    def set(self, usage_key, scores):
+        """
+        Remember `scores` for the subsection `usage_key`, to be stored by `save`.
+        """
+        if not self.enabled or not self._is_storable(usage_key):
+            return
+        self._pending[usage_key] = scores
+
+    def save(self, scores_client):
+        """
+        Store the scores given to `set` since the last call.
+
+        `scores_client` is the ScoresClient the scores were computed from. A
+        score that changes after it was read invalidates the stored grade of its
+        subsection (see `courseware.models.score_changed_grade_handler`), but
+        that may happen before the grade is written here. So once the grades
+        are committed, the student's scores are read again in a new
+        transaction, and the grades of the subsections whose scores changed
+        are deleted.
+        """
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        PersistentSubsectionGrade.store_grades(
+            self.student.id,
+            self.course_id,
+            self.course_version,
+            {
+                usage_key: json.dumps([
+                    [score.earned, score.possible, score.graded, score.section, unicode(score.module_id)]
+                    for score in scores
+                ])
+                for usage_key, scores in pending.iteritems()
+            }
+        )
+        # This also ends the transaction the scores were read in, whose snapshot
+        # wouldn't show scores committed since.
+        transaction.commit()
+
+        locations = set(score.module_id for scores in pending.itervalues() for score in scores)
+        current_scores = ScoresClient(self.course_id, self.student.id)
+        if locations:
+            current_scores.fetch_scores(locations)
+        stale = [
+            usage_key for usage_key, scores in pending.iteritems()
+            if any(
+                current_scores.get(score.module_id) != scores_client.get(score.module_id) for score in scores
+            )
+        ]
+        if stale:
+            PersistentSubsectionGrade.objects.filter(
+                student_id=self.student.id,
+                course_id=self.course_id,
+                usage_key__in=stale,
+            ).delete()
+            transaction.commit()
+            for usage_key in stale:
+                del pending[usage_key]
+
+        if self._scores is not None:
+            self._scores.update(pending)
+
+
+def _grading_structure(course):
+    """
+    Return a dict describing the subsections of `course`, with keys:
+
+    'unstorable': the set of locations of the subsections that contain blocks
+        which not every student sees: blocks with group access rules, or of one
+        of the STUDENT_DEPENDENT_BLOCK_TYPES.
+    'subsections': a dict mapping the location of each block that can affect
+        grading to the location of its subsection.
+
+    It is computed once per version of the course and kept in the cache, where
+    `PersistentSubsectionGrade.invalidate` also looks up the subsections of
+    blocks whose scores change.
+    """
+    version = _course_version(course)
+    cache_key = PersistentSubsectionGrade.structure_cache_key(course.id)
+    structure = cache.get(cache_key)
+    if structure is None or structure['version'] != version:
+        structure = _compute_grading_structure(course)
+        structure['version'] = version
+        cache.set(cache_key, structure, GRADING_STRUCTURE_CACHE_TIMEOUT)
+    return structure
+
+
+def _compute_grading_structure(course):
+    """
+    Walk `course` to compute its `_grading_structure`.
+    """
+    unstorable = set()
+    subsections = {}
+
+    def possibly_scored(usage_key):
+        """Can this XBlock type have a score or children?"""
+        return usage_key.block_type in course.block_types_affecting_grading
+
+    def visit(block, subsection):
+        """
+        Map `block` and its descendants to `subsection`, and return whether the
+        part of `block` a student sees depends on the student.
+        """
+        subsections[block.location] = subsection
+        depends_on_student = (
+            block.location.block_type in STUDENT_DEPENDENT_BLOCK_TYPES or bool(getattr(block, 'group_access', None))
+        )
+        for child in block.get_children(usage_key_filter=possibly_scored):
+            depends_on_student = visit(child, subsection) or depends_on_student
+        return depends_on_student
+
+    for chapter in course.get_children():
+        for section in chapter.get_children():
+            if visit(section, section.location):
+                unstorable.add(section.location)
+
+    return {'unstorable': unstorable, 'subsections': subsections}
+
+
+def _course_version(course):
+    """
+    Return a string that changes every time something is published to the live
+    version of `course`, or an empty string if the course doesn't record it.
+    """
+    # check for subtree_edited_on because old XML courses doesn't have this attribute
+    if course.subtree_edited_on is None:
+        return u""
+    return course.subtree_edited_on.isoformat()
+
+
 def descriptor_affects_grading(block_types_affecting_grading, descriptor):
     """
     Returns True if the descriptor could have any impact on grading, else False.
@@ -139,22 +375,32 @@ def descriptor_affects_grading(block_types_affecting_grading, descriptor):
     return descriptor.location.block_type in block_types_affecting_grading
 
 
-def field_data_cache_for_grading(course, user):
+def grading_descriptors(course):
+    """
+    Given a CourseDescriptor, return the list of descriptors that might affect
+    grading (see `descriptor_affects_grading`).
+
+    Walking the course is expensive, so callers that grade many students
+    should do it once and hand the result to `field_data_cache_for_grading`.
+    """
+    descriptor_filter = partial(descriptor_affects_grading, course.block_types_affecting_grading)
+    return get_descendant_descriptors(course, depth=None, descriptor_filter=descriptor_filter)
+
+
+def field_data_cache_for_grading(course, user, descriptors=None):
     """
     Given a CourseDescriptor and User, create the FieldDataCache for grading.
 
     This will generate a FieldDataCache that only loads state for those things
     that might possibly affect the grading process, and will ignore things like
     Videos.
+
+    If `descriptors` is given, it must be the output of
+    `grading_descriptors(course)`, and the course will not be walked again.
     """
-    descriptor_filter = partial(descriptor_affects_grading, course.block_types_affecting_grading)
-    return FieldDataCache.cache_for_descriptor_descendents(
-        course.id,
-        user,
-        course,
-        depth=None,
-        descriptor_filter=descriptor_filter
-    )
+    if descriptors is None:
+        descriptors = grading_descriptors(course)
+    return FieldDataCache(descriptors, course.id, user)
 
 
 def answer_distributions(course_key):
@@ -251,14 +497,17 @@ def answer_distributions(course_key):
 
 
 @transaction.commit_manually
-def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
+def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None,
+          max_scores_cache=None):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
     Send a signal to update the minimum grade requirement status.
     """
     with manual_transaction():
-        grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client)
+        grade_summary = _grade(
+            student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache
+        )
         responses = GRADES_UPDATED.send_robust(
             sender=None,
             username=request.user.username,
@@ -273,7 +522,7 @@ def grade(student, request, course, keep_raw_scores=False, field_data_cache=None
         return grade_summary
 
 
-def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client):
+def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, max_scores_cache=None):
     """
     Unwrapped version of "grade"
 
@@ -292,6 +541,9 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    If a `max_scores_cache` is passed in, it must already have been fetched from
+    the remote cache, and the caller is responsible for pushing it back.
+
     More information on the format is in the docstring for CourseGrader.
     """
     if field_data_cache is None:
@@ -304,16 +556,27 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     # scores that were registered with the submissions API, which for the moment
     # means only openassessment (edx-ora2)
     submissions_scores = sub_api.get_scores(course.id.to_deprecated_string(), anonymous_id_for_user(student, course.id))
-    max_scores_cache = MaxScoresCache.create_for_course(course)
-    # For the moment, we have to get scorable_locations from field_data_cache
-    # and not from scores_client, because scores_client is ignorant of things
-    # in the submissions API. As a further refactoring step, submissions should
-    # be hidden behind the ScoresClient.
-    max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
-
+    push_max_scores = max_scores_cache is None
+    if max_scores_cache is None:
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+        # For the moment, we have to get scorable_locations from field_data_cache
+        # and not from scores_client, because scores_client is ignorant of things
+        # in the submissions API. As a further refactoring step, submissions should
+        # be hidden behind the ScoresClient.
+        max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+
+    grade_store = SubsectionGradeStore(student, course)
     grading_context = course.grading_context
     raw_scores = []
 
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(
+            student, request, descriptor, field_data_cache, course.id, course=course
+        )
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
@@ -326,72 +589,46 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
-            should_grade_section = any(
+            always_recalculate = any(
                 descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
             )
+            should_grade_section = always_recalculate
+
+            # If we already computed the scores for this section, and none of
+            # them have changed since, we can just use them.
+            scores = None if always_recalculate else grade_store.get(section_descriptor.location)
 
             # If there are no problems that always have to be regraded, check to
             # see if any of our locations are in the scores from the submissions
             # API. If scores exist, we have to calculate grades for this section.
-            if not should_grade_section:
+            if scores is None and not should_grade_section:
                 should_grade_section = any(
                     descriptor.location.to_deprecated_string() in submissions_scores
                     for descriptor in section['xmoduledescriptors']
                 )
 
-            if not should_grade_section:
+            if scores is None and not should_grade_section:
                 should_grade_section = any(
                     descriptor.location in scores_client
                     for descriptor in section['xmoduledescriptors']
                 )
 
+            if scores is None and should_grade_section:
+                scores, __ = _section_scores(
+                    student,
+                    section_descriptor,
+                    create_module,
+                    scores_client,
+                    submissions_scores,
+                    max_scores_cache,
+                )
+                if not always_recalculate:
+                    grade_store.set(section_descriptor.location, scores)
+
             # If we haven't seen a single problem in the section, we don't have
             # to grade it at all! We can assume 0%
-            if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(
-                        student, request, descriptor, field_data_cache, course.id, course=course
-                    )
-
-                descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
-                for module_descriptor in descendants:
-                    (correct, total) = get_score(
-                        student,
-                        module_descriptor,
-                        create_module,
-                        scores_client,
-                        submissions_scores,
-                        max_scores_cache,
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:    # for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(
-                        Score(
-                            correct,
-                            total,
-                            graded,
-                            module_descriptor.display_name_with_default,
-                            module_descriptor.location
-                        )
-                    )
-
+            if scores is not None:
+                scores = [_adjust_score_for_grading(score) for score in scores]
                 __, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -425,7 +662,9 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
         # so grader can be double-checked
         grade_summary['raw_scores'] = raw_scores
 
-    max_scores_cache.push_to_remote()
+    grade_store.save(scores_client)
+    if push_max_scores:
+        max_scores_cache.push_to_remote()
 
     return grade_summary
 
@@ -508,6 +747,8 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
     # be hidden behind the ScoresClient.
     max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
 
+    grade_store = SubsectionGradeStore(student, course)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -524,35 +765,22 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
                     continue
 
                 graded = section_module.graded
-                scores = []
-
-                module_creator = section_module.xmodule_runtime.get_module
 
-                for module_descriptor in yield_dynamic_descriptor_descendants(
-                        section_module, student.id, module_creator
-                ):
-                    course_id = course.id
-                    (correct, total) = get_score(
+                # Sections that need to always be recalculated are never stored.
+                scores = grade_store.get(section_module.location)
+                if scores is None:
+                    scores, always_recalculate = _section_scores(
                         student,
-                        module_descriptor,
-                        module_creator,
+                        section_module,
+                        section_module.xmodule_runtime.get_module,
                         scores_client,
                         submissions_scores,
                         max_scores_cache,
                     )
-                    if correct is None and total is None:
-                        continue
-
-                    scores.append(
-                        Score(
-                            correct,
-                            total,
-                            graded,
-                            module_descriptor.display_name_with_default,
-                            module_descriptor.location
-                        )
-                    )
+                    if not always_recalculate:
+                        grade_store.set(section_module.location, scores)
 
+                scores = [score._replace(graded=graded) for score in scores]
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
                     scores, section_module.display_name_with_default)
@@ -575,6 +803,7 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
             'sections': sections
         })
 
+    grade_store.save(scores_client)
     max_scores_cache.push_to_remote()
 
     return chapters
@@ -588,6 +817,63 @@ def weighted_score(raw_correct, raw_total, weight):
     return (float(raw_correct) * weight / raw_total, float(weight))
 
 
+def _section_scores(student, section_descriptor, module_creator, scores_client, submissions_scores, max_scores_cache):
+    """
+    Return a tuple of:
+
+    (scores, always_recalculate)
+
+    where `scores` is a list of Scores for every scored problem in the section
+    `section_descriptor`, as seen by `student`, and `always_recalculate` is
+    True if any of those problems must always be recalculated. The `graded`
+    value of each Score is the problem's own `graded` setting.
+
+    These are the scores that SubsectionGradeStore persists, so they must not
+    depend on anything but the student's scores and the course content.
+    """
+    scores = []
+    always_recalculate = False
+    for module_descriptor in yield_dynamic_descriptor_descendants(section_descriptor, student.id, module_creator):
+        always_recalculate = always_recalculate or module_descriptor.always_recalculate_grades
+        (correct, total) = get_score(
+            student,
+            module_descriptor,
+            module_creator,
+            scores_client,
+            submissions_scores,
+            max_scores_cache,
+        )
+        if correct is None and total is None:
+            continue
+
+        scores.append(
+            Score(
+                correct,
+                total,
+                module_descriptor.graded,
+                module_descriptor.display_name_with_default,
+                module_descriptor.location
+            )
+        )
+    return scores, always_recalculate
+
+
+def _adjust_score_for_grading(score):
+    """
+    Return `score` as it should be passed to the course grader.
+    """
+    correct, total = score.earned, score.possible
+    if settings.GENERATE_PROFILE_SCORES:    # for debugging!
+        if total > 1:
+            correct = random.randrange(max(total - 2, 1), total + 1)
+        else:
+            correct = total
+
+    # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+    graded = score.graded and total > 0
+    return score._replace(earned=correct, graded=graded)
+
+
 def get_score(user, problem_descriptor, module_creator, scores_client, submissions_scores_cache, max_scores_cache):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
@@ -682,6 +968,18 @@ def manual_transaction():
         transaction.commit()
 
 
+def _chunks(iterable, chunk_size):
+    """Yield successive lists of at most `chunk_size` items from `iterable`."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
 def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
@@ -699,6 +997,12 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in chunks of settings.GRADES_ITERATION_CHUNK_SIZE. The
+    course is only walked once, and for each chunk the StudentModule scores and
+    field data of every student are read together and the max scores cache is
+    shared, so a problem's max score only has to be computed once per chunk. Each
+    gradeset is identical to what `grade` returns for that student.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = courses.get_course_by_id(course_or_id)
@@ -710,25 +1014,48 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     # grading that student.
     request = RequestFactory().get('/')
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
-            try:
-                request.user = student
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    descriptors = None
+    for student_chunk in _chunks(students, settings.GRADES_ITERATION_CHUNK_SIZE):
+        if descriptors is None:
+            descriptors = grading_descriptors(course)
+            scorable_locations = set(desc.location for desc in descriptors if desc.has_score)
+
+        scores_clients = ScoresClient.create_for_users(
+            course.id, [student.id for student in student_chunk], scorable_locations
+        )
+        field_data_caches = MultiUserFieldDataCache(descriptors, course.id, student_chunk)
+        max_scores_cache = MaxScoresCache.create_for_course(course)
+        max_scores_cache.fetch_from_remote(scorable_locations)
+
+        for student in student_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+                try:
+                    request.user = student
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(
+                        student,
+                        request,
+                        course,
+                        keep_raw_scores,
+                        field_data_cache=field_data_caches.for_user(student),
+                        scores_client=scores_clients[student.id],
+                        max_scores_cache=max_scores_cache,
+                    )
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course.id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+
+        max_scores_cache.push_to_remote()
@@ -0,0 +1,123 @@
+"""
+A command to check that every StudentModule whose history we keep has a
+StudentModuleHistory row for its current state, and to add the missing rows.
+
+History rows can go missing when they are written out of band (see
+courseware.student_module_history) and the task writing them fails for good.
+Only the current state of a StudentModule can be recovered, so intermediate
+states lost that way stay lost.
+"""
+
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware.models import StudentModule, StudentModuleHistory
+
+
+class Command(BaseCommand):
+    """
+    Check StudentModuleHistory for missing rows, and backfill them.
+    """
+    help = "Adds StudentModuleHistory rows for StudentModules whose current state has none."
+
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--course',
+            dest='course',
+            default=None,
+            help="Only check the StudentModules of this course.",
+        ),
+        make_option(
+            '--batch',
+            type='int',
+            default=1000,
+            help="Number of StudentModules to check per query.",
+        ),
+        make_option(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help="Only report the missing rows, don't add them.",
+        ),
+        make_option(
+            '--sleep',
+            type='float',
+            default=0,
+            help="Seconds to sleep between batches.",
+        ),
+    )
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options['course']:
+            try:
+                filters['course_id'] = CourseKey.from_string(options['course'])
+            except InvalidKeyError:
+                raise CommandError(u"Invalid course key: {}".format(options['course']))
+
+        checked = missing = 0
+        for student_modules in iter_student_module_batches(options['batch'], **filters):
+            entries = missing_history(student_modules)
+            checked += len(student_modules)
+            missing += len(entries)
+            if entries and not options['dry_run']:
+                with transaction.commit_on_success():
+                    StudentModuleHistory.objects.bulk_create(entries)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            u"Checked {} StudentModules, {} missing their latest history{}.\n".format(
+                checked, missing, "" if options['dry_run'] else " (now added)"
+            )
+        )
+
+
+def iter_student_module_batches(batch_size, **filters):
+    """
+    Yields lists of at most `batch_size` StudentModules whose history is kept,
+    and that match `filters`, in order of id.
+    """
+    last_id = 0
+    while True:
+        batch = list(
+            StudentModule.objects.filter(
+                id__gt=last_id,
+                module_type__in=StudentModuleHistory.HISTORY_SAVING_TYPES,
+                **filters
+            ).order_by('id')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def missing_history(student_modules):
+    """
+    Returns unsaved StudentModuleHistory rows recording the current state of
+    each of `student_modules` that has no history row since it was last modified.
+    """
+    latest = dict(
+        StudentModuleHistory.objects.filter(
+            student_module__in=[student_module.id for student_module in student_modules]
+        ).values_list('student_module').annotate(Max('created'))
+    )
+    return [
+        StudentModuleHistory(
+            student_module=student_module,
+            version=None,
+            created=student_module.modified,
+            state=student_module.state,
+            grade=student_module.grade,
+            max_grade=student_module.max_grade,
+        )
+        for student_module in student_modules
+        if latest.get(student_module.id) is None or latest[student_module.id] < student_module.modified
+    ]
@@ -0,0 +1,42 @@
+"""Test the backfill_student_module_history management command."""
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from courseware.models import StudentModule, StudentModuleHistory
+from courseware.tests.factories import StudentModuleFactory
+
+
+class BackfillStudentModuleHistoryTest(TestCase):
+    """
+    Tests of the backfill_student_module_history command.
+    """
+    def setUp(self):
+        super(BackfillStudentModuleHistoryTest, self).setUp()
+        self.complete = StudentModuleFactory.create(state='{"a": 1}')
+        self.missing = StudentModuleFactory.create(state='{"b": 2}')
+        self.stale = StudentModuleFactory.create(state='{"c": 3}')
+        StudentModuleFactory.create(module_type='video', state='{}')
+
+        StudentModuleHistory.objects.filter(student_module=self.missing).delete()
+        # Change the state without recording it.
+        StudentModule.objects.filter(id=self.stale.id).update(
+            state='{"c": 4}', modified=self.stale.modified.replace(year=self.stale.modified.year + 1)
+        )
+
+    def test_dry_run(self):
+        call_command('backfill_student_module_history', dry_run=True, batch=2)
+        self.assertEqual(StudentModuleHistory.objects.count(), 2)
+
+    def test_backfill(self):
+        call_command('backfill_student_module_history', batch=2)
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=self.complete).count(), 1)
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=self.missing).count(), 1)
+        self.assertEqual(
+            StudentModuleHistory.objects.filter(student_module=self.stale).latest().state,
+            '{"c": 4}',
+        )
+
+        # Nothing is left to add.
+        call_command('backfill_student_module_history', batch=2)
+        self.assertEqual(StudentModuleHistory.objects.count(), 4)
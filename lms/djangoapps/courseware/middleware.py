@@ -5,6 +5,7 @@ Middleware for the courseware app
 from django.shortcuts import redirect
 from django.core.urlresolvers import reverse
 
+from courseware import student_module_history
 from courseware.courses import UserNotEnrolled
 
 
@@ -22,3 +23,32 @@ class RedirectUnenrolledMiddleware(object):
                     args=[course_key.to_deprecated_string()]
                 )
             )
+
+
+class StudentModuleHistoryMiddleware(object):
+    """
+    Write out the StudentModuleHistory rows buffered while handling a request.
+
+    This must come after TransactionMiddleware, so that the rows are written
+    in the same transaction as the StudentModules they describe.  See
+    :mod:`courseware.student_module_history`.
+    """
+    def process_response(self, _request, response):
+        student_module_history.flush_history()
+        return response
+
+    def process_exception(self, _request, _exception):
+        student_module_history.discard_history()
+
+
+class StudentModuleHistoryTaskMiddleware(object):
+    """
+    Hand the StudentModuleHistory rows buffered while handling a request to a
+    celery task.
+
+    This must come before TransactionMiddleware, so that the task is only
+    sent once the StudentModules the rows describe are committed.
+    """
+    def process_response(self, _request, response):
+        student_module_history.send_history()
+        return response
@@ -19,6 +19,9 @@ UserStateSummaryCache: A cache for Scope.user_state_summary
 PreferencesCache: A cache for Scope.preferences
 UserInfoCache: A cache for Scope.user_info
 DjangoOrmFieldCache: A base-class for single-row-per-field caches.
+
+:class:`MultiUserFieldDataCache` prefetches the same data for many users at
+once, and hands out per-user :class:`FieldDataCache` views of it.
 """
 
 import json
@@ -28,7 +31,8 @@ from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
-    XModuleStudentInfoField
+    XModuleStudentInfoField,
+    chunks,
 )
 import logging
 from opaque_keys.edx.keys import CourseKey, UsageKey
@@ -37,6 +41,7 @@ from opaque_keys.edx.asides import AsideUsageKeyV1
 from contracts import contract, new_contract
 
 from django.db import DatabaseError
+from django.utils import timezone
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -85,6 +90,50 @@ def _all_block_types(descriptors, aside_types):
     return block_types
 
 
+def _fields_to_cache(descriptors):
+    """
+    Returns a map of scopes to fields in that scope that should be cached
+    for ``descriptors``.
+    """
+    scope_map = defaultdict(set)
+    for descriptor in descriptors:
+        for field in descriptor.fields.values():
+            scope_map[field.scope].add(field)
+    return scope_map
+
+
+def get_descendant_descriptors(descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+    """
+    Return a list of all descendant descriptors of `descriptor` down to the
+    specified depth that match the descriptor filter. Includes `descriptor`.
+
+    Arguments:
+        descriptor: The parent to search inside
+        depth: The number of levels to descend, or None for infinite depth
+        descriptor_filter(descriptor): A function that returns True
+            if descriptor should be included in the results
+    """
+    def get_child_descriptors(descriptor, depth, descriptor_filter):
+        """
+        Recursive helper for get_descendant_descriptors.
+        """
+        if descriptor_filter(descriptor):
+            descriptors = [descriptor]
+        else:
+            descriptors = []
+
+        if depth is None or depth > 0:
+            new_depth = depth - 1 if depth is not None else depth
+
+            for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
+                descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
+
+        return descriptors
+
+    with modulestore().bulk_operations(descriptor.location.course_key):
+        return get_child_descriptors(descriptor, depth, descriptor_filter)
+
+
 class DjangoKeyValueStore(KeyValueStore):
     """
     This KeyValueStore will read and write data in the following scopes to django models
@@ -175,7 +224,16 @@ class DjangoOrmFieldCache(object):
             xblocks (list of :class:`XBlock`): XBlocks to cache fields for.
             aside_types (list of str): Aside types to cache fields for.
         """
-        for field_object in self._read_objects(fields, xblocks, aside_types):
+        self.add_field_objects(self._read_objects(fields, xblocks, aside_types))
+
+    def add_field_objects(self, field_objects):
+        """
+        Add already-loaded ``field_objects`` to this cache.
+
+        Arguments:
+            field_objects: Django model instances that store the data for fields in this cache
+        """
+        for field_object in field_objects:
             self._cache[self._cache_key_for_field_object(field_object)] = field_object
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
@@ -368,7 +426,17 @@ class UserStateCache(object):
             self.user.username,
             _all_usage_keys(xblocks, aside_types),
         )
-        for user_state in block_field_state:
+        self.add_states(block_field_state)
+
+    def add_states(self, user_states):
+        """
+        Add already-loaded state to this cache.
+
+        Arguments:
+            user_states (list of :class:`XBlockUserState`): The state of this cache's user
+                for some XBlocks.
+        """
+        for user_state in user_states:
             self._cache[user_state.block_key] = user_state.state
 
     @contract(kvs_key=DjangoKeyValueStore.Key)
@@ -749,33 +817,7 @@ class FieldDataCache(object):
             descriptor_filter is a function that accepts a descriptor and return whether the field data
                 should be cached
         """
-
-        def get_child_descriptors(descriptor, depth, descriptor_filter):
-            """
-            Return a list of all child descriptors down to the specified depth
-            that match the descriptor filter. Includes `descriptor`
-
-            descriptor: The parent to search inside
-            depth: The number of levels to descend, or None for infinite depth
-            descriptor_filter(descriptor): A function that returns True
-                if descriptor should be included in the results
-            """
-            if descriptor_filter(descriptor):
-                descriptors = [descriptor]
-            else:
-                descriptors = []
-
-            if depth is None or depth > 0:
-                new_depth = depth - 1 if depth is not None else depth
-
-                for child in descriptor.get_children() + descriptor.get_required_module_descriptors():
-                    descriptors.extend(get_child_descriptors(child, new_depth, descriptor_filter))
-
-            return descriptors
-
-        with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
-
+        descriptors = get_descendant_descriptors(descriptor, depth, descriptor_filter)
         self.add_descriptors_to_cache(descriptors)
 
     @classmethod
@@ -800,11 +842,7 @@ class FieldDataCache(object):
         """
         Returns a map of scopes to fields in that scope that should be cached
         """
-        scope_map = defaultdict(set)
-        for descriptor in descriptors:
-            for field in descriptor.fields.values():
-                scope_map[field.scope].add(field)
-        return scope_map
+        return _fields_to_cache(descriptors)
 
     @contract(key=DjangoKeyValueStore.Key)
     def get(self, key):
@@ -929,6 +967,107 @@ class FieldDataCache(object):
         return sum(len(cache) for cache in self.cache.values())
 
 
+class MultiUserFieldDataCache(object):
+    """
+    A cache of the field data needed by the same descriptors for many users.
+
+    This is meant for batch jobs (grade reports, instructor tasks) that would
+    otherwise build a :class:`FieldDataCache` per user, paying several queries
+    each and reloading the same Scope.user_state_summary data every time.
+    Here each scope is read once for all the users, with chunked ``IN``
+    queries, and :meth:`for_user` hands out per-user :class:`FieldDataCache`
+    views over that data, without querying.  The Scope.user_state_summary
+    cache is shared by all the views.
+    """
+    def __init__(self, descriptors, course_id, users, asides=None, chunk_size=500):
+        """
+        Arguments
+        descriptors: A list of XModuleDescriptors.
+        course_id: The id of the current course
+        users: The users for which to cache data
+        asides: The list of aside types to load, or None to prefetch no asides.
+        chunk_size: The most users or blocks to put in a single ``IN`` query.
+        """
+        assert isinstance(course_id, CourseKey)
+        self.course_id = course_id
+        self.asides = [] if asides is None else asides
+        self.users = [user for user in users if user.is_authenticated()]
+        self.scorable_locations = set(desc.location for desc in descriptors if desc.has_score)
+
+        self.user_state_summary = UserStateSummaryCache(self.course_id)
+        self._user_states = defaultdict(list)
+        self._preferences = defaultdict(list)
+        self._user_info = defaultdict(list)
+
+        if not self.users:
+            return
+
+        users_by_id = dict((user.id, user) for user in self.users)
+        fields_by_scope = _fields_to_cache(descriptors)
+
+        if Scope.user_state in fields_by_scope:
+            user_states = DjangoXBlockUserStateClient().get_many_for_users(
+                self.users,
+                _all_usage_keys(descriptors, self.asides),
+                chunk_size=chunk_size,
+            )
+            for user_state in user_states:
+                self._user_states[user_state.username].append(user_state)
+
+        if Scope.user_state_summary in fields_by_scope:
+            self.user_state_summary.cache_fields(fields_by_scope[Scope.user_state_summary], descriptors, self.asides)
+
+        if Scope.preferences in fields_by_scope:
+            block_types = _all_block_types(descriptors, self.asides)
+            field_names = set(field.name for field in fields_by_scope[Scope.preferences])
+            for user_ids in chunks(users_by_id.keys(), chunk_size):
+                field_objects = XModuleStudentPrefsField.objects.chunked_filter(
+                    'module_type__in',
+                    block_types,
+                    student__in=user_ids,
+                    field_name__in=field_names,
+                    chunk_size=chunk_size,
+                )
+                for field_object in field_objects:
+                    self._preferences[field_object.student_id].append(field_object)
+
+        if Scope.user_info in fields_by_scope:
+            field_objects = XModuleStudentInfoField.objects.chunked_filter(
+                'student__in',
+                users_by_id.keys(),
+                field_name__in=set(field.name for field in fields_by_scope[Scope.user_info]),
+                chunk_size=chunk_size,
+            )
+            for field_object in field_objects:
+                self._user_info[field_object.student_id].append(field_object)
+
+    def for_user(self, user):
+        """
+        Return a :class:`FieldDataCache` for ``user``, one of the users this
+        cache was created for, filled from the prefetched data.
+
+        The view can be used like any other FieldDataCache (for instance
+        wrapped in a :class:`DjangoKeyValueStore`).  Its writes go to the
+        database as usual; only those to Scope.user_state_summary are seen by
+        the other views.
+        """
+        field_data_cache = FieldDataCache([], self.course_id, user, asides=self.asides)
+        if not user.is_authenticated():
+            return field_data_cache
+
+        field_data_cache.scorable_locations.update(self.scorable_locations)
+        # The views modify the state dicts of their caches in place, so each
+        # gets its own copies.
+        field_data_cache.cache[Scope.user_state].add_states(
+            user_state._replace(state=dict(user_state.state))
+            for user_state in self._user_states[user.username]
+        )
+        field_data_cache.cache[Scope.preferences].add_field_objects(self._preferences[user.id])
+        field_data_cache.cache[Scope.user_info].add_field_objects(self._user_info[user.id])
+        field_data_cache.cache[Scope.user_state_summary] = self.user_state_summary
+        return field_data_cache
+
+
 class ScoresClient(object):
     """
     Basic client interface for retrieving Score information.
@@ -944,6 +1083,8 @@ class ScoresClient(object):
         self.user_id = user_id
         self._locations_to_scores = {}
         self._has_fetched = False
+        # When the scores were read, so callers can tell if they might be stale
+        self.fetched_at = None
 
     def __contains__(self, location):
         """Return True if we have a score for this location."""
@@ -951,6 +1092,7 @@ class ScoresClient(object):
 
     def fetch_scores(self, locations):
         """Grab score information."""
+        self.fetched_at = timezone.now()
         scores_qset = StudentModule.objects.filter(
             student_id=self.user_id,
             course_id=self.course_key,
@@ -988,6 +1130,38 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_key, user_ids, locations):
+        """
+        Create populated ScoresClients for many users with a single query.
+
+        Returns a dict mapping each user_id in `user_ids` to a ScoresClient
+        that has already fetched the scores for `locations`. This is meant for
+        batch jobs like grade reports, which would otherwise pay one query per
+        student.
+        """
+        clients = {user_id: cls(course_key, user_id) for user_id in user_ids}
+        if not clients:
+            return clients
+
+        fetched_at = timezone.now()
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_key,
+            module_state_key__in=set(locations),
+        )
+        for user_id, location, correct, total in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade'
+        ):
+            # See fetch_scores() for why we map locations back into the course.
+            usage_key = UsageKey.from_string(location).map_into_course(course_key)
+            clients[user_id]._locations_to_scores[usage_key] = cls.Score(correct, total)  # pylint: disable=protected-access
+
+        for client in clients.values():
+            client._has_fetched = True  # pylint: disable=protected-access
+            client.fetched_at = fetched_at
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
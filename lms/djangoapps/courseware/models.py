@@ -17,14 +17,18 @@ import itertools
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver, Signal
 
 from model_utils.models import TimeStampedModel
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from student.models import user_by_anonymous_id
 from submissions.models import score_set, score_reset
 
+from xmodule.modulestore.django import modulestore
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField  # pylint: disable=import-error
 log = logging.getLogger(__name__)
 
@@ -166,10 +170,14 @@ class StudentModuleHistory(models.Model):
     @receiver(post_save, sender=StudentModule)
     def save_history(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
         """
-        Checks the instance's module_type, and creates & saves a
+        Checks the instance's module_type, and records a
         StudentModuleHistory entry if the module_type is one that
-        we save.
+        we save.  See :mod:`courseware.student_module_history` for
+        when the entry is written.
         """
+        # Imported here to avoid a circular import.
+        from courseware.student_module_history import record_history
+
         if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
             history_entry = StudentModuleHistory(student_module=instance,
                                                  version=None,
@@ -177,7 +185,7 @@ class StudentModuleHistory(models.Model):
                                                  state=instance.state,
                                                  grade=instance.grade,
                                                  max_grade=instance.max_grade)
-            history_entry.save()
+            record_history([history_entry])
 
 
 class XBlockFieldBase(models.Model):
@@ -296,6 +304,189 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class PersistentSubsectionGrade(TimeStampedModel):
+    """
+    Holds the scores a student has for the problems in one subsection of a
+    course, as computed by `courseware.grades`, so that grading doesn't have to
+    load and render every problem again.
+
+    A row is only valid for the version of the course it was computed against
+    (see `course_version`), so publishing the course invalidates every row. A
+    row is deleted when the student's score for a problem inside the
+    subsection changes.
+    """
+    student = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('student', 'course_id', 'usage_key'),)
+
+    # The value of the course's subtree_edited_on when the scores were computed
+    course_version = models.CharField(max_length=255, blank=True)
+
+    # The scores of the problems in the subsection, stored as JSON
+    scores = models.TextField(default='[]')
+
+    @classmethod
+    def store_grades(cls, student_id, course_key, course_version, scores):
+        """
+        Store `scores`, a dict mapping subsection keys to serialized scores, as
+        the student's grades for `course_version` of the course. The student's
+        stored grades for other versions of the course are dropped.
+
+        If another process stored grades for some of the same subsections in
+        the meantime, they are kept and none of these are stored.
+        """
+        cls.objects.filter(student_id=student_id, course_id=course_key).exclude(
+            course_version=course_version
+        ).delete()
+
+        savepoint = transaction.savepoint()
+        try:
+            cls.objects.bulk_create([
+                cls(
+                    student_id=student_id,
+                    course_id=course_key,
+                    usage_key=usage_key,
+                    course_version=course_version,
+                    scores=serialized_scores,
+                )
+                for usage_key, serialized_scores in scores.iteritems()
+            ])
+        except IntegrityError:
+            transaction.savepoint_rollback(savepoint)
+        else:
+            transaction.savepoint_commit(savepoint)
+
+    @staticmethod
+    def structure_cache_key(course_key):
+        """
+        Return the cache key of the grading structure of the course, which
+        `courseware.grades` computes when it grades a version of the course,
+        and which maps the blocks of that version to their subsections.
+        """
+        return u"courseware.grading_structure.{}".format(course_key)
+
+    @classmethod
+    def invalidate(cls, student_id, course_key, usage_key):
+        """
+        Delete the stored grade of the subsection that contains `usage_key`.
+        If the subsection can't be found, all of the student's stored grades
+        for the course are deleted.
+
+        The stored grade isn't updated in place: it holds weighted scores, while
+        the senders of SCORE_CHANGED only know the raw points, and not every
+        one of them has the block at hand to weigh them.
+        """
+        grades = cls.objects.filter(student_id=student_id, course_id=course_key)
+        subsection_key = cls._subsection_for(course_key, usage_key)
+        if subsection_key is not None:
+            grades = grades.filter(usage_key=subsection_key)
+        grades.delete()
+
+    @classmethod
+    def _subsection_for(cls, course_key, usage_key):
+        """
+        Return the key of the subsection (child of a chapter) that contains
+        `usage_key`, or None if it can't be determined.
+
+        Grades are only stored after the course's grading structure has been
+        cached for their version of the course, so it is looked up there first.
+        It only goes back to the modulestore when the structure was evicted.
+        """
+        structure = cache.get(cls.structure_cache_key(course_key))
+        if structure is not None and usage_key in structure['subsections']:
+            return structure['subsections'][usage_key]
+
+        store = modulestore()
+        child_key, parent_key = usage_key, store.get_parent_location(usage_key)
+        while parent_key is not None and parent_key.block_type != 'chapter':
+            child_key, parent_key = parent_key, store.get_parent_location(parent_key)
+        return child_key if parent_key is not None else None
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} ({})".format(self.student_id, self.usage_key, self.course_version)
+
+
+class BlockMaxScore(TimeStampedModel):
+    """
+    The max score of one scored block in one version of a course.
+
+    `courseware.grades.MaxScoresCache` reads these for any block it can't find
+    in the Django cache, and adds every max score it learns. Since they live
+    in the database, max scores don't have to be recomputed by instantiating
+    each problem again when the cache is cold (e.g. after a deploy).
+
+    Each block has its own row, so concurrent graders can add max scores
+    without overwriting each other's.
+    """
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    usage_key = LocationKeyField(max_length=255)
+
+    # The value of the course's subtree_edited_on that the max score is for
+    course_version = models.CharField(max_length=255, blank=True)
+
+    max_score = models.FloatField()
+
+    class Meta(object):  # pylint: disable=missing-docstring
+        unique_together = (('course_id', 'course_version', 'usage_key'),)
+
+    @classmethod
+    def get_max_scores(cls, course_key, course_version):
+        """
+        Return a dict mapping location strings to the max scores known for
+        `course_version` of the course.
+        """
+        return {
+            unicode(usage_key.map_into_course(course_key)): max_score
+            for usage_key, max_score in cls.objects.filter(
+                course_id=course_key,
+                course_version=course_version,
+            ).values_list('usage_key', 'max_score')
+        }
+
+    @classmethod
+    def add_max_scores(cls, course_key, course_version, max_scores):
+        """
+        Add `max_scores`, a dict mapping location strings to max scores, to
+        those known for `course_version` of the course. Max scores for other
+        versions of the course are dropped.
+
+        Max scores that another process added in the meantime are kept, since
+        a block's max score doesn't change within a version of the course.
+        """
+        cls.objects.filter(course_id=course_key).exclude(course_version=course_version).delete()
+
+        new_rows = [
+            cls(
+                course_id=course_key,
+                course_version=course_version,
+                usage_key=UsageKey.from_string(loc_str),
+                max_score=max_score,
+            )
+            for loc_str, max_score in max_scores.iteritems()
+        ]
+        savepoint = transaction.savepoint()
+        try:
+            cls.objects.bulk_create(new_rows)
+        except IntegrityError:
+            # Another process added some of them first; add the rest one by one.
+            transaction.savepoint_rollback(savepoint)
+            for row in new_rows:
+                cls.objects.get_or_create(
+                    course_id=row.course_id,
+                    course_version=row.course_version,
+                    usage_key=row.usage_key,
+                    defaults={'max_score': row.max_score},
+                )
+        else:
+            transaction.savepoint_commit(savepoint)
+
+    def __unicode__(self):
+        return u"[BlockMaxScore] {}: {} ({})".format(self.usage_key, self.max_score, self.course_version)
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -392,3 +583,40 @@ def submissions_score_reset_handler(sender, **kwargs):  # pylint: disable=unused
             u"Failed to process score_reset signal from Submissions API. "
             "user: %s, course_id: %s, usage_id: %s", user, course_id, usage_id
         )
+
+
+@receiver(SCORE_CHANGED)
+def score_changed_grade_handler(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Consume the SCORE_CHANGED signal and invalidate the stored grade of the
+    subsection containing the block whose score changed, so that it gets
+    recomputed the next time the student is graded.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+        return
+
+    try:
+        course_key = CourseKey.from_string(kwargs['course_id'])
+        usage_key = UsageKey.from_string(kwargs['usage_id']).map_into_course(course_key)
+    except (KeyError, InvalidKeyError):
+        log.exception(
+            u"Failed to invalidate subsection grade. course_id: %s, usage_id: %s",
+            kwargs.get('course_id'), kwargs.get('usage_id')
+        )
+        return
+
+    PersistentSubsectionGrade.invalidate(kwargs.get('user_id'), course_key, usage_key)
+
+
+@receiver(post_delete, sender=StudentModule)
+def student_module_deleted_grade_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidate the stored subsection grade when a student's state for a problem
+    is deleted (e.g. when an instructor resets it), since that drops the score.
+    """
+    if settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES'):
+        PersistentSubsectionGrade.invalidate(
+            instance.student_id,
+            instance.course_id,
+            instance.module_state_key.map_into_course(instance.course_id),
+        )
@@ -16,7 +16,6 @@ import dogstats_wrapper as dog_stats_api
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.core.context_processors import csrf
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
@@ -27,7 +26,7 @@ from django.views.decorators.csrf import csrf_exempt
 import newrelic.agent
 
 from capa.xqueue_interface import XQueueInterface
-from courseware.access import has_access, get_user_role
+from courseware.access import has_access, has_access_bulk, get_user_role
 from courseware.masquerade import (
     MasqueradingKeyValueStore,
     filter_displayed_blocks,
@@ -36,6 +35,7 @@ from courseware.masquerade import (
 )
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache, set_score
 from courseware.models import SCORE_CHANGED
+from courseware.navigation import get_course_navigation
 from courseware.entrance_exams import (
     get_entrance_exam_score,
     user_must_complete_entrance_exam
@@ -49,9 +49,7 @@ from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import UsageKey, CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from openedx.core.lib.xblock_utils import (
-    replace_course_urls,
-    replace_jump_to_id_urls,
-    replace_static_urls,
+    replace_urls,
     add_staff_markup,
     wrap_xblock,
     request_token as xblock_request_token,
@@ -74,7 +72,7 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.x_module import XModuleDescriptor
 from xmodule.mixin import wrap_with_license
 from util.json_request import JsonResponse
-from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
+from util.sandboxing import can_execute_unsafe_code, get_python_lib_zip, safe_exec_cache
 from util import milestones_helpers
 from verify_student.services import ReverificationService
 
@@ -146,14 +144,21 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
     '''
 
     with modulestore().bulk_operations(course.id):
-        course_module = get_module_for_descriptor(
-            user, request, course, field_data_cache, course.id, course=course
-        )
-        if course_module is None:
-            return None
+        navigation = _navigation_for_user(user, course)
+        if navigation is not None:
+            chapters, get_sections = navigation
+            if chapters is None:
+                return None
+        else:
+            course_module = get_module_for_descriptor(
+                user, request, course, field_data_cache, course.id, course=course
+            )
+            if course_module is None:
+                return None
+            chapters = course_module.get_display_items()
+            get_sections = lambda chapter: chapter.get_display_items()
 
         toc_chapters = list()
-        chapters = course_module.get_display_items()
 
         # See if the course is gated by one or more content milestones
         required_content = milestones_helpers.get_required_content(course, user)
@@ -175,7 +180,7 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
                 continue
 
             sections = list()
-            for section in chapter.get_display_items():
+            for section in get_sections(chapter):
 
                 active = (chapter.url_name == active_chapter and
                           section.url_name == active_section)
@@ -253,6 +258,62 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
         return toc_chapters
 
 
+def _navigation_for_user(user, course):
+    """
+    Returns the chapters of `course` visible to `user` from the cached course
+    navigation view, along with a function returning the visible sections of
+    one of those chapters, as a (chapters, get_sections) tuple.
+
+    Returns None if the view is disabled or can't be used for this course, in
+    which case the table of contents must be built from the bound course module.
+    Returns (None, None) if the user can't load the course.
+    """
+    if not settings.FEATURES.get('ENABLE_COURSE_NAVIGATION_CACHE', False):
+        return None
+    # Field overrides (e.g. CCX or individual due dates) can change start dates
+    # and other cached fields per user, so they need the bound modules.
+    if settings.FIELD_OVERRIDE_PROVIDERS:
+        return None
+
+    navigation = get_course_navigation(course)
+    if navigation is None:
+        return None
+
+    # Do not check access when it's a noauth request, as get_module does.
+    check_access = getattr(user, 'known', True)
+
+    if check_access:
+        if not has_access(user, 'load', course, course.id):
+            return None, None
+        access = has_access_bulk(
+            user,
+            'load',
+            [block for chapter, sections in navigation for block in [chapter] + sections],
+            course.id,
+        )
+
+    def can_load(block):
+        """
+        Returns whether `user` may load the chapter or section `block`.
+        """
+        return not check_access or bool(access[block.location])
+
+    chapters = []
+    sections = {}
+    for chapter, chapter_sections in navigation:
+        if can_load(chapter):
+            chapters.append(chapter)
+            sections[chapter.location] = chapter_sections
+
+    def get_sections(chapter):
+        """
+        Returns the sections of `chapter` that `user` may load.
+        """
+        return [section for section in sections[chapter.location] if can_load(section)]
+
+    return chapters, get_sections
+
+
 def get_module(user, request, usage_key, field_data_cache,
                position=None, log_if_not_found=True, wrap_xmodule_display=True,
                grade_bucket_type=None, depth=0,
@@ -630,27 +691,22 @@ def get_module_system_for_user(user, student_data,  # TODO  # pylint: disable=to
     # prefix is going to have to be specific to the module, not the directory
     # that the xml was loaded from
 
-    # Rewrite urls beginning in /static to point to course-specific content
-    block_wrappers.append(partial(
-        replace_static_urls,
-        getattr(descriptor, 'data_dir', None),
-        course_id=course_id,
-        static_asset_path=static_asset_path or descriptor.static_asset_path
-    ))
-
-    # Allow URLs of the form '/course/' refer to the root of multicourse directory
-    #   hierarchy of this course
-    block_wrappers.append(partial(replace_course_urls, course_id))
-
-    # this will rewrite intra-courseware links (/jump_to_id/<id>). This format
-    # is an improvement over the /course/... format for studio authored courses,
-    # because it is agnostic to course-hierarchy.
+    # Rewrite urls beginning in /static to point to course-specific content,
+    # allow URLs of the form '/course/' refer to the root of multicourse directory
+    # hierarchy of this course, and rewrite intra-courseware links (/jump_to_id/<id>),
+    # all in one pass over the html.
+    # The /jump_to_id/ format is an improvement over the /course/... format for studio
+    # authored courses, because it is agnostic to course-hierarchy.
     # NOTE: module_id is empty string here. The 'module_id' will get assigned in the replacement
     # function, we just need to specify something to get the reverse() to work.
     block_wrappers.append(partial(
-        replace_jump_to_id_urls,
-        course_id,
-        reverse('jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''}),
+        replace_urls,
+        getattr(descriptor, 'data_dir', None),
+        course_id=course_id,
+        static_asset_path=static_asset_path or descriptor.static_asset_path,
+        jump_to_id_base_url=reverse(
+            'jump_to_id', kwargs={'course_id': course_id.to_deprecated_string(), 'module_id': ''}
+        ),
     ))
 
     if settings.FEATURES.get('DISPLAY_DEBUG_INFO_TO_STAFF'):
@@ -725,7 +781,7 @@ def get_module_system_for_user(user, student_data,  # TODO  # pylint: disable=to
         course_id=course_id,
         open_ended_grading_interface=open_ended_grading_interface,
         s3_interface=s3_interface,
-        cache=cache,
+        cache=safe_exec_cache(),
         can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
         get_python_lib_zip=(lambda: get_python_lib_zip(contentstore, course_id)),
         # TODO: When we merge the descriptor and module systems, we can stop reaching into the mixologist (cpennington)
@@ -0,0 +1,148 @@
+"""
+A materialized view of a course's navigation (the chapters and sections shown
+in the courseware table of contents).
+
+Building the table of contents used to mean binding every chapter and section
+of the course to the requesting user and running the full access checks on
+each of them.  The structural part of that work (names, formats, start dates,
+visibility and group access rules) only changes when the course is published,
+so it is computed once per published version of the course and cached.  Only
+the per-user part (staff access, cohort/partition membership, beta-tester
+start dates) runs for each request, against lightweight `NavigationBlock`
+objects rather than bound XModules.
+"""
+import logging
+
+from django.core.cache import cache
+
+from xmodule.error_module import ErrorDescriptor
+
+log = logging.getLogger(__name__)
+
+# The cache key includes the course's published version, so entries never go
+# stale; the timeout only bounds how long superseded versions linger.
+NAVIGATION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The block types the table of contents is built from.  Loaders that only need
+# the course's structure pass these to the modulestore as `categories`, so that
+# the content of the units below them isn't prefetched along with it.
+NAVIGATION_CATEGORIES = ('chapter', 'sequential')
+
+
+class NavigationBlock(object):
+    """
+    A cached, unbound stand-in for a chapter or section.
+
+    Carries the fields needed to render the table of contents plus those read by
+    `courseware.access._has_access_descriptor`, so access can be checked without
+    loading the block.  User partitions are looked up on the course, which is
+    where they are defined.
+    """
+    def __init__(self, course, data):
+        self._course = course
+        self.location = data['location']
+        self.url_name = data['url_name']
+        self.display_name_with_default = data['display_name']
+        self.hide_from_toc = data['hide_from_toc']
+        self.format = data['format']
+        self.due = data['due']
+        self.graded = data['graded']
+        self.is_proctored_enabled = data['is_proctored_enabled']
+        self.start = data['start']
+        self.days_early_for_beta = data['days_early_for_beta']
+        self.visible_to_staff_only = data['visible_to_staff_only']
+        self.merged_group_access = data['merged_group_access']
+        self._class_tags = data['class_tags']
+
+    @property
+    def user_partitions(self):
+        """
+        The user partitions of the course this block belongs to.
+        """
+        return self._course.user_partitions
+
+    def _get_user_partition(self, user_partition_id):
+        """
+        Returns the course's user partition with the specified id.
+        """
+        return self._course._get_user_partition(user_partition_id)  # pylint: disable=protected-access
+
+    def __repr__(self):
+        return "NavigationBlock({!r})".format(self.location)
+
+
+def _navigation_data(block):
+    """
+    Returns the cacheable data describing a single chapter or section.
+    """
+    return {
+        'location': block.location,
+        'url_name': block.url_name,
+        'display_name': block.display_name_with_default,
+        'hide_from_toc': block.hide_from_toc,
+        'format': block.format,
+        'due': block.due,
+        'graded': block.graded,
+        'is_proctored_enabled': getattr(block, 'is_proctored_enabled', False),
+        'start': block.start,
+        'days_early_for_beta': block.days_early_for_beta,
+        'visible_to_staff_only': block.visible_to_staff_only,
+        'merged_group_access': block.merged_group_access,
+        'class_tags': frozenset(block._class_tags),  # pylint: disable=protected-access
+    }
+
+
+def _build_navigation(course):
+    """
+    Computes the navigation of `course` from its descriptor, which must have
+    been loaded to depth 2.
+
+    Returns a list of (chapter data, [section data, ...]) tuples, or None if
+    the course contains blocks whose access can't be decided from cached data
+    (error descriptors), in which case the caller should not use the view.
+    """
+    navigation = []
+    for chapter in course.get_display_items():
+        sections = chapter.get_display_items()
+        if any(isinstance(block, ErrorDescriptor) for block in [chapter] + sections):
+            return None
+        navigation.append((
+            _navigation_data(chapter),
+            [_navigation_data(section) for section in sections],
+        ))
+    return navigation
+
+
+def _cache_key(course):
+    """
+    Returns the cache key of the navigation view for the currently published
+    version of `course`.
+    """
+    # subtree_edited_on is updated on the course whenever anything below it is
+    # published, so a new publish naturally lands on a new key.  XML courses
+    # don't record it, but they also can't change without a restart.
+    version = course.subtree_edited_on.isoformat() if course.subtree_edited_on else u""
+    return u"courseware.navigation.{}.{}".format(course.id, version)
+
+
+def get_course_navigation(course):
+    """
+    Returns the navigation of `course` as a list of
+    (NavigationBlock for the chapter, [NavigationBlock for each section]) tuples,
+    in course order and before any per-user filtering.
+
+    Returns None if the course can't be represented by the cached view.
+    """
+    key = _cache_key(course)
+    navigation = cache.get(key)
+    if navigation is None:
+        navigation = _build_navigation(course)
+        if navigation is None:
+            log.info(u"Course %s can't use the cached navigation view", course.id)
+            return None
+        cache.set(key, navigation, NAVIGATION_CACHE_TIMEOUT)
+
+    return [
+        (NavigationBlock(course, chapter), [NavigationBlock(course, section) for section in sections])
+        for chapter, sections in navigation
+    ]
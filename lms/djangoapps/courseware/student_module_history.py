@@ -0,0 +1,133 @@
+"""
+Writing of :class:`~courseware.models.StudentModuleHistory` rows.
+
+Every save of a problem's :class:`~courseware.models.StudentModule` records a
+history row.  By default the row is inserted right away, doubling the writes
+to our busiest table.  The STUDENT_MODULE_HISTORY_WRITE_MODE setting can
+instead buffer the rows written while handling a request, and insert them
+once the response is ready:
+
+``'immediate'``
+    Insert each row as it is recorded (the default).
+
+``'request'``
+    Insert the rows recorded during a request with a single ``bulk_create``
+    when the response is ready, inside the request's transaction.
+
+``'task'``
+    Hand the rows recorded during a request to a celery task once the
+    request's transaction has committed, and let the task insert them out
+    of band.  If that task fails, the rows are lost; the
+    ``backfill_student_module_history`` management command can find and
+    fill in the gaps this leaves.
+
+Outside of a request (in celery tasks or management commands), rows are
+always inserted right away.  While buffered, rows are not visible to
+:meth:`~courseware.user_state_client.DjangoXBlockUserStateClient.get_history`.
+"""
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from courseware.models import StudentModuleHistory
+from request_cache import get_cache, get_request
+
+HISTORY_WRITE_IMMEDIATE = 'immediate'
+HISTORY_WRITE_PER_REQUEST = 'request'
+HISTORY_WRITE_TASK = 'task'
+
+REQUEST_CACHE_NAME = 'courseware.student_module_history'
+
+
+def _write_mode():
+    """
+    Returns the configured way of writing history rows.
+    """
+    return getattr(settings, 'STUDENT_MODULE_HISTORY_WRITE_MODE', HISTORY_WRITE_IMMEDIATE)
+
+
+def _buffer():
+    """
+    Returns the list of history rows buffered for the current request.
+    """
+    return get_cache(REQUEST_CACHE_NAME).setdefault('entries', [])
+
+
+def record_history(entries):
+    """
+    Records the unsaved :class:`~courseware.models.StudentModuleHistory`
+    ``entries``, according to the configured write mode.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+
+    if _write_mode() == HISTORY_WRITE_IMMEDIATE or get_request() is None:
+        StudentModuleHistory.objects.bulk_create(entries)
+    else:
+        _buffer().extend(entries)
+
+
+def flush_history():
+    """
+    Writes out the history rows buffered during the current request, in its
+    transaction, in the ``'request'`` mode.
+    """
+    if _write_mode() != HISTORY_WRITE_PER_REQUEST:
+        return
+
+    entries = get_cache(REQUEST_CACHE_NAME).pop('entries', [])
+    if entries:
+        StudentModuleHistory.objects.bulk_create(entries)
+
+
+def send_history():
+    """
+    Hands the history rows buffered during the current request to a celery
+    task, in the ``'task'`` mode.  This must be called once the request's
+    transaction has committed, so that the task can see the StudentModules
+    the rows describe.
+    """
+    if _write_mode() != HISTORY_WRITE_TASK:
+        return
+
+    entries = get_cache(REQUEST_CACHE_NAME).pop('entries', [])
+    if entries:
+        # Imported here, so that the celery task is only set up where used.
+        from courseware.tasks import write_student_module_history
+        write_student_module_history.delay([serialize_entry(entry) for entry in entries])
+
+
+def discard_history():
+    """
+    Drops the history rows buffered during the current request, whose changes
+    to the StudentModules are being rolled back.
+    """
+    get_cache(REQUEST_CACHE_NAME).pop('entries', None)
+
+
+def serialize_entry(entry):
+    """
+    Returns a JSON-serializable dict describing the unsaved history row ``entry``.
+    """
+    return {
+        'student_module_id': entry.student_module_id,
+        'version': entry.version,
+        'created': entry.created.isoformat(),
+        'state': entry.state,
+        'grade': entry.grade,
+        'max_grade': entry.max_grade,
+    }
+
+
+def deserialize_entry(data):
+    """
+    Returns the unsaved history row described by the output of `serialize_entry`.
+    """
+    return StudentModuleHistory(
+        student_module_id=data['student_module_id'],
+        version=data['version'],
+        created=parse_datetime(data['created']),
+        state=data['state'],
+        grade=data['grade'],
+        max_grade=data['max_grade'],
+    )
@@ -0,0 +1,47 @@
+"""
+Celery tasks for the courseware app.
+"""
+import logging
+
+from celery import task
+from django.db import IntegrityError, transaction
+
+from courseware.models import StudentModule, StudentModuleHistory
+from courseware.student_module_history import deserialize_entry
+
+log = logging.getLogger(__name__)
+
+
+@task  # pylint: disable=not-callable
+def write_student_module_history(entries):
+    """
+    Inserts the StudentModuleHistory rows recorded while handling a request.
+
+    `entries` is a list of dicts, as made by
+    :func:`courseware.student_module_history.serialize_entry`.
+
+    The task is sent once the request's transaction has committed, so the
+    StudentModules of the rows exist unless they have been deleted since;
+    rows for those are dropped.
+    """
+    history = [deserialize_entry(entry) for entry in entries]
+    try:
+        with transaction.commit_on_success():
+            StudentModuleHistory.objects.bulk_create(history)
+        return
+    except IntegrityError:
+        pass
+
+    existing_ids = set(
+        StudentModule.objects.filter(
+            id__in=set(entry.student_module_id for entry in history)
+        ).values_list('id', flat=True)
+    )
+    with transaction.commit_on_success():
+        StudentModuleHistory.objects.bulk_create([
+            entry for entry in history if entry.student_module_id in existing_ids
+        ])
+    log.warning(
+        u"Dropped %d StudentModuleHistory rows for deleted StudentModules",
+        sum(1 for entry in history if entry.student_module_id not in existing_ids)
+    )
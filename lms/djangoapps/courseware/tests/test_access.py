@@ -35,7 +35,7 @@ from xmodule.course_module import (
     CATALOG_VISIBILITY_ABOUT,
     CATALOG_VISIBILITY_NONE,
 )
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 from util.milestones_helpers import (
@@ -205,6 +205,29 @@ class AccessTestCase(LoginEnrollmentTestCase, ModuleStoreTestCase):
         self.assertTrue(bool(access._has_access_descriptor(
             self.beta_user, 'load', mock_unit, course_key=self.course.course_key)))
 
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_has_access_bulk_matches_has_access(self):
+        course = CourseFactory.create(org='edX', course='toy', run='2012_Fall')
+        chapter = ItemFactory.create(category='chapter', parent=course, start=self.YESTERDAY)
+        blocks = [
+            chapter,
+            ItemFactory.create(category='sequential', parent=chapter, start=self.TOMORROW),
+            ItemFactory.create(
+                category='sequential', parent=chapter, start=self.TOMORROW, days_early_for_beta=2
+            ),
+            ItemFactory.create(category='sequential', parent=chapter, visible_to_staff_only=True),
+        ]
+        for user in (self.anonymous_user, self.student, self.beta_user, self.course_staff):
+            for action in ('load', 'staff', 'instructor'):
+                responses = access.has_access_bulk(user, action, blocks, course.id)
+                self.assertEqual(
+                    {location: bool(response) for location, response in responses.items()},
+                    {
+                        block.location: bool(access.has_access(user, action, block, course.id))
+                        for block in blocks
+                    }
+                )
+
     @ddt.data(None, YESTERDAY, TOMORROW)
     @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
     @patch('courseware.access.get_current_request_hostname', Mock(return_value='preview.localhost'))
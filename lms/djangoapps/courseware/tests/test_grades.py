@@ -1,21 +1,29 @@
 """
 Test grade calculation.
 """
+
+from django.conf import settings
+from django.core.cache import cache
 from django.http import Http404
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
 from mock import patch
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache
+from courseware.grades import (
+    _compute_grading_structure, field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache
+)
+from courseware.model_data import set_score
+from courseware.models import BlockMaxScore, PersistentSubsectionGrade, SCORE_CHANGED
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -26,7 +34,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, **kwargs)
 
 
 @attr('shard_1')
@@ -109,6 +117,31 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    @override_settings(GRADES_ITERATION_CHUNK_SIZE=2)
+    def test_chunked_grades_match_grade(self):
+        """Grading in chunks should give every student the same gradeset that
+        grading them one at a time with `grade` does."""
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(
+            category='sequential', parent=chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        problem = ItemFactory.create(category='problem', parent=sequential)
+        self.course = self.store.get_course(self.course.id)
+        for student in self.students[:3]:
+            set_score(student.id, problem.location, 1, 1)
+
+        all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students)
+        self.assertEqual(all_errors, {})
+
+        request = RequestFactory().get('/')
+        for student in self.students:
+            request.user = student
+            request.session = {}
+            expected = grade(student, request, self.course)
+            self.assertEqual(all_gradesets[student]['percent'], expected['percent'])
+            self.assertEqual(all_gradesets[student]['grade'], expected['grade'])
+            self.assertEqual(all_gradesets[student]['totaled_scores'], expected['totaled_scores'])
+
     ################################# Helpers #################################
     def _gradesets_and_errors_for(self, course_id, students):
         """Simple helper method to iterate through student grades and give us
@@ -166,6 +199,56 @@ class TestMaxScoresCache(ModuleStoreTestCase):
         # see cache is populated
         self.assertEqual(max_scores_cache.num_cached_from_remote(), 1)
 
+    def test_max_scores_index(self):
+        """
+        Tests that max scores survive the cache being flushed, but not the
+        course being published again.
+        """
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote(self.locations)
+        max_scores_cache.set(self.locations[0], 1)
+        max_scores_cache.push_to_remote()
+        cache.clear()
+
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote(self.locations)
+        self.assertEqual(max_scores_cache.num_cached_from_remote(), 1)
+        self.assertEqual(max_scores_cache.get(self.locations[0]), 1)
+
+        BlockMaxScore.objects.filter(course_id=self.course.id).update(course_version='an older version')
+        cache.clear()
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote(self.locations)
+        self.assertEqual(max_scores_cache.num_cached_from_remote(), 0)
+
+    def test_max_scores_index_merges(self):
+        """
+        Tests that max scores added by separate graders are all kept, even
+        when they overlap.
+        """
+        course_version = 'a version'
+        BlockMaxScore.add_max_scores(self.course.id, course_version, {unicode(self.locations[0]): 1})
+        BlockMaxScore.add_max_scores(
+            self.course.id, course_version, {unicode(self.locations[0]): 1, unicode(self.locations[1]): 2}
+        )
+        self.assertEqual(
+            BlockMaxScore.get_max_scores(self.course.id, course_version),
+            {unicode(self.locations[0]): 1, unicode(self.locations[1]): 2},
+        )
+
+    @patch.dict(settings.FEATURES, {'ENABLE_MAX_SCORE_CACHE': False})
+    def test_max_scores_index_disabled(self):
+        """
+        Tests that the max scores index isn't used when the max score cache is
+        disabled.
+        """
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        with self.assertNumQueries(0):
+            max_scores_cache.fetch_from_remote(self.locations)
+            max_scores_cache.set(self.locations[0], 1)
+            max_scores_cache.push_to_remote()
+        self.assertFalse(BlockMaxScore.objects.exists())
+
 
 class TestFieldDataCacheScorableLocations(ModuleStoreTestCase):
     """
@@ -194,3 +277,148 @@ class TestFieldDataCacheScorableLocations(ModuleStoreTestCase):
         self.assertNotIn('html', block_types)
         self.assertNotIn('discussion', block_types)
         self.assertIn('problem', block_types)
+
+
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Make sure subsection scores are stored, reused and invalidated.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        self.student = UserFactory.create()
+        course = CourseFactory.create()
+        self.chapter = ItemFactory.create(category='chapter', parent=course)
+        self.sequential = ItemFactory.create(
+            category='sequential', parent=self.chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(category='problem', parent=self.sequential)
+        self.course = self.store.get_course(course.id)
+
+        CourseEnrollment.enroll(self.student, self.course.id)
+        set_score(self.student.id, self.problem.location, 1, 2)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self):
+        """Grade self.student, and return the grade summary."""
+        return grade(self.student, self.request, self.course)
+
+    def _stored_grades(self):
+        """Return the stored subsection grades of self.student."""
+        return PersistentSubsectionGrade.objects.filter(student=self.student, course_id=self.course.id)
+
+    def test_scores_are_stored_and_reused(self):
+        first_summary = self._grade()
+        self.assertEqual(
+            [grade.usage_key.map_into_course(self.course.id) for grade in self._stored_grades()],
+            [self.sequential.location]
+        )
+
+        with patch('courseware.grades._section_scores') as mock_section_scores:
+            second_summary = self._grade()
+        self.assertFalse(mock_section_scores.called)
+        self.assertEqual(first_summary['percent'], second_summary['percent'])
+        self.assertEqual(first_summary['totaled_scores'], second_summary['totaled_scores'])
+
+    def test_score_change_invalidates(self):
+        self._grade()
+        SCORE_CHANGED.send(
+            sender=None,
+            points_possible=2,
+            points_earned=2,
+            user_id=self.student.id,
+            course_id=unicode(self.course.id),
+            usage_id=unicode(self.problem.location),
+        )
+        self.assertFalse(self._stored_grades().exists())
+
+    def test_new_course_version_invalidates(self):
+        self._grade()
+        self._stored_grades().update(course_version='an older version')
+
+        set_score(self.student.id, self.problem.location, 2, 2)
+        self.assertEqual(self._grade()['totaled_scores']['Homework'][0].earned, 2.0)
+
+    def test_subsections_are_stored_together(self):
+        other_sequential = ItemFactory.create(
+            category='sequential', parent=self.chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        other_problem = ItemFactory.create(category='problem', parent=other_sequential)
+        set_score(self.student.id, other_problem.location, 1, 2)
+        self.course = self.store.get_course(self.course.id)
+
+        with patch(
+            'courseware.grades.PersistentSubsectionGrade.store_grades',
+            wraps=PersistentSubsectionGrade.store_grades
+        ) as mock_store_grades:
+            self._grade()
+        self.assertEqual(mock_store_grades.call_count, 1)
+        self.assertEqual(
+            set(grade.usage_key.map_into_course(self.course.id) for grade in self._stored_grades()),
+            set([self.sequential.location, other_sequential.location])
+        )
+
+    def test_student_dependent_subsections_are_not_stored(self):
+        other_sequential = ItemFactory.create(
+            category='sequential', parent=self.chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        randomize = ItemFactory.create(category='randomize', parent=other_sequential)
+        other_problem = ItemFactory.create(category='problem', parent=randomize)
+        set_score(self.student.id, other_problem.location, 1, 2)
+        self.course = self.store.get_course(self.course.id)
+
+        self._grade()
+        self.assertEqual(
+            [grade.usage_key.map_into_course(self.course.id) for grade in self._stored_grades()],
+            [self.sequential.location]
+        )
+
+    def test_scores_changed_while_grading_are_not_stored(self):
+        store_grades = PersistentSubsectionGrade.store_grades
+
+        def change_score_and_store_grades(*args):
+            """
+            Change the student's score after it was read, with the stored grade
+            invalidated before the grades are written.
+            """
+            set_score(self.student.id, self.problem.location, 2, 2)
+            SCORE_CHANGED.send(
+                sender=None,
+                points_possible=2,
+                points_earned=2,
+                user_id=self.student.id,
+                course_id=unicode(self.course.id),
+                usage_id=unicode(self.problem.location),
+            )
+            store_grades(*args)
+
+        with patch(
+            'courseware.grades.PersistentSubsectionGrade.store_grades', side_effect=change_score_and_store_grades
+        ):
+            self._grade()
+        self.assertFalse(self._stored_grades().exists())
+        self.assertEqual(self._grade()['totaled_scores']['Homework'][0].earned, 2.0)
+
+    def test_course_is_walked_once_per_version(self):
+        self._grade()
+        other_student = UserFactory.create()
+        CourseEnrollment.enroll(other_student, self.course.id)
+        with patch('courseware.grades._compute_grading_structure') as mock_compute:
+            list(iterate_grades_for(self.course, [self.student, other_student]))
+        self.assertFalse(mock_compute.called)
+
+        cache.delete(PersistentSubsectionGrade.structure_cache_key(self.course.id))
+        with patch(
+            'courseware.grades._compute_grading_structure', wraps=_compute_grading_structure
+        ) as mock_compute:
+            list(iterate_grades_for(self.course, [self.student, other_student]))
+        self.assertEqual(mock_compute.call_count, 1)
+
+    def test_score_change_finds_subsection_in_grading_structure(self):
+        self._grade()
+        with patch('courseware.models.modulestore') as mock_modulestore:
+            PersistentSubsectionGrade.invalidate(self.student.id, self.course.id, self.problem.location)
+        self.assertFalse(mock_modulestore.called)
+        self.assertFalse(self._stored_grades().exists())
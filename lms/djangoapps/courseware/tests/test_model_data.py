@@ -6,7 +6,7 @@ from mock import Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, MultiUserFieldDataCache
 from courseware.models import StudentModule
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
@@ -215,7 +215,8 @@ class TestStudentModuleStorage(OtherUserFailureTestMixin, TestCase):
         for key in kv_dict:
             self.kvs.set(key, 'test_value')
 
-        with patch('django.db.models.Model.save', side_effect=DatabaseError):
+        # Existing user state is written back with an update of its state column.
+        with patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError):
             with self.assertRaises(KeyValueMultiSaveError) as exception_context:
                 self.kvs.set_many(kv_dict)
         self.assertEquals(exception_context.exception.saved_field_names, [])
@@ -415,3 +416,58 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr('shard_1')
+class TestMultiUserFieldDataCache(TestCase):
+    """Tests for MultiUserFieldDataCache"""
+    def setUp(self):
+        super(TestMultiUserFieldDataCache, self).setUp()
+        self.users = [UserFactory.create() for __ in xrange(3)]
+        for index, user in enumerate(self.users):
+            StudentModuleFactory.create(student=user, state=json.dumps({'a_field': index}))
+            StudentPrefsFactory.create(student=user, value=json.dumps(index))
+            StudentInfoFactory.create(student=user, value=json.dumps(index))
+        UserStateSummaryFactory.create()
+
+        self.descriptor = mock_descriptor([
+            mock_field(Scope.user_state, 'a_field'),
+            mock_field(Scope.user_state_summary, 'existing_field'),
+            mock_field(Scope.preferences, 'existing_field'),
+            mock_field(Scope.user_info, 'existing_field'),
+        ])
+
+    def test_prefetch_for_all_users(self):
+        # One query per scope, however many users there are.
+        with self.assertNumQueries(4):
+            field_data_caches = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+
+        with self.assertNumQueries(0):
+            for index, user in enumerate(self.users):
+                kvs = DjangoKeyValueStore(field_data_caches.for_user(user))
+                self.assertEquals(
+                    index,
+                    kvs.get(DjangoKeyValueStore.Key(Scope.user_state, user.id, location('usage_id'), 'a_field'))
+                )
+                self.assertEquals(
+                    index,
+                    kvs.get(DjangoKeyValueStore.Key(Scope.preferences, user.id, 'mock_problem', 'existing_field'))
+                )
+                self.assertEquals(
+                    index,
+                    kvs.get(DjangoKeyValueStore.Key(Scope.user_info, user.id, None, 'existing_field'))
+                )
+                self.assertEquals('old_value', kvs.get(user_state_summary_key('existing_field')))
+
+    def test_user_state_summary_is_shared(self):
+        field_data_caches = MultiUserFieldDataCache([self.descriptor], course_id, self.users)
+        DjangoKeyValueStore(field_data_caches.for_user(self.users[0])).set(
+            user_state_summary_key('existing_field'), 'new_value'
+        )
+        with self.assertNumQueries(0):
+            self.assertEquals(
+                'new_value',
+                DjangoKeyValueStore(field_data_caches.for_user(self.users[1])).get(
+                    user_state_summary_key('existing_field')
+                )
+            )
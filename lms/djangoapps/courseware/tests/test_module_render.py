@@ -5,6 +5,7 @@ Test for lms courseware app, module render unit
 import ddt
 import itertools
 import json
+from datetime import datetime
 from nose.plugins.attrib import attr
 from functools import partial
 
@@ -18,6 +19,7 @@ from django.contrib.auth.models import AnonymousUser
 from mock import MagicMock, patch, Mock
 from opaque_keys.edx.keys import UsageKey, CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from pytz import UTC
 from pyquery import PyQuery
 from courseware.module_render import hash_resource
 from xblock.field_data import FieldData
@@ -33,6 +35,7 @@ from courseware.field_overrides import OverrideFieldData
 from courseware.model_data import FieldDataCache
 from courseware.module_render import hash_resource, get_module_for_descriptor
 from courseware.models import StudentModule
+from courseware.navigation import NAVIGATION_CATEGORIES
 from courseware.tests.factories import StudentModuleFactory, UserFactory, GlobalStaffFactory
 from courseware.tests.tests import LoginEnrollmentTestCase
 from courseware.tests.test_submitting_problems import TestSubmittingProblems
@@ -695,6 +698,88 @@ class TestTOC(ModuleStoreTestCase):
             for toc_section in expected:
                 self.assertIn(toc_section, actual)
 
+    @ddt.data((ModuleStoreEnum.Type.mongo, 3, 0), (ModuleStoreEnum.Type.split, 6, 0))
+    @ddt.unpack
+    def test_toc_from_navigation_cache(self, default_ms, setup_finds, setup_sends):
+        with self.store.default_store(default_ms):
+            self.setup_modulestore(default_ms, setup_finds, setup_sends)
+            expected = render.toc_for_course(
+                self.request.user, self.request, self.toy_course, self.chapter, 'Welcome', self.field_data_cache
+            )
+            with patch.dict('django.conf.settings.FEATURES', {'ENABLE_COURSE_NAVIGATION_CACHE': True}):
+                # the first call builds the view, the second is served from it
+                for __ in range(2):
+                    course = self.store.get_course(self.toy_course.id, depth=2)
+                    actual = render.toc_for_course(
+                        self.request.user, self.request, course, self.chapter, 'Welcome', self.field_data_cache
+                    )
+                    self.assertEqual(expected, actual)
+
+    @patch.dict('django.conf.settings.FEATURES', {
+        'ENABLE_COURSE_NAVIGATION_CACHE': True, 'DISABLE_START_DATES': False
+    })
+    def test_navigation_cache_filters_per_user(self):
+        course = CourseFactory.create(start=datetime(2000, 1, 1, tzinfo=UTC))
+        chapter = ItemFactory.create(parent=course, category='chapter', display_name='Chapter')
+        ItemFactory.create(parent=chapter, category='sequential', display_name='Open')
+        ItemFactory.create(
+            parent=chapter, category='sequential', display_name='Not Started',
+            start=datetime(2100, 1, 1, tzinfo=UTC)
+        )
+        ItemFactory.create(
+            parent=course, category='chapter', display_name='Staff Only', visible_to_staff_only=True
+        )
+        course = self.store.get_course(course.id, depth=2)
+        request = RequestFactory().get('/')
+
+        def toc_for(user):
+            """
+            Returns the chapter and section names of the table of contents for `user`.
+            """
+            request.user = user
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course.id, user, course, depth=2)
+            toc = render.toc_for_course(user, request, course, None, None, field_data_cache)
+            return [(chapter['display_name'], [s['display_name'] for s in chapter['sections']]) for chapter in toc]
+
+        self.assertEqual(toc_for(UserFactory()), [('Chapter', ['Open'])])
+        self.assertEqual(
+            toc_for(GlobalStaffFactory()),
+            [('Chapter', ['Open', 'Not Started']), ('Staff Only', [])]
+        )
+
+    def test_toc_from_structural_prefetch(self):
+        with self.store.default_store(ModuleStoreEnum.Type.mongo):
+            course = CourseFactory.create()
+            for chapter_name in ('Chapter 1', 'Chapter 2'):
+                chapter = ItemFactory.create(parent=course, category='chapter', display_name=chapter_name)
+                section = ItemFactory.create(parent=chapter, category='sequential', display_name='Section')
+                vertical = ItemFactory.create(parent=section, category='vertical')
+                ItemFactory.create(parent=vertical, category='html')
+            request = RequestFactory().get('/')
+            request.user = UserFactory()
+
+            with self.store.bulk_operations(course.id):
+                # Mongo makes 3 queries to load the course to depth 2:
+                #     - 1 for the course
+                #     - 1 for its children
+                #     - 1 for its grandchildren
+                with check_mongo_calls(3):
+                    expected_course = self.store.get_course(course.id, depth=2)
+                # but only 2 to load just its chapters and sections, which are
+                # fetched in a single query for the whole course
+                with check_mongo_calls(2):
+                    course = self.store.get_course(course.id, depth=2, categories=NAVIGATION_CATEGORIES)
+
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+                course.id, request.user, course, depth=2
+            )
+            with check_mongo_calls(0):
+                actual = render.toc_for_course(request.user, request, course, None, None, field_data_cache)
+            expected = render.toc_for_course(
+                request.user, request, expected_course, None, None, field_data_cache
+            )
+            self.assertEqual(expected, actual)
+
 
 @attr('shard_1')
 @ddt.ddt
@@ -0,0 +1,103 @@
+"""
+Tests of the ways StudentModuleHistory rows are written.
+"""
+from mock import patch
+
+from django.conf import settings
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from courseware.middleware import StudentModuleHistoryMiddleware, StudentModuleHistoryTaskMiddleware
+from courseware.models import StudentModuleHistory
+from courseware.student_module_history import deserialize_entry, serialize_entry
+from courseware.tests.factories import StudentModuleFactory
+from request_cache.middleware import RequestCache
+
+
+class StudentModuleHistoryWriteTest(TestCase):
+    """
+    Tests of the StudentModuleHistory write modes.
+    """
+    def setUp(self):
+        super(StudentModuleHistoryWriteTest, self).setUp()
+        self.request = RequestFactory().get('/')
+        self.middleware = StudentModuleHistoryMiddleware()
+        self.task_middleware = StudentModuleHistoryTaskMiddleware()
+        RequestCache().process_request(self.request)
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def test_immediate(self):
+        StudentModuleFactory.create(state='{}')
+        self.assertEqual(StudentModuleHistory.objects.count(), 1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITE_MODE='request')
+    def test_buffered_per_request(self):
+        student_modules = [StudentModuleFactory.create(state='{}') for __ in xrange(3)]
+        self.assertEqual(StudentModuleHistory.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            self.middleware.process_response(self.request, None)
+        self.assertEqual(
+            sorted(StudentModuleHistory.objects.values_list('student_module', flat=True)),
+            sorted(student_module.id for student_module in student_modules),
+        )
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITE_MODE='request')
+    def test_discarded_on_exception(self):
+        StudentModuleFactory.create(state='{}')
+        self.middleware.process_exception(self.request, Exception())
+        self.middleware.process_response(self.request, None)
+        self.assertEqual(StudentModuleHistory.objects.count(), 0)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITE_MODE='request')
+    def test_immediate_outside_request(self):
+        RequestCache.clear_request_cache()
+        StudentModuleFactory.create(state='{}')
+        self.assertEqual(StudentModuleHistory.objects.count(), 1)
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITE_MODE='task')
+    def test_handed_to_task(self):
+        student_module = StudentModuleFactory.create(state='{"a": 1}', grade=1, max_grade=2)
+        with patch('courseware.tasks.write_student_module_history.delay') as mock_delay:
+            # the rows are left for after the request's transaction commits
+            self.middleware.process_response(self.request, None)
+            self.assertFalse(mock_delay.called)
+            self.task_middleware.process_response(self.request, None)
+
+        self.assertEqual(StudentModuleHistory.objects.count(), 0)
+        (entries,), __ = mock_delay.call_args
+        self.assertEqual(len(entries), 1)
+        entry = deserialize_entry(entries[0])
+        self.assertEqual(
+            (entry.student_module_id, entry.created, entry.state, entry.grade, entry.max_grade),
+            (student_module.id, student_module.modified, '{"a": 1}', 1, 2),
+        )
+
+    @override_settings(STUDENT_MODULE_HISTORY_WRITE_MODE='task')
+    def test_task_discarded_on_exception(self):
+        StudentModuleFactory.create(state='{}')
+        with patch('courseware.tasks.write_student_module_history.delay') as mock_delay:
+            self.middleware.process_exception(self.request, Exception())
+            self.middleware.process_response(self.request, None)
+            self.task_middleware.process_response(self.request, None)
+        self.assertFalse(mock_delay.called)
+
+    def test_middleware_order(self):
+        middleware = list(settings.MIDDLEWARE_CLASSES)
+        transaction_index = middleware.index('django.middleware.transaction.TransactionMiddleware')
+        self.assertLess(
+            middleware.index('courseware.middleware.StudentModuleHistoryTaskMiddleware'), transaction_index
+        )
+        self.assertGreater(
+            middleware.index('courseware.middleware.StudentModuleHistoryMiddleware'), transaction_index
+        )
+
+    def test_task_writes_rows(self):
+        student_module = StudentModuleFactory.create(state='{}')
+        StudentModuleHistory.objects.all().delete()
+        entry = StudentModuleHistory(student_module=student_module, created=student_module.modified, state='{}')
+
+        from courseware.tasks import write_student_module_history
+        write_student_module_history.apply(args=[[serialize_entry(entry)]])
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=student_module).count(), 1)
@@ -4,11 +4,11 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
-from unittest import skip
 
 from django.test import TestCase
 
 from edx_user_state_client.tests import UserStateClientTestBase
+from courseware.models import StudentModule, StudentModuleHistory
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from courseware.tests.factories import UserFactory
 
@@ -32,36 +32,60 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
 
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
+    def test_iter_for_course_in_batches(self):
+        """
+        Make sure states are paged through in batches, and that every one is
+        found exactly once.
+        """
+        for user in xrange(5):
+            self.set(user, 0, {'a': user})
+            self.set(user, 1, {'b': user})
+
+        for batch_size in (1, 3, 10, 11):
+            states = list(self.client.iter_all_for_course(self._block(0).course_key, batch_size=batch_size))
+            self.assertEqual(
+                sorted((state.username, unicode(state.block_key), state.state) for state in states),
+                sorted(
+                    [(self._user(user), unicode(self._block(0)), {'a': user}) for user in xrange(5)] +
+                    [(self._user(user), unicode(self._block(1)), {'b': user}) for user in xrange(5)]
+                )
+            )
+
+    def test_iter_for_block_queries_per_batch(self):
+        """
+        Make sure each batch is fetched with a single query.
+        """
+        for user in xrange(5):
+            self.set(user, 0, {'a': user})
+
+        with self.assertNumQueries(3):
+            self.assertEqual(len(list(self.client.iter_all_for_block(self._block(0), batch_size=2))), 5)
+
+    def test_set_many_keeps_concurrent_scores(self):
+        """
+        Make sure set_many only writes back state, so a score saved by other
+        code since the state was loaded isn't lost, and that history is still
+        recorded for both new and updated blocks.
+        """
+        self.set(0, 0, {'a': 1})
+        StudentModule.objects.filter(module_state_key=self._block(0)).update(grade=3, max_grade=5)
+
+        self.client.set_many(self._user(0), {self._block(0): {'b': 2}, self._block(1): {'c': 3}})
+
+        self.assertEqual(self.get(0, 0).state, {'a': 1, 'b': 2})
+        self.assertEqual(self.get(0, 1).state, {'c': 3})
+        student_module = StudentModule.objects.get(module_state_key=self._block(0))
+        self.assertEqual((student_module.grade, student_module.max_grade), (3, 5))
+        self.assertEqual(len(list(self.get_history(0, 0))), 2)
+        self.assertEqual(len(list(self.get_history(0, 1))), 1)
+
+    def test_set_many_single_new_block_history(self):
+        """
+        Make sure a single new block, which is saved directly rather than bulk
+        created, records exactly one history row.
+        """
+        self.client.set_many(self._user(0), {self._block(0): {'a': 1}})
+
+        self.assertEqual(self.get(0, 0).state, {'a': 1})
+        student_module = StudentModule.objects.get(module_state_key=self._block(0))
+        self.assertEqual(StudentModuleHistory.objects.filter(student_module=student_module).count(), 1)
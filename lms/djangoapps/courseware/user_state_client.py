@@ -14,8 +14,11 @@ except ImportError:
 
 import dogstats_wrapper as dog_stats_api
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from xblock.fields import Scope, ScopeBase
-from courseware.models import StudentModule, StudentModuleHistory
+from courseware.models import StudentModule, StudentModuleHistory, chunks
+from courseware.student_module_history import record_history
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
 
 
@@ -42,6 +45,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # The number of StudentModules to fetch per query in iter_all_for_block
+    # and iter_all_for_course, if the caller doesn't say.
+    DEFAULT_BATCH_SIZE = 1000
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -69,14 +76,21 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         self.user = user
 
-    def _get_student_modules(self, username, block_keys):
+    def _get_student_modules(self, username, block_keys, user=None):
         """
         Retrieve the :class:`~StudentModule`s for the supplied ``username`` and ``block_keys``.
 
         Arguments:
             username (str): The name of the user to load `StudentModule`s for.
             block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
+            user (:class:`~User`): The already-loaded user named ``username``, if
+                available. This saves joining against the user table.
         """
+        if user is not None:
+            student_filter = {'student': user}
+        else:
+            student_filter = {'student__username': username}
+
         course_key_func = attrgetter('course_key')
         by_course = itertools.groupby(
             sorted(block_keys, key=course_key_func),
@@ -87,20 +101,21 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
             query = StudentModule.objects.chunked_filter(
                 'module_state_key__in',
                 usage_keys,
-                student__username=username,
                 course_id=course_key,
+                **student_filter
             )
 
             for student_module in query:
                 usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
                 yield (student_module, usage_key)
 
-    def _ddog_increment(self, evt_time, evt_name):
+    def _ddog_increment(self, evt_time, evt_name, value=1):
         """
         DataDog increment method.
         """
         dog_stats_api.increment(
             'DjangoXBlockUserStateClient.{}'.format(evt_name),
+            value,
             timestamp=evt_time,
             sample_rate=self.API_DATADOG_SAMPLE_RATE,
         )
@@ -165,6 +180,56 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         # Remove it once we're no longer interested in the data.
         self._ddog_histogram(evt_time, 'get_many.blks_out', block_count)
 
+    def get_many_for_users(self, users, block_keys, scope=Scope.user_state, chunk_size=500):
+        """
+        Retrieve the stored XBlock state of many users for the specified XBlock usages.
+
+        This is meant for batch jobs, which would otherwise call :meth:`get_many`
+        once per user. The :class:`~StudentModule`s are read with ``IN`` queries
+        over chunks of at most ``chunk_size`` users and ``chunk_size`` blocks.
+
+        Arguments:
+            users (list of :class:`~User`): The already-loaded users whose state should be retrieved
+            block_keys ([UsageKey]): A list of UsageKeys identifying which xblock states to load.
+            scope (Scope): The scope to load data from
+
+        Yields:
+            XBlockUserState tuples for each user and specified UsageKey that has stored state.
+        """
+        if scope != Scope.user_state:
+            raise ValueError("Only Scope.user_state is supported, not {}".format(scope))
+
+        users_by_id = dict((user.id, user) for user in users)
+
+        course_key_func = attrgetter('course_key')
+        by_course = itertools.groupby(
+            sorted(block_keys, key=course_key_func),
+            course_key_func,
+        )
+        for course_key, usage_keys in by_course:
+            usage_keys = list(usage_keys)
+            for user_ids in chunks(users_by_id.keys(), chunk_size):
+                query = StudentModule.objects.chunked_filter(
+                    'module_state_key__in',
+                    usage_keys,
+                    student__in=user_ids,
+                    course_id=course_key,
+                    chunk_size=chunk_size,
+                )
+                for user_state in self._iter_all_states(
+                        self._with_students(query, users_by_id), scope
+                ):
+                    yield user_state
+
+    def _with_students(self, student_modules, users_by_id):
+        """
+        Yields ``student_modules``, with their students set from ``users_by_id``
+        rather than fetched one at a time.
+        """
+        for student_module in student_modules:
+            student_module.student = users_by_id[student_module.student_id]
+            yield student_module
+
     def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
         """
         Set fields for a particular XBlock.
@@ -180,10 +245,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
 
-        # We do a find_or_create for every block (rather than re-using field objects
-        # that were queried in get_many) so that if the score has
-        # been changed by some other piece of the code, we don't overwrite
-        # that score.
+        # The existing rows are read here (rather than re-using field objects
+        # that were queried in get_many), and only their state is written back,
+        # so that if the score has been changed by some other piece of the
+        # code, we don't overwrite that score.
         if self.user is not None and self.user.username == username:
             user = self.user
         else:
@@ -191,54 +256,165 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
         evt_time = time()
 
+        existing_modules = dict(
+            (usage_key, student_module)
+            for student_module, usage_key
+            in self._get_student_modules(username, block_keys_to_state.keys(), user=user)
+        )
+
+        new_modules = []
+        num_fields_in = num_fields_set = num_fields_updated = 0
         for usage_key, state in block_keys_to_state.items():
-            student_module, created = StudentModule.objects.get_or_create(
-                student=user,
-                course_id=usage_key.course_key,
-                module_state_key=usage_key,
-                defaults={
-                    'state': json.dumps(state),
-                    'module_type': usage_key.block_type,
-                },
-            )
+            num_fields_in += len(state)
+            student_module = existing_modules.get(usage_key)
+            if student_module is None:
+                new_modules.append(StudentModule(
+                    student=user,
+                    course_id=usage_key.course_key,
+                    module_state_key=usage_key,
+                    module_type=usage_key.block_type,
+                    state=json.dumps(state),
+                ))
+                num_fields_set += len(state)
+                continue
 
-            num_fields_before = num_fields_after = num_new_fields_set = len(state)
-            num_fields_updated = 0
-            if not created:
-                if student_module.state is None:
-                    current_state = {}
-                else:
-                    current_state = json.loads(student_module.state)
-                num_fields_before = len(current_state)
-                current_state.update(state)
-                num_fields_after = len(current_state)
-                student_module.state = json.dumps(current_state)
-                # We just read this object, so we know that we can do an update
-                student_module.save(force_update=True)
-
-            # The rest of this method exists only to submit DataDog events.
-            # Remove it once we're no longer interested in the data.
-            #
-            # Record whether a state row has been created or updated.
-            if created:
-                self._ddog_increment(evt_time, 'set_many.state_created')
+            if student_module.state is None:
+                current_state = {}
             else:
-                self._ddog_increment(evt_time, 'set_many.state_updated')
-
-            # Event to record number of fields sent in to set/set_many.
-            self._ddog_histogram(evt_time, 'set_many.fields_in', len(state))
+                current_state = json.loads(student_module.state)
+            num_fields_before = len(current_state)
+            current_state.update(state)
+            num_new_fields_set = len(current_state) - num_fields_before
+            num_fields_set += num_new_fields_set
+            num_fields_updated += max(0, len(state) - num_new_fields_set)
+            student_module.state = json.dumps(current_state)
 
-            # Event to record number of new fields set in set/set_many.
-            num_new_fields_set = num_fields_after - num_fields_before
-            self._ddog_histogram(evt_time, 'set_many.fields_set', num_new_fields_set)
+        created = self._create_student_modules(user, new_modules)
+        self._update_student_module_states(existing_modules.values())
 
-            # Event to record number of existing fields updated in set/set_many.
-            num_fields_updated = max(0, len(state) - num_new_fields_set)
-            self._ddog_histogram(evt_time, 'set_many.fields_updated', num_fields_updated)
+        # The rest of this method exists only to submit DataDog events.
+        # Remove it once we're no longer interested in the data.
+        #
+        # Record how many state rows have been created or updated.
+        if created:
+            self._ddog_increment(evt_time, 'set_many.state_created', len(created))
+        if existing_modules:
+            self._ddog_increment(evt_time, 'set_many.state_updated', len(existing_modules))
+
+        # Events to record the number of fields sent in to set_many, the number
+        # of new fields set, and the number of existing fields updated.
+        self._ddog_histogram(evt_time, 'set_many.fields_in', num_fields_in)
+        self._ddog_histogram(evt_time, 'set_many.fields_set', num_fields_set)
+        self._ddog_histogram(evt_time, 'set_many.fields_updated', num_fields_updated)
 
         # Event for the entire set_many call.
         self._ddog_histogram(evt_time, 'set_many.blks_updated', len(block_keys_to_state))
 
+    def _create_student_modules(self, user, new_modules):
+        """
+        Insert the unsaved :class:`~StudentModule`s ``new_modules``, all belonging
+        to ``user``, and record their history.
+
+        Several rows are inserted with a single ``bulk_create``; a lone row is
+        simply saved, as reading back its id would cost more than the insert
+        saves.  If another request created some of them in the meantime, the
+        insert is rolled back and each block is stored the slow way instead,
+        merging into whatever that request wrote.
+
+        Returns the list of saved :class:`~StudentModule`s.
+        """
+        if not new_modules:
+            return []
+
+        savepoint = transaction.savepoint()
+        try:
+            if len(new_modules) == 1:
+                # post_save records the history of this one.
+                new_modules[0].save(force_insert=True)
+            else:
+                StudentModule.objects.bulk_create(new_modules)
+        except IntegrityError:
+            transaction.savepoint_rollback(savepoint)
+            return [self._create_student_module(student_module) for student_module in new_modules]
+        transaction.savepoint_commit(savepoint)
+        if len(new_modules) == 1:
+            return new_modules
+
+        # bulk_create doesn't set the primary keys of the new rows (nor send
+        # post_save), so they are read back to record their history.
+        if any(
+                student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+                for student_module in new_modules
+        ):
+            created = list(self._get_student_modules(
+                user.username,
+                [student_module.module_state_key for student_module in new_modules],
+                user=user,
+            ))
+            self._save_history([student_module for student_module, __ in created])
+        return new_modules
+
+    def _create_student_module(self, new_module):
+        """
+        Store the unsaved :class:`~StudentModule` ``new_module`` on its own, merging
+        its state into any row that was created concurrently.
+
+        Returns the saved :class:`~StudentModule`.
+        """
+        student_module, created = StudentModule.objects.get_or_create(
+            student=new_module.student,
+            course_id=new_module.course_id,
+            module_state_key=new_module.module_state_key,
+            defaults={
+                'state': new_module.state,
+                'module_type': new_module.module_type,
+            },
+        )
+        if not created:
+            current_state = {} if student_module.state is None else json.loads(student_module.state)
+            current_state.update(json.loads(new_module.state))
+            student_module.state = json.dumps(current_state)
+            self._update_student_module_states([student_module])
+        return student_module
+
+    def _update_student_module_states(self, student_modules):
+        """
+        Write the ``state`` of each of the already saved ``student_modules``
+        back to the database, and record their history.
+
+        Only the state (and modification time) is written, so that a score
+        saved concurrently by some other piece of the code isn't overwritten.
+        """
+        modified = timezone.now()
+        for student_module in student_modules:
+            student_module.modified = modified
+            StudentModule.objects.filter(id=student_module.id).update(
+                state=student_module.state,
+                modified=modified,
+            )
+        self._save_history(student_modules)
+
+    def _save_history(self, student_modules):
+        """
+        Record the current state of the saved ``student_modules`` in
+        :class:`~StudentModuleHistory`, all at once.
+
+        This does what the ``post_save`` receiver of :class:`~StudentModule`
+        does for rows that are written without sending the signal.
+        """
+        record_history([
+            StudentModuleHistory(
+                student_module=student_module,
+                version=None,
+                created=student_module.modified,
+                state=student_module.state,
+                grade=student_module.grade,
+                max_grade=student_module.max_grade,
+            )
+            for student_module in student_modules
+            if student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+        ])
+
     def delete_many(self, username, block_keys, scope=Scope.user_state, fields=None):
         """
         Delete the stored XBlock state for a many xblock usages.
@@ -329,6 +505,48 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
 
             yield XBlockUserState(username, block_key, state, history_entry.created, scope)
 
+    def _iter_all_student_modules(self, batch_size, **filters):
+        """
+        Yields the :class:`~StudentModule`s matching ``filters`` in order of id,
+        fetching ``batch_size`` of them per query.
+
+        Each query picks up after the last id of the one before (rather than
+        using an OFFSET), so they all stay cheap however far into the table
+        they are, and only one batch is held in memory at a time.
+        """
+        if batch_size is None:
+            batch_size = self.DEFAULT_BATCH_SIZE
+
+        query = StudentModule.objects.filter(**filters).select_related('student').order_by('id')
+        last_id = None
+        while True:
+            batch = query if last_id is None else query.filter(id__gt=last_id)
+            student_modules = list(batch[:batch_size])
+            for student_module in student_modules:
+                yield student_module
+            if len(student_modules) < batch_size:
+                break
+            last_id = student_modules[-1].id
+
+    def _iter_all_states(self, student_modules, scope):
+        """
+        Yields an XBlockUserState for each of ``student_modules`` that has
+        stored state, decoding the state of each one only as it is reached.
+        """
+        for student_module in student_modules:
+            if student_module.state is None:
+                continue
+
+            state = json.loads(student_module.state)
+
+            # If the state is the empty dict, then it has been deleted, and so
+            # conformant UserStateClients should treat it as if it doesn't exist.
+            if state == {}:
+                continue
+
+            usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+            yield XBlockUserState(student_module.student.username, usage_key, state, student_module.modified, scope)
+
     def iter_all_for_block(self, block_key, scope=Scope.user_state, batch_size=None):
         """
         You get no ordering guarantees. Fetching will happen in batch_size
@@ -337,7 +555,13 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        student_modules = self._iter_all_student_modules(
+            batch_size,
+            module_state_key=block_key,
+            course_id=block_key.course_key,
+        )
+        return self._iter_all_states(student_modules, scope)
 
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
         """
@@ -347,4 +571,9 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+
+        filters = {'course_id': course_key}
+        if block_type is not None:
+            filters['module_type'] = block_type
+        student_modules = self._iter_all_student_modules(batch_size, **filters)
+        return self._iter_all_states(student_modules, scope)
@@ -46,6 +46,7 @@ from openedx.core.djangoapps.credit.api import (
 )
 from courseware.models import StudentModuleHistory
 from courseware.model_data import FieldDataCache, ScoresClient
+from courseware.navigation import NAVIGATION_CATEGORIES
 from .module_render import toc_for_course, get_module_for_descriptor, get_module, get_module_by_usage_id
 from .entrance_exams import (
     course_has_entrance_exam,
@@ -381,7 +382,11 @@ def _index_bulk_op(request, course_key, chapter, section, position):
         except ValueError:
             raise Http404(u"Position {} is not an integer!".format(position))
 
-    course = get_course_with_access(request.user, 'load', course_key, depth=2)
+    # Only the chapters and sections are needed to render the table of contents;
+    # the active section is refetched with all of its descendents below.
+    course = get_course_with_access(
+        request.user, 'load', course_key, depth=2, categories=NAVIGATION_CATEGORIES
+    )
     staff_access = has_access(request.user, 'staff', course)
     masquerade, user = setup_masquerade(request, course_key, staff_access, reset_masquerade_data=True)
 
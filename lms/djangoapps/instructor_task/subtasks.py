@@ -351,6 +351,43 @@ def queue_subtasks_for_query(
     return progress
 
 
+def queue_subtasks_for_chunks(entry, action_name, create_subtask_fcn, item_chunks, total_num_items):
+    """
+    Queues a subtask to execute each of the precomputed `item_chunks`.
+
+    This is the counterpart of `queue_subtasks_for_query` for callers that can
+    describe the work of each subtask compactly (for instance as a range of
+    ids), and so can build the whole list of chunks up front.
+
+    Arguments:
+        `entry` : the InstructorTask object for which subtasks are being queued.
+        `action_name` : a past-tense verb that can be used for constructing readable status messages.
+        `create_subtask_fcn` : a function of two arguments that constructs the desired kind of subtask object.
+            Arguments are the chunk to be processed by this subtask, and a SubtaskStatus
+            object reflecting initial status (and containing the subtask's id).
+        `item_chunks` : the list of chunks of work, one per subtask.
+        `total_num_items` : total amount of items that will be processed by the subtasks
+
+    Returns:  the task progress as stored in the InstructorTask object.
+    """
+    subtask_id_list = [str(uuid4()) for _ in item_chunks]
+
+    TASK_LOG.info(
+        "Task %s: updating InstructorTask %s with subtask info for %s subtasks to process %s items.",
+        entry.task_id,
+        entry.id,
+        len(subtask_id_list),
+        total_num_items,
+    )
+    progress = initialize_subtask_info(entry, action_name, total_num_items, subtask_id_list)
+
+    for subtask_id, item_chunk in zip(subtask_id_list, item_chunks):
+        new_subtask = create_subtask_fcn(item_chunk, SubtaskStatus.create(subtask_id))
+        new_subtask.apply_async()
+
+    return progress
+
+
 def _acquire_subtask_lock(task_id):
     """
     Mark the specified task_id as being in progress.
@@ -31,6 +31,7 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    perform_module_state_update_for_range,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
@@ -49,6 +50,51 @@ from instructor_task.tasks_helper import (
 TASK_LOG = logging.getLogger('edx.celery.task')
 
 
+def _filter_done_modules(modules_to_update):
+    """Filter that matches problems which are marked as being done"""
+    return modules_to_update.filter(state__contains='"done": true')
+
+
+# The update and filter functions of the tasks that visit StudentModules, by
+# the name passed to their subtasks.
+MODULE_STATE_UPDATES = {
+    'rescore': (rescore_problem_module_state, _filter_done_modules),
+    'reset_attempts': (reset_attempts_module_state, None),
+    'delete_state': (delete_problem_module_state, None),
+}
+
+
+def _module_state_visit_fcn(update_name, entry_id, xmodule_instance_args):
+    """
+    Returns the function visiting the StudentModules for the task `entry_id`
+    with the update named `update_name` in MODULE_STATE_UPDATES.  Large tasks
+    are split into `update_problem_module_state_range` subtasks.
+    """
+    update_fcn, filter_fcn = MODULE_STATE_UPDATES[update_name]
+
+    def _create_subtask(id_range, initial_subtask_status):
+        """Creates a subtask to update the StudentModules in the range of ids `id_range`."""
+        first_id, last_id = id_range
+        return update_problem_module_state_range.subtask(
+            (
+                entry_id,
+                update_name,
+                xmodule_instance_args,
+                first_id,
+                last_id,
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+        )
+
+    return partial(
+        perform_module_state_update,
+        partial(update_fcn, xmodule_instance_args),
+        filter_fcn,
+        create_subtask_fcn=_create_subtask,
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=not-callable
 def rescore_problem(entry_id, xmodule_instance_args):
     """Rescores a problem in a course, for all students or one specific student.
@@ -70,13 +116,7 @@ def rescore_problem(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
-    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
-
-    def filter_fcn(modules_to_update):
-        """Filter that matches problems which are marked as being done"""
-        return modules_to_update.filter(state__contains='"done": true')
-
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    visit_fcn = _module_state_visit_fcn('rescore', entry_id, xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -97,8 +137,7 @@ def reset_problem_attempts(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('reset')
-    update_fcn = partial(reset_attempts_module_state, xmodule_instance_args)
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = _module_state_visit_fcn('reset_attempts', entry_id, xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -119,11 +158,37 @@ def delete_problem_state(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('deleted')
-    update_fcn = partial(delete_problem_module_state, xmodule_instance_args)
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = _module_state_visit_fcn('delete_state', entry_id, xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task  # pylint: disable=not-callable
+def update_problem_module_state_range(entry_id, update_name, xmodule_instance_args, first_id, last_id,
+                                      subtask_status_dict):
+    """Updates the StudentModules with ids from `first_id` to `last_id`, as a subtask of a
+    rescore, attempt reset or state deletion task.
+
+    `entry_id` is the id value of the InstructorTask entry of the parent task, whose progress
+    this subtask adds to when it is done.
+
+    `update_name` names the update to perform in MODULE_STATE_UPDATES.
+
+    `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
+    to instantiate an xmodule instance.
+
+    `subtask_status_dict` is the initial status of the subtask, as made by SubtaskStatus.to_dict().
+    """
+    update_fcn, filter_fcn = MODULE_STATE_UPDATES[update_name]
+    return perform_module_state_update_for_range(
+        partial(update_fcn, xmodule_instance_args),
+        filter_fcn,
+        entry_id,
+        first_id,
+        last_id,
+        subtask_status_dict,
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=not-callable
 def send_bulk_course_email(entry_id, _xmodule_instance_args):
     """Sends emails to recipients enrolled in a course.
@@ -49,6 +49,12 @@ from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import enrolled_students_features, list_may_enroll, get_proctored_exam_results
 from instructor_analytics.csvs import format_dictlist
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_chunks,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -286,7 +292,8 @@ def run_main_task(entry_id, task_fcn, action_name):
     return task_progress
 
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+def perform_module_state_update(update_fcn, filter_fcn, entry_id, course_id, task_input, action_name,
+                                create_subtask_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -304,6 +311,13 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `create_subtask_fcn` is not None and there are more than
+    settings.INSTRUCTOR_TASK_MODULES_PER_SUBTASK modules to update, the work is
+    instead split into subtasks, each updating the modules in a range of ids (see
+    `perform_module_state_update_for_range`).  `create_subtask_fcn` takes the
+    (first id, last id) range and the initial SubtaskStatus, and returns the
+    subtask to queue.  The subtasks record their progress in the InstructorTask.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -321,6 +335,94 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     """
     start_time = time()
+    modules_to_update, problems = _get_modules_to_update(course_id, task_input, filter_fcn)
+    total = modules_to_update.count()
+
+    modules_per_subtask = settings.INSTRUCTOR_TASK_MODULES_PER_SUBTASK
+    if create_subtask_fcn is not None and total > modules_per_subtask:
+        entry = InstructorTask.objects.get(pk=entry_id)
+        # If the task is run again after its subtasks were queued (which can
+        # happen when the broker connection is lost), don't queue them twice.
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            TASK_LOG.warning(u"Task %s has already queued its subtasks!  InstructorTask = %s", entry.task_id, entry)
+            return json.loads(entry.task_output)
+
+        return queue_subtasks_for_chunks(
+            entry,
+            action_name,
+            create_subtask_fcn,
+            _student_module_id_ranges(modules_to_update, modules_per_subtask),
+            total,
+        )
+
+    task_progress = TaskProgress(action_name, total, start_time)
+    task_progress.update_task_state()
+
+    for update_status in _update_module_states(update_fcn, modules_to_update, problems, action_name):
+        task_progress.attempted += 1
+        if update_status == UPDATE_STATUS_SUCCEEDED:
+            task_progress.succeeded += 1
+        elif update_status == UPDATE_STATUS_FAILED:
+            task_progress.failed += 1
+        else:
+            task_progress.skipped += 1
+
+    return task_progress.update_task_state()
+
+
+def perform_module_state_update_for_range(update_fcn, filter_fcn, entry_id, first_id, last_id, subtask_status_dict):
+    """
+    Performs the work of one subtask of `perform_module_state_update`: visits
+    the StudentModules whose ids are between `first_id` and `last_id` (included)
+    with the update_fcn provided.
+
+    The problem descriptors are loaded once for the whole range, and the
+    StudentModules are read in batches, so the memory used doesn't grow with
+    the size of the range.  The results are added to the progress of the
+    InstructorTask `entry_id` when the subtask is done, whether it succeeds
+    or fails.
+
+    Returns the final SubtaskStatus, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    # Raises DuplicateTaskException if this subtask shouldn't run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        entry = InstructorTask.objects.get(pk=entry_id)
+        task_input = json.loads(entry.task_input)
+        action_name = json.loads(entry.task_output)['action_name']
+        modules_to_update, problems = _get_modules_to_update(entry.course_id, task_input, filter_fcn)
+        modules_to_update = modules_to_update.filter(id__gte=first_id, id__lte=last_id)
+
+        for update_status in _update_module_states(update_fcn, modules_to_update, problems, action_name):
+            if update_status == UPDATE_STATUS_SUCCEEDED:
+                subtask_status.increment(succeeded=1)
+            elif update_status == UPDATE_STATUS_FAILED:
+                subtask_status.increment(failed=1)
+            else:
+                # SubtaskStatus only counts succeeded and failed updates as
+                # attempted, but these tasks count skipped ones too.
+                subtask_status.increment(skipped=1)
+                subtask_status.attempted += 1
+    except Exception:
+        TASK_LOG.exception(u"Subtask %s of instructor task %d failed unexpectedly!", current_task_id, entry_id)
+        subtask_status.increment(state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
+
+
+def _get_modules_to_update(course_id, task_input, filter_fcn):
+    """
+    Returns the query for the StudentModules to be updated by a task with the
+    given `task_input`, and a dict mapping the unicode of each problem's
+    location to its descriptor.  See `perform_module_state_update`.
+    """
     usage_keys = []
     problem_url = task_input.get('problem_url')
     entrance_exam_url = task_input.get('entrance_exam_url')
@@ -361,28 +463,58 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     if filter_fcn is not None:
         modules_to_update = filter_fcn(modules_to_update)
 
-    task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
-    task_progress.update_task_state()
+    return modules_to_update, problems
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
 
-    return task_progress.update_task_state()
+def _student_module_id_ranges(modules_to_update, modules_per_range):
+    """
+    Returns a list of (first id, last id) tuples, splitting the StudentModules
+    in the query `modules_to_update` into ranges of at most `modules_per_range`
+    of them.  Only the ids at the ends of each range are read.
+    """
+    ids = modules_to_update.order_by('id').values_list('id', flat=True)
+    ranges = []
+    while True:
+        remaining = ids.filter(id__gt=ranges[-1][1]) if ranges else ids
+        first_ids = list(remaining[:1])
+        if not first_ids:
+            return ranges
+        last_ids = list(remaining[modules_per_range - 1:modules_per_range])
+        if not last_ids:
+            # Fewer than modules_per_range are left, so this range runs to the end.
+            ranges.append((first_ids[0], remaining.reverse()[0]))
+            return ranges
+        ranges.append((first_ids[0], last_ids[0]))
+
+
+def _update_module_states(update_fcn, modules_to_update, problems, action_name, batch_size=100):
+    """
+    Calls `update_fcn` on each of the StudentModules in the query
+    `modules_to_update`, with the matching descriptor from `problems`, and
+    yields the status it returns for each.
+
+    The StudentModules (and their students) are read `batch_size` at a time,
+    in order of id.
+    """
+    modules_to_update = modules_to_update.select_related('student').order_by('id')
+    last_id = None
+    while True:
+        batch = modules_to_update if last_id is None else modules_to_update.filter(id__gt=last_id)
+        student_modules = list(batch[:batch_size])
+        for module_to_update in student_modules:
+            module_descriptor = problems[unicode(module_to_update.module_state_key)]
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
+                update_status = update_fcn(module_descriptor, module_to_update)
+            if update_status not in (UPDATE_STATUS_SUCCEEDED, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED):
+                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+            # If the update_fcn returns succeeded, then it performed some kind of work.
+            # Logging of failures is left to the update_fcn itself.
+            yield update_status
+        if len(student_modules) < batch_size:
+            return
+        last_id = student_modules[-1].id
 
 
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
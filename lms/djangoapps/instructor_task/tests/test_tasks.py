@@ -11,6 +11,7 @@ from uuid import uuid4
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
+from django.test.utils import override_settings
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from opaque_keys.edx.locations import i4xEncoder
@@ -28,7 +29,7 @@ from instructor_task.tasks import (
     delete_problem_state,
     generate_certificates,
 )
-from instructor_task.tasks_helper import UpdateProblemModuleStateError
+from instructor_task.tasks_helper import UpdateProblemModuleStateError, _student_module_id_ranges
 
 PROBLEM_URL_NAME = "test_urlname"
 
@@ -400,6 +401,38 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
             else:
                 self.assertEquals(state['attempts'], initial_attempts)
 
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_SUBTASK=3)
+    def test_reset_with_subtasks(self):
+        initial_attempts = 3
+        input_state = json.dumps({'attempts': initial_attempts})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        self._run_task_with_mock_celery(reset_problem_attempts, task_entry.id, task_entry.task_id)
+
+        # the subtasks record their progress in the entry of the parent task:
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, SUCCESS)
+        self.assertEquals(json.loads(entry.subtasks)['total'], 4)
+        self.assertEquals(json.loads(entry.subtasks)['succeeded'], 4)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output['attempted'], num_students)
+        self.assertEquals(output['succeeded'], num_students)
+        self.assertEquals(output['total'], num_students)
+        self.assertEquals(output['action_name'], 'reset')
+        self._assert_num_attempts(students, 0)
+
+    def test_student_module_id_ranges(self):
+        self._create_students_with_state(7)
+        modules = StudentModule.objects.filter(course_id=self.course.id)
+        ids = sorted(modules.values_list('id', flat=True))
+        self.assertEquals(
+            _student_module_id_ranges(modules, 3),
+            [(ids[0], ids[2]), (ids[3], ids[5]), (ids[6], ids[6])],
+        )
+        self.assertEquals(_student_module_id_ranges(modules, 7), [(ids[0], ids[6])])
+        self.assertEquals(_student_module_id_ranges(modules.none(), 3), [])
+
     def test_reset_with_student_username(self):
         self._test_reset_with_student(False)
 
@@ -188,6 +188,14 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_SIZE', STATIC_CONTENT_DISK_CACHE_MAX_SIZE
+)
+STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX', STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX
+)
+
 # Email overrides
 DEFAULT_FROM_EMAIL = ENV_TOKENS.get('DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 DEFAULT_FEEDBACK_EMAIL = ENV_TOKENS.get('DEFAULT_FEEDBACK_EMAIL', DEFAULT_FEEDBACK_EMAIL)
@@ -205,6 +213,16 @@ PRESS_EMAIL = ENV_TOKENS.get('PRESS_EMAIL', PRESS_EMAIL)
 PAID_COURSE_REGISTRATION_CURRENCY = ENV_TOKENS.get('PAID_COURSE_REGISTRATION_CURRENCY',
                                                    PAID_COURSE_REGISTRATION_CURRENCY)
 
+# Instructor tasks
+INSTRUCTOR_TASK_MODULES_PER_SUBTASK = ENV_TOKENS.get(
+    'INSTRUCTOR_TASK_MODULES_PER_SUBTASK', INSTRUCTOR_TASK_MODULES_PER_SUBTASK
+)
+
+# StudentModuleHistory writes
+STUDENT_MODULE_HISTORY_WRITE_MODE = ENV_TOKENS.get(
+    'STUDENT_MODULE_HISTORY_WRITE_MODE', STUDENT_MODULE_HISTORY_WRITE_MODE
+)
+
 # Payment Report Settings
 PAYMENT_REPORT_GENERATOR_GROUP = ENV_TOKENS.get('PAYMENT_REPORT_GENERATOR_GROUP', PAYMENT_REPORT_GENERATOR_GROUP)
 
@@ -290,6 +308,11 @@ for name, value in ENV_TOKENS.get("CODE_JAIL", {}).items():
         CODE_JAIL[name] = value
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
+SAFE_EXEC_DISK_CACHE_DIR = ENV_TOKENS.get("SAFE_EXEC_DISK_CACHE_DIR", SAFE_EXEC_DISK_CACHE_DIR)
+SAFE_EXEC_DISK_CACHE_MAX_AGE = ENV_TOKENS.get("SAFE_EXEC_DISK_CACHE_MAX_AGE", SAFE_EXEC_DISK_CACHE_MAX_AGE)
+SAFE_EXEC_DISK_CACHE_MAX_ENTRIES = ENV_TOKENS.get(
+    "SAFE_EXEC_DISK_CACHE_MAX_ENTRIES", SAFE_EXEC_DISK_CACHE_MAX_ENTRIES
+)
 
 ASSET_IGNORE_REGEX = ENV_TOKENS.get('ASSET_IGNORE_REGEX', ASSET_IGNORE_REGEX)
 
@@ -392,6 +415,9 @@ if 'DJFS' in AUTH_TOKENS and AUTH_TOKENS['DJFS'] is not None:
 
 ############### Module Store Items ##########
 HOSTNAME_MODULESTORE_DEFAULT_MAPPINGS = ENV_TOKENS.get('HOSTNAME_MODULESTORE_DEFAULT_MAPPINGS', {})
+SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES = ENV_TOKENS.get(
+    'SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES', SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES
+)
 
 ############### Mixed Related(Secure/Not-Secure) Items ##########
 # If Segment.io key specified, load it and enable Segment.io if the feature flag is set
@@ -422,6 +422,14 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Store each student's subsection scores in the database, so grading and
+    # the progress page don't have to recompute them on every request
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
+    # Build the courseware table of contents from a cached view of the course's
+    # chapters and sections, computed once per published version of the course
+    'ENABLE_COURSE_NAVIGATION_CACHE': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -767,6 +775,23 @@ MODULESTORE = {
     }
 }
 
+# Size, in bytes, of the in-process cache of split modulestore course structures
+# (see xmodule.modulestore.split_mongo.mongo_connection.StructureLRUCache).
+# 0 disables the cache.
+SPLIT_MONGO_STRUCTURE_CACHE_MAX_BYTES = 0
+
+# Directory in which to keep copies of course assets too large for memcache,
+# so that they are served from local disk rather than read from the
+# contentstore on every request.  None disables the disk cache.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+# Size, in bytes, beyond which the least recently used assets are removed from
+# the disk cache.  Assets larger than a tenth of this aren't cached.
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+# URL prefix of an internal nginx location serving STATIC_CONTENT_DISK_CACHE_DIR.
+# If set, assets in the disk cache are handed off to nginx with
+# X-Accel-Redirect instead of being streamed through Django.
+STATIC_CONTENT_DISK_CACHE_X_ACCEL_PREFIX = None
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -792,6 +817,17 @@ CODE_JAIL = {
 #   ]
 COURSES_WITH_UNSAFE_CODE = []
 
+# Directory in which to keep the results of sandboxed code execution, in front
+# of the default cache, so that they are shared by all the processes of a
+# server and survive restarts.  None disables the disk cache.
+SAFE_EXEC_DISK_CACHE_DIR = None
+# Seconds after which results in the disk cache are ignored, so that results
+# from older versions of the sandbox's libraries eventually go away.
+SAFE_EXEC_DISK_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+# Number of results above which the oldest are removed from the disk cache.
+# None leaves it unbounded, apart from SAFE_EXEC_DISK_CACHE_MAX_AGE.
+SAFE_EXEC_DISK_CACHE_MAX_ENTRIES = 100000
+
 ############################### DJANGO BUILT-INS ###############################
 # Change DEBUG/TEMPLATE_DEBUG in your environment settings files, not here
 DEBUG = False
@@ -1180,7 +1216,11 @@ MIDDLEWARE_CLASSES = (
     # 'django.middleware.locale.LocaleMiddleware',
     'django_locale.middleware.LocaleMiddleware',
 
+    # Must come before TransactionMiddleware, to send history to celery after the request's transaction commits
+    'courseware.middleware.StudentModuleHistoryTaskMiddleware',
     'django.middleware.transaction.TransactionMiddleware',
+    # Must come after TransactionMiddleware, to write history in the request's transaction
+    'courseware.middleware.StudentModuleHistoryMiddleware',
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
     'django_comment_client.utils.ViewNameMiddleware',
@@ -1726,6 +1766,18 @@ CELERY_QUEUES = {
 # let logging work as configured:
 CELERYD_HIJACK_ROOT_LOGGER = False
 
+################################ Grades ###################################
+
+# Number of students graded together by courseware.grades.iterate_grades_for.
+# The stored scores of each chunk of students are loaded with a single query.
+GRADES_ITERATION_CHUNK_SIZE = 100
+
+############################ Instructor Tasks #################################
+
+# Course-wide rescores, attempt resets and state deletions are split into
+# subtasks, each updating a range of at most this many StudentModules.
+INSTRUCTOR_TASK_MODULES_PER_SUBTASK = 1000
+
 ################################ Bulk Email ###################################
 
 # Suffix used to construct 'from' email address for bulk emails.
@@ -1770,6 +1822,14 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+########################## Student Module History #############################
+
+# How StudentModuleHistory rows are written: 'immediate' inserts each row as
+# it is recorded, 'request' inserts the rows recorded by a request in one
+# query when its response is ready, and 'task' hands them to a celery task.
+# See courseware.student_module_history.
+STUDENT_MODULE_HISTORY_WRITE_MODE = 'immediate'
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
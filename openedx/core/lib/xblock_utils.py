@@ -184,6 +184,22 @@ def replace_static_urls(data_dir, block, view, frag, context, course_id=None, st
     ))
 
 
+def replace_urls(data_dir, block, view, frag, context, course_id=None, static_asset_path='', jump_to_id_base_url=None):  # pylint: disable=unused-argument
+    """
+    Does the work of replace_static_urls, replace_course_urls and
+    replace_jump_to_id_urls in a single pass over the content of the
+    fragment.  /course/ and /jump_to_id/ urls are only replaced if
+    `course_id` and `jump_to_id_base_url` respectively are given.
+    """
+    return wrap_fragment(frag, static_replace.replace_urls(
+        frag.content,
+        data_dir,
+        course_id,
+        static_asset_path=static_asset_path,
+        jump_to_id_base_url=jump_to_id_base_url
+    ))
+
+
 def grade_histogram(module_id):
     '''
     Print out a histogram of grades on a given problem in staff member debug info.